@@ -1,17 +1,27 @@
 ﻿# === ADDITIONAL FEATURE FOR VICTORIES/SETBACKS ===
+from collections import deque
 from tkinter import messagebox
 import tkinter as tk
-import json
-import os
-from datetime import datetime, timedelta
-import webbrowser
-import requests
-import certifi
-
-JOURNAL_FILE = "journal_entries.json"
-SAVE_FILE = "streakstep_data.json"
+from core import (
+    ENTRY_TYPES, STORAGE_BACKEND, build_search_index, date_bounds, make_entry, open_clock, open_history,
+    open_journal, open_stats, open_storage, open_trackers, restore_version
+)
+from journal_io import export_entries, import_entries
+from journal_store import ArchivedRow
+from persistence import encode_data
+from virtual_list import VirtualList
+from timesync import TimeSync
+from scheduler import TickScheduler, next_change_ms
+from metrics import METRICS_ENABLED, METRICS_FILE, Metrics
+from watcher import FolderWatcher
+from tasks import TaskRunner
+from sync_client import open_sync
+
 DEBUG_MODE = False
 SHOW_FULL_TIMER_DEBUG = False  # Toggle full/simple timer at launch
+INDEX_PROCESS_MIN_ENTRIES = 2000  # smaller journals build their search index on the journal thread
+SYNC_FIRST_MS = 5000              # the first sync waits until startup has settled
+SYNC_INTERVAL_MS = 5 * 60 * 1000
 
 class StreakStepApp:
     def __init__(self, root):
@@ -23,33 +33,36 @@ class StreakStepApp:
         self.root.resizable(False, False)
 
         self.full_timer_mode = SHOW_FULL_TIMER_DEBUG
-        self.congrats_shown = False
-
-        self.data = self.load_data()
-
-        # API TESTING 
-
-        def get_current_time_from_api():
-            try:
-                headers = {"User-Agent": "Mozilla/5.0"}
-                response = requests.get(
-                    "https://worldtimeapi.org/api/ip",
-                    headers=headers,
-                    timeout=5,
-                    verify=certifi.where()
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    return datetime.fromisoformat(data["datetime"])
-                else:
-                    print("Error fetching time:", response.status_code)
-            except Exception as e:
-                print("Error:", e)
-            return datetime.now()
-
-        print(get_current_time_from_api())
-
-        #END API
+        self.congrats_shown = set()  # habits whose goal prompt has already been queued
+        self.goal_prompts = deque()  # habits waiting to be asked "another day?", one dialog at a time
+        self.prompting = False
+        self.label_texts = {}
+        self.habit_labels = {}
+
+        # Timing of the main-thread hot paths, only wrapped when turned on
+        self.metrics = Metrics(enabled=DEBUG_MODE or METRICS_ENABLED, path=METRICS_FILE)
+        self.metrics.instrument(self, "update_timer", "app.update_timer")
+        self.metrics.instrument(self, "open_entries_window", "journal.show_window")
+        self.clock = open_clock()
+        self.scheduler = TickScheduler(self.root, self.update_timer, now=self.clock.monotonic)
+
+        self.storage = open_storage(clock=self.clock)
+        for method in ("save_state", "load_entries", "load_description", "add_entry", "update_entry", "delete_entry"):
+            self.metrics.instrument(self.storage, method, f"storage.{method}")
+        self.stats = open_stats(self.storage)
+        with self.metrics.timed("streak.load_data"):
+            self.trackers = open_trackers(self.storage, self.clock, self.stats, after=self.root.after, after_cancel=self.root.after_cancel)
+        self.streak = self.trackers.main  # the big timer; other habits get a row below the buttons
+        for model in self.trackers.models.values():
+            self.metrics.instrument(model, "save_data", "streak.save_data")
+        self.history = open_history(self.storage, self.clock)  # edits of journal entries, read when needed
+        # Before the journal is opened, so its changes are noted for syncing from the start.
+        # Set up with "streakstep_cli.py sync --server URL" or STREAKSTEP_SYNC_URL.
+        self.sync = open_sync(self.storage.folder)
+        # Journal work runs on its own thread ("journal" lane), results come back through the Tk loop
+        self.tasks = TaskRunner(self.root)
+        self._journal = None  # loaded the first time it's needed
+        self._journal_waiting = []  # with_journal callbacks while it loads
 
         # === UI ===
         self.debug_label = tk.Label(root, text="", font=("Helvetica", 10), bg="#2C3E50", fg="#95A5A6")
@@ -81,6 +94,8 @@ class StreakStepApp:
         )
         self.failed_btn.grid(row=0, column=1, padx=8)
 
+        self.habits_frame = tk.Frame(root, bg="#2C3E50")
+        self.habits_frame.pack(fill="x", padx=16)
 
         if DEBUG_MODE:
             self.sim_btn = tk.Button(
@@ -89,100 +104,383 @@ class StreakStepApp:
             )
             self.sim_btn.pack(pady=(0, 6))
 
+        menu_frame = tk.Frame(root, bg="#2C3E50")
+        menu_frame.pack(pady=(0, 6))
+
         self.journal_button = tk.Button(
-            root, text="Journal Menu", font=("Helvetica", 10), bg="#3498DB", fg="white",
+            menu_frame, text="Journal Menu", font=("Helvetica", 10), bg="#3498DB", fg="white",
             command=self.open_journal_menu
         )
-        self.journal_button.pack(pady=(0, 6))
+        self.journal_button.grid(row=0, column=0, padx=4)
+
+        self.stats_button = tk.Button(
+            menu_frame, text="Progress", font=("Helvetica", 10), bg="#8E44AD", fg="white",
+            command=self.show_stats
+        )
+        self.stats_button.grid(row=0, column=1, padx=4)
+
+        self.habit_button = tk.Button(
+            menu_frame, text="+ Habit", font=("Helvetica", 10), bg="#16A085", fg="white",
+            command=self.add_habit
+        )
+        self.habit_button.grid(row=0, column=2, padx=4)
 
         self.root.bind("<space>", self.toggle_timer_mode)
-        self.update_timer()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        if self.metrics.enabled:
+            self.root.bind("<F12>", self.show_metrics)
+            self.metrics.start(self.root)
+        self.layout_habits()
+
+        # Anything optional waits until the window has been drawn
+        self.time_sync = None
+        self._sync_job = None
+        self.metrics.instrument(self, "on_data_changed", "app.data_changed")  # before the watcher takes the method
+        self.watcher = FolderWatcher(self.root, self.storage.watched_files(), self.on_data_changed)
+        self.root.after_idle(self.start_optional_work)
+
+    def start_optional_work(self):
+        # Network time is fetched in the background, the clock starts on local time
+        self.time_sync = TimeSync(self.clock)
+        self.time_sync.start()
+        self.watcher.start()
+        if self.sync is not None:
+            self._sync_job = self.root.after(SYNC_FIRST_MS, self.start_sync)
+
+    def on_data_changed(self, paths):
+        # Another process (or we ourselves) wrote to the data folder: pick up only what's new
+        if self.storage.state_changed():
+            before = set(self.trackers.names())
+            if self.trackers.store.dirty:
+                self.trackers.flush()  # our unsaved changes get merged with theirs on the way out
+                changed = True
+            else:
+                changed = self.trackers.reload()
+            if changed:
+                self.habits_changed(before)
+        if self._journal is not None:
+            self.journal_task(self._journal.refresh, what="reload the journal")
+        self.stats.catch_up()
+
+    def habits_changed(self, before):
+        # The habits were replaced from outside; before: their names until now
+        self.streak = self.trackers.main
+        for name in before - set(self.trackers.names()):
+            self.scheduler.remove(name)
+            self.congrats_shown.discard(name)
+        for name in set(self.trackers.names()) - before:
+            self.metrics.instrument(self.trackers.get(name), "save_data", "streak.save_data")
+        self.layout_habits()
+
+    # === Sync ===
+    def start_sync(self):
+        # The network and the journal changes run on the journal thread, the streak is merged here
+        self._sync_job = None
+        state = encode_data(self.trackers.state())
+        self.with_journal(
+            lambda journal: self.tasks.run(self.sync.sync, journal, state, lane="journal", on_done=self.synced),
+            on_error=self.synced_later
+        )
+
+    def synced(self, result, error):
+        self.synced_later()
+        if error is not None:
+            print("Error syncing:", error)  # tried again next time, nothing is lost
+            return
+        if result["state"] is not None:
+            before = set(self.trackers.names())
+            self.trackers.merge(result["state"], prefer_theirs=True)  # the server's copy won
+            self.trackers.mark_dirty(None)
+            self.habits_changed(before)
+
+    def synced_later(self):
+        self._sync_job = self.root.after(SYNC_INTERVAL_MS, self.start_sync)
+
+    # === Journal in the background ===
+    def with_journal(self, callback, on_error=None):
+        # callback(journal) on the Tk thread, once the journal has been opened on its thread
+        if self._journal is not None:
+            callback(self._journal)
+            return
+        self._journal_waiting.append((callback, on_error))
+        if len(self._journal_waiting) == 1:
+            self.tasks.run(open_journal, self.storage, self.stats, self.history, lane="journal",
+                           on_done=self.journal_opened)
+
+    def journal_opened(self, journal, error):
+        waiting, self._journal_waiting = self._journal_waiting, []
+        if error is not None:
+            messagebox.showerror("Journal", f"Couldn't open the journal:\n{error}")
+            for _, on_error in waiting:
+                if on_error is not None:
+                    on_error()
+            return
+        self._journal = journal
+        self.journal_task(journal.load_saved_index, on_done=self.search_index_checked, what="load the search index")
+        for callback, _ in waiting:
+            callback(journal)
+
+    def search_index_checked(self, loaded):
+        # Building the index is the CPU-heavy part of a big journal: a worker process does it
+        # and saves it, the journal thread then only loads the file
+        if loaded or len(self._journal) < INDEX_PROCESS_MIN_ENTRIES:
+            return
+
+        def built(result, error):
+            if error is not None:
+                print("Error building search index:", error)  # the first search builds it instead
+            elif self._journal is not None:
+                self.journal_task(self._journal.load_saved_index, what="load the search index")
+
+        self.tasks.run(build_search_index, self.storage.folder, STORAGE_BACKEND, process=True, on_done=built)
+
+    def journal_task(self, fn, *args, on_done=None, on_error=None, what="update the journal"):
+        # fn(*args) on the journal thread, so reads and changes happen one at a time and in order.
+        # on_done(result) runs on the Tk thread; an error is shown, then on_error() runs.
+        def done(result, error):
+            if error is not None:
+                messagebox.showerror("Journal", f"Couldn't {what}:\n{error}")
+                if on_error is not None:
+                    on_error()
+            elif on_done is not None:
+                on_done(result)
+
+        return self.tasks.run(fn, *args, lane="journal", on_done=done)
+
+    def on_close(self):
+        self.watcher.stop()
+        if self._sync_job is not None:
+            self.root.after_cancel(self._sync_job)
+        self.streak.store.flush()
+        self.tasks.close()  # lets journal writes still in flight finish
+        if self.sync is not None:
+            self.sync.close()
+        if self._journal is not None:
+            self._journal.close()
+        self.stats.save()
+        self.storage.close()
+        self.metrics.flush()
+        if DEBUG_MODE:
+            print("Save file writes:", self.streak.store.stats())
+        self.root.destroy()
+
+    def show_metrics(self, event=None):
+        # Debug panel (F12): per-path call counts and latencies, refreshed every second
+        if hasattr(self, 'metrics_window') and self.metrics_window.winfo_exists():
+            self.metrics_window.lift()
+            return
+
+        self.metrics_window = tk.Toplevel(self.root)
+        self.metrics_window.title("StreakStep Metrics")
+        self.metrics_window.configure(bg="#1C2833")
+        text = tk.Label(self.metrics_window, font=("Courier", 9), fg="#ECF0F1", bg="#1C2833", justify="left", anchor="nw")
+        text.pack(fill="both", expand=True, padx=10, pady=10)
+
+        def refresh():
+            if not self.metrics_window.winfo_exists():
+                return
+            writes = self.streak.store.stats()
+            lines = self.metrics.summary_lines()
+            lines.append("")
+            lines.append(f"save file writes: {writes['performed']} done, {writes['avoided']} avoided")
+            text.config(text="\n".join(lines))
+            self.metrics_window.after(1000, refresh)
+
+        refresh()
 
     def open_bible(self):
+        import webbrowser  # only needed once someone clicks the button
         webbrowser.open("https://www.bible.com/bible")
 
     def failed(self):
-        self.data = {
-            "streak": 0,
-            "goal_days": 1,
-            "last_goal_start": datetime.now()
-        }
-        self.save_data()
-        self.update_timer()
+        self.streak.failed()
+        self.scheduler.wake(self.streak.name)
 
     def simulate_day(self):
-        self.data["last_goal_start"] -= timedelta(days=1)
-        self.update_timer()
+        self.streak.shift_start(days=-1)
+        self.scheduler.wake(self.streak.name)
 
     def toggle_timer_mode(self, event=None):
         self.full_timer_mode = not self.full_timer_mode
-        self.update_timer()
+        self.scheduler.wake(self.streak.name)
+
+    # === Habits ===
+    def layout_habits(self):
+        # Only runs when a habit is added or removed; the rows update themselves after that
+        for label in self.habit_labels.values():
+            self.label_texts.pop(label, None)
+        for child in self.habits_frame.winfo_children():
+            child.destroy()
+        self.habit_labels = {}
+
+        others = self.trackers.names()[1:]
+        for row, name in enumerate(others):
+            label = tk.Label(self.habits_frame, font=("Helvetica", 10), fg="#ECF0F1", bg="#2C3E50", anchor="w")
+            label.grid(row=row, column=0, sticky="we")
+            label.bind("<Button-3>", lambda e, n=name: self.remove_habit(n))
+            tk.Button(
+                self.habits_frame, text="✗", font=("Helvetica", 9), bg="#E25546", fg="white", bd=0,
+                command=lambda n=name: self.habit_failed(n)
+            ).grid(row=row, column=1, padx=(6, 0), pady=1)
+            self.habit_labels[name] = label
+        self.habits_frame.columnconfigure(0, weight=1)
+        self.root.geometry(f"320x{250 + 28 * len(others)}")
+
+        for name in self.trackers.names():
+            self.update_timer(name)
+
+    def add_habit(self):
+        from tkinter import simpledialog  # only needed when someone adds a habit
+        name = simpledialog.askstring("New Habit", "What do you want to keep a streak for?", parent=self.root)
+        if name is None:
+            return
+        try:
+            model = self.trackers.add(name)
+        except ValueError as e:
+            messagebox.showwarning("New Habit", str(e))
+            return
+        self.metrics.instrument(model, "save_data", "streak.save_data")
+        self.layout_habits()
 
-    def update_timer(self):
-        now = datetime.now()
-        goal_end = self.data["last_goal_start"] + timedelta(days=self.data["goal_days"])
-        remaining = goal_end - now
+    def remove_habit(self, name):
+        if not messagebox.askyesno("Remove Habit", f"Stop tracking {name}?"):
+            return
+        self.trackers.remove(name)
+        self.scheduler.remove(name)
+        self.congrats_shown.discard(name)
+        self.layout_habits()
+
+    def habit_failed(self, name):
+        self.trackers.get(name).failed()
+        self.scheduler.wake(name)
+
+    def set_label(self, label, text):
+        # Skip the Tk round trip when the text hasn't changed
+        if self.label_texts.get(label) != text:
+            self.label_texts[label] = text
+            label.config(text=text)
+
+    def update_timer(self, habit=None):
+        # Redraws one habit and sleeps until its text or goal state next changes
+        model = self.trackers.get(habit) if habit else self.streak
+        if model is None:
+            return  # removed while its tick was pending
+        is_main = model is self.streak
+        full_timer = self.full_timer_mode and is_main
+        remaining = model.remaining()
 
         if remaining.total_seconds() <= 0:
-            self.timer_label.config(text="0 Days")
-            if not self.congrats_shown:
-                self.congrats_shown = True
-                self.ask_continue_or_reset()
+            text = "0 Days"
+            if model.name not in self.congrats_shown:
+                self.congrats_shown.add(model.name)
+                model.note_goal_reached()
+                self.queue_goal_prompt(model.name)
         else:
-            self.congrats_shown = False
-            if self.full_timer_mode:
+            self.congrats_shown.discard(model.name)
+            if full_timer:
                 days = remaining.days
                 hours, rem = divmod(remaining.seconds, 3600)
                 minutes, seconds = divmod(rem, 60)
-                self.timer_label.config(text=f"{days}d {hours}h {minutes}m {seconds}s")
-                self.debug_label.config(text="Mode: Full Timer (SPACE)")
+                text = f"{days}d {hours}h {minutes}m {seconds}s"
             else:
                 days = remaining.days + (1 if remaining.seconds > 0 else 0)
-                label = "Day left" if days == 1 else "Days left"
-                self.timer_label.config(text=f"{days} {label}")
-                self.debug_label.config(text="Mode: Simple Timer (SPACE)")
-
-        self.root.after(1000, self.update_timer)
-        self.save_data()
-
-    def ask_continue_or_reset(self):
-        result = messagebox.askyesno("Goal Reached!", "Well done! Want to add another day to your goal?")
+                text = f"{days} {'Day left' if days == 1 else 'Days left'}"
+
+        if is_main:
+            self.set_label(self.timer_label, text)
+            self.set_label(self.debug_label, "Mode: Full Timer (SPACE)" if self.full_timer_mode else "Mode: Simple Timer (SPACE)")
+        elif model.name in self.habit_labels:
+            self.set_label(self.habit_labels[model.name], f"{model.name}: {text}  (streak {model.data['streak']})")
+
+        # Sleep until the displayed text will actually change
+        self.scheduler.schedule(model.name, next_change_ms(remaining.total_seconds(), full_timer))
+        model.save_data()
+
+    def queue_goal_prompt(self, name):
+        # Goals can come due together; each habit gets its own dialog, one after another
+        if name not in self.goal_prompts:
+            self.goal_prompts.append(name)
+        if not self.prompting:
+            self.root.after_idle(self.next_goal_prompt)
+
+    def next_goal_prompt(self):
+        if self.prompting or not self.goal_prompts:
+            return
+        name = self.goal_prompts.popleft()
+        model = self.trackers.get(name)
+        if model is not None and model.goal_reached():  # may have been answered in another window
+            self.prompting = True
+            try:
+                self.ask_continue_or_reset(model)
+            finally:
+                self.prompting = False
+            # The goal state changed, redraw right away
+            self.scheduler.wake(name)
+        if self.goal_prompts:
+            self.root.after_idle(self.next_goal_prompt)
+
+    def ask_continue_or_reset(self, model=None):
+        model = model or self.streak
+        if len(self.trackers.models) > 1:
+            message = f"Well done on {model.name}! Want to add another day to your goal?"
+        else:
+            message = "Well done! Want to add another day to your goal?"
+        result = messagebox.askyesno("Goal Reached!", message)
         if result:
-            self.data["streak"] += 1
-            self.data["goal_days"] += 1
-            self.data["last_goal_start"] = datetime.now()
+            model.continue_goal()
         else:
-            self.data["streak"] = 0
-            self.data["goal_days"] = 1
-            self.data["last_goal_start"] = datetime.now()
-        self.save_data()
+            model.reset()
 
-    def load_data(self):
-        if os.path.exists(SAVE_FILE):
-            try:
-                with open(SAVE_FILE, "r") as f:
-                    data = json.load(f)
-                data["last_goal_start"] = datetime.fromisoformat(data["last_goal_start"])
-                return data
-            except Exception as e:
-                print("Error loading save file:", e)
-        return {
-            "streak": 0,
-            "goal_days": 1,
-            "last_goal_start": datetime.now()
-        }
-
-    def save_data(self):
-        data_to_save = self.data.copy()
-        data_to_save["last_goal_start"] = self.data["last_goal_start"].isoformat()
-        with open(SAVE_FILE, "w") as f:
-            json.dump(data_to_save, f)
+    def show_stats(self):
+        # Rollups are kept up to date as things happen, so this only reads them
+        if not self.stats.rollups["journal_seeded"]:
+            self.with_journal(lambda journal: self.show_stats())  # opening the journal counts the older entries once
+            return
+
+        stats_window = tk.Toplevel(self.root)
+        stats_window.title("Your Progress")
+        stats_window.geometry("340x360")
+        stats_window.configure(bg="#34495E")
+
+        totals = self.stats.totals()
+        tk.Label(stats_window, text=f"Current streak: {self.streak.data['streak']}", font=("Helvetica", 12, "bold"),
+                 fg="white", bg="#34495E").pack(pady=(10, 0))
+        tk.Label(stats_window, text=f"Best streak: {totals['best_streak']}   Goals reached: {totals['goals_reached']}",
+                 fg="white", bg="#34495E").pack()
+        tk.Label(stats_window, text=f"Victories: {totals['victories']}   Setbacks: {totals['setbacks']}   Resets: {totals['resets']}",
+                 fg="white", bg="#34495E").pack(pady=(0, 8))
+
+        period_var = tk.StringVar(value="day")
+        period_frame = tk.Frame(stats_window, bg="#34495E")
+        period_frame.pack()
+        table_frame = tk.Frame(stats_window, bg="#34495E")
+        table_frame.pack(pady=8)
+
+        def fill_table():
+            for child in table_frame.winfo_children():
+                child.destroy()
+            period = period_var.get()
+            count = {"day": 7, "week": 8, "month": 6}[period]
+            headers = ("", "Victories", "Setbacks", "Goals", "Resets")
+            for col, text in enumerate(headers):
+                tk.Label(table_frame, text=text, font=("Helvetica", 9, "bold"), fg="#BDC3C7", bg="#34495E").grid(row=0, column=col, padx=4)
+            for row, (key, bucket) in enumerate(self.stats.recent(period, count, self.clock.now()), start=1):
+                values = (key, bucket["victories"], bucket["setbacks"], bucket["goals_reached"], bucket["resets"])
+                for col, value in enumerate(values):
+                    tk.Label(table_frame, text=value, font=("Helvetica", 9), fg="white", bg="#34495E").grid(row=row, column=col, padx=4)
+
+        for value, text in (("day", "Days"), ("week", "Weeks"), ("month", "Months")):
+            tk.Radiobutton(
+                period_frame, text=text, variable=period_var, value=value, command=fill_table,
+                font=("Helvetica", 10), bg="#34495E", fg="white", selectcolor="#2C3E50"
+            ).pack(side="left", padx=4)
+        fill_table()
 
     def open_journal_menu(self):
         journal_window = tk.Toplevel(self.root)
         journal_window.title("Journal Entry")
 
-        journal_window.geometry("260x300")
+        journal_window.geometry("260x360")
         journal_window.configure(bg="#34495E")
         journal_window.resizable(False, False)
 
@@ -214,126 +512,283 @@ class StreakStepApp:
         )
         save_button.pack(pady=10)
 
+        # === Bulk import/export ===
+        bulk_frame = tk.Frame(journal_window, bg="#34495E")
+        bulk_frame.pack()
+        progress_label = tk.Label(journal_window, text="", font=("Helvetica", 9), fg="#BDC3C7", bg="#34495E")
+        for column, (text, kind) in enumerate((("Import...", "import"), ("Export...", "export"))):
+            tk.Button(
+                bulk_frame, text=text, font=("Helvetica", 9), bg="#5D6D7E", fg="white",
+                command=lambda k=kind: self.run_bulk_job(k, journal_window, progress_label)
+            ).grid(row=0, column=column, padx=4)
+        progress_label.pack(pady=(4, 0))
+
+    def run_bulk_job(self, kind, window, progress_label):
+        from tkinter import filedialog  # only needed for imports and exports
+        filetypes = [("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("All files", "*.*")]
+        if kind == "import":
+            path = filedialog.askopenfilename(parent=window, title="Import Journal Entries", filetypes=filetypes)
+        else:
+            path = filedialog.asksaveasfilename(parent=window, title="Export Journal Entries", filetypes=filetypes,
+                                                defaultextension=".csv")
+        if not path:
+            return
+
+        if kind == "import":
+            text = "{read} read, {added} added"
+        else:
+            text = "{written}/{total} written"
+        cancel_button = tk.Button(window, text="Cancel", font=("Helvetica", 9), bg="#7F8C8D", fg="white")
+        cancel_button.pack(pady=(2, 0))
+
+        def finish(label_text=""):
+            if progress_label.winfo_exists():
+                progress_label.config(text=label_text)
+            if cancel_button.winfo_exists():
+                cancel_button.destroy()
+
+        def on_progress(progress):
+            if progress_label.winfo_exists():
+                progress_label.config(text=text.format(**progress))
+
+        def on_done(progress, error):
+            if error is not None:
+                messagebox.showerror("Journal", f"Couldn't {kind} {path}:\n{error}")
+            elif kind == "import":
+                messagebox.showinfo("Import Finished", f"{progress['added']} added, {progress['skipped']} duplicates "
+                                                       f"skipped, {progress['invalid']} invalid.")
+            else:
+                messagebox.showinfo("Export Finished", f"{progress['written']} entries written.")
+            finish()
+
+        def start(journal):
+            # A job is a generator, so it runs on the journal thread a batch at a time and can stop between batches
+            if kind == "import":
+                job = lambda: import_entries(journal, path, ENTRY_TYPES, batch_size=1000)
+            else:
+                job = lambda: export_entries(journal, path, batch_size=1000)
+            task = self.tasks.run(job, lane="journal", on_done=on_done, on_progress=on_progress)
+
+            def cancel():
+                task.cancel()  # an import keeps the batches already added, an export leaves no file behind
+                finish("Cancelled.")
+
+            cancel_button.config(command=cancel)
+
+        self.with_journal(start, on_error=finish)
+
     def save_journal_entry(self, title, entry_type, window):
         if not title.strip():
             messagebox.showwarning("Missing Title", "Please enter a title.")
             return
 
-        desc = self.description.get("1.0", "end").strip()
-        entry = {
-            "title": title.strip(),
-            "type": entry_type,
-            "description": desc,
-            "timestamp": datetime.now().isoformat()
-        }
-        print(entry)
-
-        entries = []
-        if os.path.exists(JOURNAL_FILE):
-            with open(JOURNAL_FILE, "r") as f:
-                try:
-                    entries = json.load(f)
-                except:
-                    pass
+        desc = self.description.get("1.0", "end")
+        entry = make_entry(title, entry_type, desc, self.clock.now())
+        window.withdraw()  # kept until the entry is saved, so nothing is lost if saving fails
 
-        entries.insert(0, entry)  # newest first
-
-        with open(JOURNAL_FILE, "w") as f:
-            json.dump(entries, f, indent=2)
+        def saved(entry):
+            print(entry)
+            window.destroy()
+            self.show_journal_entries()
 
-        window.destroy()
-        self.show_journal_entries()
+        self.with_journal(
+            lambda journal: self.journal_task(journal.add, entry, on_done=saved, on_error=window.deiconify,
+                                              what="save the entry"),
+            on_error=window.deiconify
+        )
 
     def show_journal_entries(self):
 
-        # Close old entries window if open
+        # Already open: it keeps itself up to date, just bring it forward
         if hasattr(self, 'entries_window') and self.entries_window.winfo_exists():
-            self.entries_window.destroy()
+            self.entries_window.lift()
+            return
+
+        self.with_journal(self.open_entries_window)
 
-        if not os.path.exists(JOURNAL_FILE):
+    def open_entries_window(self, journal):
+        if hasattr(self, 'entries_window') and self.entries_window.winfo_exists():
+            self.entries_window.lift()  # asked for twice while the journal was loading
             return
 
-        with open(JOURNAL_FILE, "r") as f:
-             entries = json.load(f)
+        entries = journal.newest_first(placeholders=True)
+        if not len(entries):
+            return
 
         self.entries_window = tk.Toplevel(self.root)
         self.entries_window.title("Your Journal Entries")
-        self.entries_window.geometry("320x400")
+        self.entries_window.geometry("320x460")
         self.entries_window.configure(bg="#1C2833")
+        window = self.entries_window
+
+        # === Search Bar ===
+        search_frame = tk.Frame(self.entries_window, bg="#1C2833")
+        search_frame.pack(fill="x", padx=10, pady=(8, 2))
+
+        search_var = tk.StringVar()
+        tk.Entry(search_frame, textvariable=search_var, font=("Helvetica", 10)).pack(side="left", fill="x", expand=True)
+
+        type_var = tk.StringVar(value="all")
+        type_menu = tk.OptionMenu(search_frame, type_var, "all", "victory", "setback")
+        type_menu.config(bg="#34495E", fg="white", highlightthickness=0, width=6)
+        type_menu.pack(side="left", padx=(6, 0))
+
+        date_frame = tk.Frame(self.entries_window, bg="#1C2833")
+        date_frame.pack(fill="x", padx=10, pady=(0, 6))
+
+        from_var = tk.StringVar()
+        to_var = tk.StringVar()
+        tk.Label(date_frame, text="From", font=("Helvetica", 9), fg="#95A5A6", bg="#1C2833").pack(side="left")
+        tk.Entry(date_frame, textvariable=from_var, width=11, font=("Helvetica", 9)).pack(side="left", padx=(4, 8))
+        tk.Label(date_frame, text="To", font=("Helvetica", 9), fg="#95A5A6", bg="#1C2833").pack(side="left")
+        tk.Entry(date_frame, textvariable=to_var, width=11, font=("Helvetica", 9)).pack(side="left", padx=4)
+        tk.Label(date_frame, text="YYYY-MM-DD", font=("Helvetica", 8), fg="#5D6D7E", bg="#1C2833").pack(side="left")
+
+        # === Virtualized Entry List ===
+        # Only the rows in view get widgets, they're recycled while scrolling.
+        # Rows of archived months show as placeholders while the month is read on the journal thread.
+        loading = set()  # archived months on their way
+
+        def month_loaded(month):
+            loading.discard(month)
+            if window.winfo_exists():
+                entry_list.items_changed()
+
+        def fill_row(frame, entry):
+            if isinstance(entry, ArchivedRow) and entry.month not in loading:
+                month = entry.month
+                loading.add(month)
+                self.journal_task(journal.load_month, month, on_done=lambda result: month_loaded(month),
+                                  on_error=lambda: loading.discard(month), what="read archived entries")
+            self.fill_entry_row(frame, entry)
+
+        entry_list = VirtualList(self.entries_window, self.make_entry_row, fill_row, key=lambda entry: entry.id)
+        entry_list.pack(fill="both", expand=True)
+        self.metrics.instrument(entry_list, "refresh", "journal.render_rows")
+        entry_list.set_items(entries)
+
+        pending = [None]
+        searching = [None]  # the search task on its way, if any
+
+        def current_filter():
+            entry_type = type_var.get() if type_var.get() != "all" else None
+            start, end = date_bounds(from_var.get(), to_var.get())
+            if not search_var.get().strip() and not entry_type and not start and not end:
+                return None
+            return search_var.get(), entry_type, start, end
+
+        def show_results(entries):
+            searching[0] = None
+            if window.winfo_exists():
+                entry_list.set_items(entries)
+
+        def run_search():
+            pending[0] = None
+            if searching[0] is not None:
+                searching[0].cancel()  # typed on since, its results would only flash by
+                searching[0] = None
+            search = current_filter()
+            if search is None:
+                entry_list.set_items(journal.newest_first(placeholders=True))
+            else:
+                # The first search may have to build the index or read archived months
+                searching[0] = self.journal_task(journal.search, *search, on_done=show_results,
+                                                 what="search the journal")
+
+        def schedule_search(*args):
+            # Wait for a pause in typing before searching
+            if pending[0] is not None:
+                window.after_cancel(pending[0])
+            pending[0] = window.after(150, run_search)
+
+        for var in (search_var, type_var, from_var, to_var):
+            var.trace_add("write", schedule_search)
+
+        def list_changed():
+            # The unfiltered list is a live view of the journal, so only the
+            # changed rows get filled again; a filtered one reruns its search
+            if not window.winfo_exists():
+                return
+            if current_filter() is None:
+                entry_list.items_changed()
+            else:
+                schedule_search()
 
-          # === Scrollable Frame Setup ===
-        canvas = tk.Canvas(self.entries_window, bg="#1C2833", highlightthickness=0)
-        scrollbar = tk.Scrollbar(self.entries_window, orient="vertical", command=canvas.yview)
-        scroll_frame = tk.Frame(canvas, bg="#1C2833")
+        def on_journal_change(op, entry, old):
+            self.tasks.call_soon(list_changed)  # changes happen on the journal thread
 
-        scroll_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
+        def on_destroy(event):
+            if event.widget is window and on_journal_change in journal.listeners:
+                journal.listeners.remove(on_journal_change)
 
-        canvas.create_window((0, 0), window=scroll_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
+        journal.listeners.append(on_journal_change)
+        window.bind("<Destroy>", on_destroy)
 
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+    def make_entry_row(self, parent):
+        frame = tk.Frame(parent, bg="#1C2833", padx=10, pady=3)
 
-        # === Add Entry Buttons ===
-        for entry in entries:
-            color = "#2ECC71" if entry["type"] == "victory" else "#E74C3C"
+        frame.star = tk.Label(frame, text="✦", font=("Helvetica", 14), bg="#1C2833")
+        frame.star.pack(side="left")
 
-            frame = tk.Frame(scroll_frame, bg="#1C2833")
-            frame.pack(fill="x", padx=10, pady=3)
-
-            tk.Label(frame, text="✦", font=("Helvetica", 14), fg=color, bg="#1C2833").pack(side="left")
+        frame.entry_btn = tk.Button(
+            frame,
+            font=("Helvetica", 10),
+            fg="white",
+            bg="#1C2833",
+            bd=0,
+            activebackground="#34495E",
+            anchor="w"
+        )
+        frame.entry_btn.pack(side="left", padx=8, fill="x", expand=True)
+        return frame
 
-            entry_btn = tk.Button(
-                frame,
-                text=entry["title"],
-                font=("Helvetica", 10),
-                fg="white",
-                bg="#1C2833",
-                bd=0,
-                activebackground="#34495E",
-                anchor="w",
-                command=lambda e=entry: self.open_entry_view(e)
-            )
-            entry_btn.pack(side="left", padx=8, fill="x", expand=True)
+    def fill_entry_row(self, frame, entry):
+        if isinstance(entry, ArchivedRow):
+            frame.star.config(fg="#5D6D7E")
+            frame.entry_btn.config(text="Loading…", command=lambda: None)
+            return
+        color = "#2ECC71" if entry.type == "victory" else "#E74C3C"
+        frame.star.config(fg=color)
+        frame.entry_btn.config(text=entry.title, command=lambda e=entry: self.open_entry_view(e))
 
     def open_entry_view(self, entry):
+        # The list only keeps titles in memory, the description is read on the journal thread
+        self.journal_task(self._journal.get_full, entry.id, on_done=self.show_entry_view, what="read the entry")
+
+    def show_entry_view(self, entry):
+        if entry is None:
+            return  # deleted meanwhile
         view_window = tk.Toplevel(self.root)
-        view_window.title(f"View Entry: {entry['title']}")
+        view_window.title(f"View Entry: {entry.title}")
         view_window.geometry("350x550")
         view_window.configure(bg="#34495E")
 
         # Display Title
         tk.Label(view_window, text="Title:", bg="#34495E", fg="white", font=("Helvetica", 10, "bold")).pack(anchor="w", padx=10, pady=(10,0))
-        tk.Label(view_window, text=entry["title"], bg="#34495E", fg="white").pack(anchor="w", padx=10, pady=(0,10))
+        tk.Label(view_window, text=entry.title, bg="#34495E", fg="white").pack(anchor="w", padx=10, pady=(0,10))
 
         # Display Type
         tk.Label(view_window, text="Type:", bg="#34495E", fg="white", font=("Helvetica", 10, "bold")).pack(anchor="w", padx=10)
-        tk.Label(view_window, text=entry["type"], bg="#34495E", fg="white").pack(anchor="w", padx=10, pady=(0,10))
+        tk.Label(view_window, text=entry.type, bg="#34495E", fg="white").pack(anchor="w", padx=10, pady=(0,10))
 
         # Display Description
         tk.Label(view_window, text="Description:", bg="#34495E", fg="white", font=("Helvetica", 10, "bold")).pack(anchor="w", padx=10)
         desc_text = tk.Text(view_window, width=40, height=16, bg="#2C3E50", fg="white", relief="flat")
-        desc_text.insert("1.0", entry.get("description", ""))
+        desc_text.insert("1.0", entry.description)
         desc_text.config(state="disabled")  # make read-only
         desc_text.pack(padx=10, pady=(0,10))
 
         def delete_entry():
-            if not os.path.exists(JOURNAL_FILE):
-                return
-
-            with open(JOURNAL_FILE, "r") as f:
-                entries = json.load(f)
             confirm = messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this entry?")
             if confirm:
-                entries.remove(entry)
-            with open(JOURNAL_FILE, "w") as f:
-                json.dump(entries, f, indent=2)
+                delete_btn.config(state="disabled")
+                self.journal_task(self._journal.delete, entry.id, on_done=deleted, what="delete the entry",
+                                  on_error=lambda: delete_btn.config(state="normal"))
+
+        def deleted(result):
             messagebox.showinfo("Deleted", "Entry deleted successfully!")
-            view_window.destroy()
-            self.show_journal_entries()
+            if view_window.winfo_exists():
+                view_window.destroy()
 
         delete_btn = tk.Button(view_window, text="Delete Entry", bg="#E74C3C", fg="white", command=delete_entry)
         delete_btn.pack(pady=10)
@@ -342,6 +797,74 @@ class StreakStepApp:
                      command=lambda: self.open_entry_edit(entry, view_window))
         edit_btn.pack(pady=5)
 
+        history_btn = tk.Button(view_window, text="History", bg="#7F8C8D", fg="white",
+                     command=lambda: self.open_entry_history(entry, view_window))
+        history_btn.pack(pady=5)
+
+    def open_entry_history(self, entry, view_window):
+        # Rebuilding old texts from their deltas happens on the journal thread, next to the edits that write them
+        self.journal_task(self.history.history, entry.id, what="read the entry's history",
+                          on_done=lambda versions: self.show_entry_history(entry, view_window, versions))
+
+    def show_entry_history(self, entry, view_window, versions):
+        if not view_window.winfo_exists():
+            return
+        if not versions:
+            messagebox.showinfo("History", "This entry hasn't been edited yet.", parent=view_window)
+            return
+
+        history_window = tk.Toplevel(self.root)
+        history_window.title(f"History: {entry.title}")
+        history_window.geometry("350x480")
+        history_window.configure(bg="#34495E")
+
+        tk.Label(history_window, text="Versions (newest last):", bg="#34495E", fg="white",
+                 font=("Helvetica", 10, "bold")).pack(anchor="w", padx=10, pady=(10, 0))
+        version_list = tk.Listbox(history_window, height=8, bg="#2C3E50", fg="white", relief="flat",
+                                  exportselection=False)
+        for number, version in enumerate(versions, 1):
+            version_list.insert("end", f"{number}. {version.at[:16].replace('T', ' ')}  {version.title}")
+        version_list.pack(fill="x", padx=10, pady=(0, 10))
+
+        preview = tk.Text(history_window, width=40, height=12, bg="#2C3E50", fg="white", relief="flat", wrap="word")
+        preview.pack(padx=10, pady=(0, 10))
+
+        def show_version(event=None):
+            selection = version_list.curselection()
+            if not selection:
+                return
+            version = versions[selection[0]]
+            preview.config(state="normal")
+            preview.delete("1.0", "end")
+            preview.insert("1.0", f"{version.title} ({version.type})\n\n{version.description}")
+            preview.config(state="disabled")
+
+        def restore():
+            selection = version_list.curselection()
+            if not selection:
+                return
+            number = selection[0] + 1
+
+            def restored(result):
+                if history_window.winfo_exists():
+                    if result is None:
+                        messagebox.showinfo("Not Restored", "This entry has been deleted.", parent=history_window)
+                    else:
+                        messagebox.showinfo("Restored", f"Version {number} restored.", parent=history_window)
+                    history_window.destroy()
+                if view_window.winfo_exists():
+                    view_window.destroy()  # it shows the old text
+
+            self.journal_task(restore_version, self._journal, entry.id, versions[selection[0]], on_done=restored,
+                              what="restore the version")
+
+        version_list.bind("<<ListboxSelect>>", show_version)
+        version_list.selection_set("end")
+        show_version()
+
+        tk.Button(history_window, text="Restore This Version", bg="#2ECC71", fg="white",
+                  command=restore).pack(pady=5)
+
     def open_entry_edit(self, entry, view_window):
         view_window.destroy()  # Close the view window
 
@@ -351,40 +874,37 @@ class StreakStepApp:
 
         tk.Label(edit_window, text="Title:").pack()
         title_entry = tk.Entry(edit_window)
-        title_entry.insert(0, entry["title"])
+        title_entry.insert(0, entry.title)
         title_entry.pack()
 
         tk.Label(edit_window, text="Type:").pack()
-        type_var = tk.StringVar(value=entry["type"])
+        type_var = tk.StringVar(value=entry.type)
         type_menu = tk.OptionMenu(edit_window, type_var, "victory", "setback")
         type_menu.pack()
 
         tk.Label(edit_window, text="Description:").pack()
         desc_entry = tk.Text(edit_window, height=5, wrap="word")
-        desc_entry.insert("1.0", entry["description"])
+        desc_entry.insert("1.0", entry.description)
         desc_entry.pack()
 
         def save_changes():
-            if not os.path.exists(JOURNAL_FILE):
-                return
-
-            with open(JOURNAL_FILE, "r") as f:
-                entries = json.load(f)
-
-            # Update the entry by matching the timestamp
-            for i, e in enumerate(entries):
-                if e["timestamp"] == entry["timestamp"]:
-                    entries[i]["title"] = title_entry.get().strip()
-                    entries[i]["type"] = type_var.get()
-                    entries[i]["description"] = desc_entry.get("1.0", "end-1c").strip()
-                    break
+            fields = dict(
+                title=title_entry.get().strip(),
+                type=type_var.get(),
+                description=desc_entry.get("1.0", "end-1c").strip()
+            )
+            edit_window.withdraw()  # kept until the edit is saved, so nothing is lost if saving fails
 
-            with open(JOURNAL_FILE, "w") as f:
-                json.dump(entries, f, indent=2)
+            def saved(result):
+                if result is None:
+                    messagebox.showinfo("Not Saved", "This entry was deleted while you were editing it.")
+                else:
+                    messagebox.showinfo("Saved", "Entry updated successfully!")
+                edit_window.destroy()
 
-            messagebox.showinfo("Saved", "Entry updated successfully!")
-            edit_window.destroy()
-            self.show_journal_entries()
+            # The edit history's delta is worked out on the journal thread too
+            self.journal_task(lambda: self._journal.update(entry.id, **fields), on_done=saved,
+                              on_error=edit_window.deiconify, what="save the changes")
 
         save_btn = tk.Button(edit_window, text="Save Changes", bg="#2ECC71", fg="white", command=save_changes)
         save_btn.pack(pady=10)
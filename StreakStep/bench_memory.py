@@ -0,0 +1,85 @@
+# === JOURNAL MEMORY BENCHMARK ===
+# Builds a synthetic journal in memory twice, once as the old plain dicts and
+# once as compact Entry objects, and reports the bytes each takes per entry
+# and how long ordering them by timestamp takes. Ids and titles are created
+# up front and shared, so each layout is charged only for its own objects.
+#   python bench_memory.py                  1M entries
+#   python bench_memory.py --entries 200000 --json
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from journal_entry import Entry, datetime_to_us
+
+
+def synthetic_fields(count):
+    start = datetime(2020, 1, 1)
+    for i in range(count):
+        when = start + timedelta(seconds=97 * i, microseconds=i % 1000)
+        yield f"{i:032x}", f"Entry number {i}", "victory" if i % 3 else "setback", when
+
+
+def build_dicts(fields):
+    # The shape the list view used to keep: four string keys, ISO timestamp
+    return {
+        entry_id: {"id": entry_id, "title": title, "type": entry_type, "timestamp": when.isoformat()}
+        for entry_id, title, entry_type, when in fields
+    }
+
+
+def build_entries(fields):
+    return {
+        entry_id: Entry(entry_id, title, entry_type, datetime_to_us(when))
+        for entry_id, title, entry_type, when in fields
+    }
+
+
+def measure(build, fields):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    journal = build(fields)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    # Ordering work the store does on load: sort by (timestamp, id)
+    started = time.perf_counter()
+    if isinstance(next(iter(journal.values())), Entry):
+        sorted((e.ts, e.id) for e in journal.values())
+    else:
+        sorted((e["timestamp"], e["id"]) for e in journal.values())
+    sort_ms = (time.perf_counter() - started) * 1000
+    return journal, used, sort_ms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bytes per journal entry, dicts vs Entry.")
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    fields = list(synthetic_fields(args.entries))
+    results = {"entries": args.entries}
+    for name, build in (("dict", build_dicts), ("entry", build_entries)):
+        journal, used, sort_ms = measure(build, fields)
+        results[name] = {"bytes_per_entry": round(used / args.entries, 1), "sort_ms": round(sort_ms, 1)}
+        del journal
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print(f"{args.entries} entries")
+        for name in ("dict", "entry"):
+            r = results[name]
+            print(f"  {name:<6} {r['bytes_per_entry']:>8.1f} bytes/entry   sort {r['sort_ms']:>8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
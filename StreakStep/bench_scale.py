@@ -0,0 +1,481 @@
+# === SCALABILITY BENCHMARK ===
+# Generates synthetic journals (1k to 1M entries by default, descriptions of a
+# realistic length: a few sentences mostly, now and then a page) and measures,
+# for each size, in fresh processes working on a copy of it:
+#   storage   journal load cold and from the snapshot, the first search, and
+#             the latency of adding, reading, editing and deleting an entry
+#   streak    save_data ticks per second with a change every so often, and
+#             the latency of ticks and of the writes
+#   ui        the app's own save_journal_entry, save_changes, delete_entry
+#             and show_journal_entries, from the call until the result is
+#             on screen
+# Every process also reports its peak RSS. Results go to a JSON file, so runs
+# from different commits can be compared.
+# The UI part needs a display. Without one it starts Xvfb if it is installed,
+# otherwise it is skipped and the results say so.
+#   python bench_scale.py                                  all sizes, bench_scale.json
+#   python bench_scale.py --sizes 1000,10000 --out before.json
+#   python bench_scale.py --keep-data ~/bench-journals     generate once, reuse next time
+# The 1M journal takes about 1 GB on disk, twice over while a copy is in use.
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from core import SNAPSHOT_FILE, open_journal, open_storage, open_trackers
+from journal_entry import Entry, datetime_to_us
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+SEED = 2024
+SPAN_DAYS = 5 * 365      # the journal covers the last five years, so the archive has its share too
+VOCABULARY = 5000
+GENERATE_BATCH = 5000
+RECENT = 1000            # edits and deletes pick from the newest entries, like people do
+TICK_SECONDS = 3
+WRITE_EVERY = 1000       # ticks between streak changes
+READY_FILE = "bench_ready.json"
+
+
+# === Synthetic journals ===
+def make_vocabulary(rng, count=VOCABULARY):
+    syllables = ["ka", "lo", "mi", "ren", "sta", "tu", "vel", "ar", "en", "is", "or", "pa", "qui", "ro", "se", "th"]
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+
+def synthetic_entries(count, seed=SEED, end=None):
+    # Oldest first. Words follow Zipf's law and description lengths a log-normal
+    # curve (median 40 words, one in a hundred over 250), one in ten is empty.
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    end = datetime_to_us(end or datetime.now())
+    start = end - SPAN_DAYS * 86400 * 10**6
+    step = (end - start) // count
+    for i in range(count):
+        words = 0 if rng.random() < 0.1 else min(int(rng.lognormvariate(3.7, 0.8)), 1500)
+        title = " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(2, 6))).capitalize()
+        yield Entry(
+            f"{rng.getrandbits(128):032x}", title, "victory" if rng.random() < 0.7 else "setback",
+            start + i * step + rng.randrange(step), " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=words))
+        )
+
+
+def generate(folder, size, backend):
+    # Written through the store like an import, then opened once more so the old
+    # months get archived the way they would be in a journal that grew over years
+    os.makedirs(folder, exist_ok=True)
+    started = time.perf_counter()
+    data_storage = open_storage(folder, backend)
+    journal = open_journal(data_storage)
+    entries = synthetic_entries(size)
+    while True:
+        batch = list(itertools.islice(entries, GENERATE_BATCH))
+        if not batch:
+            break
+        journal.add_many(batch)
+    journal.close()
+    data_storage.close()
+    data_storage = open_storage(folder, backend)
+    open_journal(data_storage).close()
+    data_storage.close()
+    with open(os.path.join(folder, READY_FILE), "w") as f:
+        json.dump({"entries": size, "backend": backend, "seed": SEED}, f)
+    return time.perf_counter() - started
+
+
+def journal_folder(base, size, backend):
+    folder = os.path.join(base, f"{backend}-{size}")
+    ready = os.path.join(folder, READY_FILE)
+    if os.path.exists(ready):
+        with open(ready, "r") as f:
+            if json.load(f) == {"entries": size, "backend": backend, "seed": SEED}:
+                return folder, None
+    shutil.rmtree(folder, ignore_errors=True)
+    return folder, generate(folder, size, backend)
+
+
+# === Measuring ===
+def percentiles(samples, scale=1.0):
+    # Nearest-rank percentiles of samples, times scale
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def at(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * scale, 3)
+
+    return {"count": len(ordered), "p50": at(50), "p90": at(90), "p99": at(99), "max": round(ordered[-1] * scale, 3)}
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return windows_peak_rss_mb()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KB elsewhere
+
+
+def windows_peak_rss_mb():
+    import ctypes
+    from ctypes import wintypes
+
+    class Counters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage"
+            )
+        ]
+
+    counters = Counters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return round(counters.PeakWorkingSetSize / (1024 * 1024), 1)
+
+
+def elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
+def storage_child(folder, backend, samples):
+    # Runs inside the measured process
+    rng = random.Random(SEED + 1)
+    results = {}
+
+    snapshot = os.path.join(folder, SNAPSHOT_FILE)
+    if os.path.exists(snapshot):
+        os.remove(snapshot)
+    started = time.perf_counter()
+    data_storage = open_storage(folder, backend)
+    journal = open_journal(data_storage)
+    results["load_cold_ms"] = elapsed_ms(started)
+    results["entries"] = len(journal)
+    started = time.perf_counter()
+    journal.search(journal.newest_first()[0].title.split()[0])
+    results["first_search_ms"] = elapsed_ms(started)
+    started = time.perf_counter()
+    journal.close()
+    data_storage.close()
+    results["close_ms"] = elapsed_ms(started)
+    # Freed here, or rebinding the names below would free it inside the warm load's timing
+    del journal, data_storage
+    gc.collect()
+
+    started = time.perf_counter()
+    data_storage = open_storage(folder, backend)
+    journal = open_journal(data_storage)
+    results["load_warm_ms"] = elapsed_ms(started)  # from the snapshot; the same as cold where there is none
+    results["rss_after_load_mb"] = peak_rss_mb()
+    journal.index  # the first change would load it otherwise
+
+    # Changes the way the app makes them: a new entry is the newest, edits and deletes hit recent ones
+    newest = journal.newest_first()
+    recent = [newest[i].id for i in range(min(RECENT, len(newest)))]
+    now = datetime.now()
+    timings = {"add": [], "read": [], "edit": [], "delete": []}
+    for i, entry in enumerate(synthetic_entries(samples, seed=SEED + 2, end=now + timedelta(days=1))):
+        started = time.perf_counter()
+        journal.add(entry)
+        timings["add"].append(elapsed_ms(started))
+        started = time.perf_counter()
+        full = journal.get_full(rng.choice(recent))
+        timings["read"].append(elapsed_ms(started))
+        started = time.perf_counter()
+        journal.update(full.id, description=full.description + " Edited.")
+        timings["edit"].append(elapsed_ms(started))
+        started = time.perf_counter()
+        journal.delete(recent.pop(rng.randrange(len(recent))))
+        timings["delete"].append(elapsed_ms(started))
+    for name, values in timings.items():
+        results[name + "_ms"] = percentiles(values)
+    journal.close()
+    results["peak_rss_mb"] = peak_rss_mb()  # before the streak part, whose tick timings would count too
+
+    results["streak"] = streak_ticks(data_storage)
+    data_storage.close()
+    return results
+
+
+def streak_ticks(data_storage, seconds=TICK_SECONDS):
+    # The timer's save_data on every tick, with a change (and so a write) every WRITE_EVERY ticks.
+    # No Tk here, so the store writes a change straight away instead of two seconds later.
+    trackers = open_trackers(data_storage)
+    model = trackers.main
+    ticks = array("q")  # millions of them
+    writes = []
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        count += 1
+        if count % WRITE_EVERY == 0:
+            tick = time.perf_counter_ns()
+            model.shift_start(0)
+            model.save_data()
+            writes.append(time.perf_counter_ns() - tick)
+            continue
+        tick = time.perf_counter_ns()
+        model.save_data()
+        ticks.append(time.perf_counter_ns() - tick)
+    return {
+        "ticks_per_s": round(count / (time.perf_counter() - started)),
+        "tick_us": percentiles(ticks, 1e-3),
+        "write_ms": percentiles(writes, 1e-6),
+        "writes": trackers.stats()
+    }
+
+
+def ui_child(samples):
+    # Runs inside the measured process, in the data folder, with a display
+    import tkinter as tk
+    import StreakStep
+
+    # Dialogs would wait for a click: answer them and note when the confirmations come up
+    confirmations = []
+    errors = []
+    StreakStep.messagebox.showinfo = lambda *args, **kwargs: confirmations.append(time.perf_counter())
+    StreakStep.messagebox.askyesno = lambda *args, **kwargs: True
+    StreakStep.messagebox.showerror = lambda title, message, **kwargs: errors.append(message)
+    StreakStep.messagebox.showwarning = lambda title, message, **kwargs: errors.append(message)
+
+    root = tk.Tk()
+    app = StreakStep.StreakStepApp(root)
+    rng = random.Random(SEED + 3)
+    timings = {"journal_load": [], "show_journal_entries": [], "save_journal_entry": [], "save_changes": [],
+               "delete_entry": []}
+
+    def toplevel(title):
+        return [w for w in root.winfo_children() if isinstance(w, tk.Toplevel) and w.title() == title][-1]
+
+    def widget(parent, kind, text=None):
+        return next(w for w in parent.winfo_children() if isinstance(w, kind) and (text is None or w.cget("text") == text))
+
+    def pick_two(journal):
+        # Two recent entries, in full: one to edit, one to delete
+        recent = journal.newest_first()
+        return [journal.get_full(recent[rng.randrange(min(RECENT, len(recent)))].id) for _ in range(2)]
+
+    def script():
+        # Each yield hands back a check; the next step waits until it says done
+        started = time.perf_counter()
+        app.with_journal(lambda journal: None)
+        yield lambda: app._journal is not None
+        timings["journal_load"].append(elapsed_ms(started))
+
+        for i in range(samples):
+            # The journal is only touched on its own thread, like the app does it; this also
+            # waits for whatever is still queued there (the search index, the last change)
+            picked = []
+            app.journal_task(pick_two, app._journal, on_done=picked.append, what="pick entries")
+            yield lambda: picked
+            to_edit, to_delete = picked[0]
+
+            if hasattr(app, "entries_window") and app.entries_window.winfo_exists():
+                app.entries_window.destroy()
+            started = time.perf_counter()
+            app.show_journal_entries()
+            yield lambda: hasattr(app, "entries_window") and app.entries_window.winfo_exists()
+            root.update_idletasks()  # the rows are drawn
+            timings["show_journal_entries"].append(elapsed_ms(started))
+
+            window = tk.Toplevel(root)
+            app.description = tk.Text(window)
+            app.description.insert("1.0", "Walked to the river and back, felt good about it.")
+            started = time.perf_counter()
+            app.save_journal_entry(f"Benchmark {i}", "victory", window)
+            yield lambda: not window.winfo_exists()
+            timings["save_journal_entry"].append(elapsed_ms(started))
+
+            app.open_entry_edit(to_edit, tk.Toplevel(root))
+            edit_window = toplevel("Edit Journal Entry")
+            widget(edit_window, tk.Text).insert("end", " Edited.")
+            shown = len(confirmations)
+            started = time.perf_counter()
+            widget(edit_window, tk.Button, "Save Changes").invoke()
+            yield lambda: len(confirmations) > shown
+            timings["save_changes"].append(elapsed_ms(started))
+
+            app.show_entry_view(to_delete)
+            view_window = toplevel(f"View Entry: {to_delete.title}")
+            shown = len(confirmations)
+            started = time.perf_counter()
+            widget(view_window, tk.Button, "Delete Entry").invoke()
+            yield lambda: len(confirmations) > shown
+            timings["delete_entry"].append(elapsed_ms(started))
+
+    def run(steps):
+        def step():
+            if errors:
+                finish()
+                return
+            try:
+                done = next(steps)
+            except StopIteration:
+                finish()
+                return
+            poll(done)
+
+        def poll(done):
+            if done() or errors:
+                step()
+            else:
+                root.after(1, poll, done)
+
+        root.after(0, step)
+
+    def finish():
+        results = {name + "_ms": percentiles(values) for name, values in timings.items()}
+        if errors:
+            results["errors"] = errors
+        results["peak_rss_mb"] = peak_rss_mb()
+        print("BENCH", json.dumps(results))
+        app.on_close()
+
+    run(script())
+    root.mainloop()
+
+
+# === Running it ===
+def run_child(kind, folder, backend, samples, env=None):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", kind, "--backend", backend,
+         "--samples", str(samples), folder],
+        cwd=folder, capture_output=True, text=True, env=dict(os.environ, STREAKSTEP_STORAGE=backend, **(env or {}))
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith("BENCH ")]
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(f"The {kind} benchmark failed:\n" + result.stderr.strip())
+    return json.loads(lines[-1][len("BENCH "):])
+
+
+def start_display():
+    # -> (env for the UI process, Xvfb process to stop afterwards), or None if there's no way to get a display
+    if sys.platform in ("win32", "darwin") or os.environ.get("DISPLAY"):
+        return {}, None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        return None
+    for number in range(99, 199):
+        if not os.path.exists(f"/tmp/.X11-unix/X{number}") and not os.path.exists(f"/tmp/.X{number}-lock"):
+            break
+    process = subprocess.Popen([xvfb, f":{number}", "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(f"/tmp/.X11-unix/X{number}"):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            return None
+        time.sleep(0.05)
+    return {"DISPLAY": f":{number}"}, process
+
+
+def measure_size(base, size, backend, samples, ui_samples, display, no_ui):
+    folder, generate_s = journal_folder(base, size, backend)
+    results = {"generate_s": round(generate_s, 1) if generate_s is not None else None}
+    parts = [("storage", samples, {})]
+    if display is not None:
+        parts.append(("ui", ui_samples, display[0]))
+    else:
+        results["ui"] = {"skipped": "--no-ui" if no_ui else "no display, and Xvfb isn't installed"}
+    for kind, count, env in parts:
+        # A copy each time, so runs and parts never see each other's changes
+        work = tempfile.mkdtemp(prefix=f"streakstep-{kind}-", dir=base)
+        try:
+            shutil.rmtree(work)
+            shutil.copytree(folder, work)
+            results[kind] = run_child(kind, work, backend, count, env)
+        except RuntimeError as e:
+            results[kind] = {"failed": str(e)}  # the other part and the other sizes still count
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="StreakStep scalability benchmark over synthetic journals.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in SIZES), help="entries per journal, comma separated")
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--samples", type=int, default=200, help="adds, reads, edits and deletes per size")
+    parser.add_argument("--ui-samples", type=int, default=20, help="rounds of the UI operations per size")
+    parser.add_argument("--no-ui", action="store_true", help="leave out the UI part")
+    parser.add_argument("--keep-data", help="folder to keep the generated journals in and reuse them from")
+    parser.add_argument("--out", default="bench_scale.json", help="where to write the results")
+    parser.add_argument("--child", choices=("storage", "ui"), help=argparse.SUPPRESS)
+    parser.add_argument("folder", nargs="?", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child == "storage":
+        print("BENCH", json.dumps(storage_child(args.folder, args.backend, args.samples)))
+        return 0
+    if args.child == "ui":
+        ui_child(args.samples)
+        return 0
+
+    sizes = [int(size.replace("_", "")) for size in args.sizes.split(",")]
+    base = args.keep_data or tempfile.mkdtemp(prefix="streakstep-bench-")
+    os.makedirs(base, exist_ok=True)
+    display = None if args.no_ui else start_display()
+    results = {
+        "commit": git_commit(),
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "samples": args.samples,
+        "ui_samples": args.ui_samples,
+        "sizes": {}
+    }
+    try:
+        for size in sizes:
+            print(f"{size} entries...", file=sys.stderr, flush=True)
+            results["sizes"][str(size)] = measure_size(base, size, args.backend, args.samples, args.ui_samples,
+                                                       display, args.no_ui)
+            with open(args.out, "w") as f:
+                json.dump(results, f, indent=2)  # after every size, so a long run leaves something behind
+    finally:
+        if display is not None and display[1] is not None:
+            display[1].terminate()
+        if not args.keep_data:
+            shutil.rmtree(base, ignore_errors=True)
+
+    for size, result in results["sizes"].items():
+        storage = result["storage"]
+        if "failed" in storage:
+            print(f"{size:>8} entries  failed, see {args.out}")
+            continue
+        streak = storage["streak"]
+        print(f"{size:>8} entries  load {storage['load_cold_ms']:>9.1f} ms cold {storage['load_warm_ms']:>9.1f} ms warm  "
+              f"edit p99 {storage['edit_ms']['p99']:>7.2f} ms  {streak['ticks_per_s']:>8} ticks/s  "
+              f"RSS {storage['peak_rss_mb']} MB")
+    print(f"Results in {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+# === COLD-START BENCHMARK ===
+# Starts the app in a fresh Python process several times and measures the
+# time from process start to the first drawn frame and to the first
+# update_timer tick. Results are checked against startup_budget.json.
+#   python bench_startup.py                 run and compare against the budget
+#   python bench_startup.py --runs 20 --json
+# Needs a display (use xvfb-run on a headless machine).
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BUDGET_FILE = os.path.join(HERE, "startup_budget.json")
+FIXTURE_FILES = ("streakstep_data.json", "journal_entries.json")
+
+
+def child():
+    # Runs inside the measured process: same imports and startup as StreakStep.py
+    marks = {}
+    sys.path.insert(0, HERE)
+    import tkinter as tk
+    import StreakStep
+
+    original_tick = StreakStep.StreakStepApp.update_timer
+
+    def timed_tick(app, *args):
+        marks.setdefault("first_tick", time.time())
+        return original_tick(app, *args)
+
+    StreakStep.StreakStepApp.update_timer = timed_tick
+
+    root = tk.Tk()
+    root.bind("<Map>", lambda e: marks.setdefault("first_frame", time.time()), add="+")
+    app = StreakStep.StreakStepApp(root)
+
+    def finish():
+        if "first_frame" not in marks:
+            root.after(5, finish)
+            return
+        print("BENCH", json.dumps(marks))
+        app.on_close()
+
+    root.after(0, finish)
+    root.mainloop()
+
+
+def fresh_fixture():
+    data_dir = tempfile.mkdtemp(prefix="streakstep-bench-")
+    for name in FIXTURE_FILES:
+        if os.path.exists(os.path.join(HERE, name)):
+            shutil.copy(os.path.join(HERE, name), data_dir)
+    return data_dir
+
+
+def run_once(data_dir):
+    started = time.time()
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child"],
+        cwd=data_dir, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError("App failed to start:\n" + result.stderr.strip())
+    line = [l for l in result.stdout.splitlines() if l.startswith("BENCH ")][-1]
+    marks = json.loads(line[len("BENCH "):])
+    return {name: (stamp - started) * 1000 for name, stamp in marks.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StreakStep cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget", default=BUDGET_FILE)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return 0
+
+    # Each run gets its own copy of the data files, so no run starts from what
+    # the one before it migrated, indexed or saved
+    runs = []
+    for _ in range(args.runs):
+        data_dir = fresh_fixture()
+        try:
+            runs.append(run_once(data_dir))
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    results = {}
+    for name in ("first_frame", "first_tick"):
+        values = sorted(run[name] for run in runs)
+        results[name + "_ms"] = {
+            "median": round(statistics.median(values), 1),
+            "min": round(values[0], 1),
+            "max": round(values[-1], 1)
+        }
+
+    with open(args.budget, "r") as f:
+        budget = json.load(f)
+
+    failures = []
+    for name, limit in budget.items():
+        if results[name]["median"] > limit:
+            failures.append(f"{name}: median {results[name]['median']} ms is over the {limit} ms budget")
+
+    if args.json:
+        print(json.dumps({"runs": args.runs, "results": results, "budget": budget, "ok": not failures}, indent=2))
+    else:
+        for name, stats in results.items():
+            print(f"{name:<16} median {stats['median']:>7} ms  (min {stats['min']}, max {stats['max']}, budget {budget.get(name)})")
+    for failure in failures:
+        print("OVER BUDGET:", failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# === CLOCK ===
+# Local time shifted by the offset the network time sync measured. Until a
+# sync finishes (or if it never does) the last saved offset is used, or plain
+# local time if there isn't one.
+# Anything that needs the time takes a clock: now() for the wall clock and
+# monotonic() for measuring delays. The wall clock is the system's, read every
+# time: the monotonic clock stops while the machine sleeps and never hears of
+# the system's own corrections.
+# SimulatedClock stands in for SyncedClock in the headless simulation
+# (simulate.py) and only moves when told to.
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from persistence import atomic_write_json
+
+
+class SyncedClock:
+    def __init__(self, offset_file=None):
+        self.offset_file = offset_file
+        self.offset = 0.0       # seconds, server time minus local time
+        self.synced_at = None
+        self.load_offset()
+
+    def timestamp(self):
+        return time.time() + self.offset
+
+    def now(self):
+        return datetime.fromtimestamp(self.timestamp())
+
+    def local_timestamp(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def load_offset(self):
+        if not self.offset_file or not os.path.exists(self.offset_file):
+            return
+        try:
+            with open(self.offset_file, "r") as f:
+                saved = json.load(f)
+            self.offset = float(saved["offset"])
+            self.synced_at = saved.get("synced_at")
+        except Exception as e:
+            print("Error loading time offset:", e)
+
+    def set_offset(self, offset):
+        self.offset = offset
+        self.synced_at = datetime.now().isoformat()
+        if self.offset_file:
+            atomic_write_json(self.offset_file, {"offset": offset, "synced_at": self.synced_at})
+
+
+class SimulatedClock:
+    # Starts at `start` and stands still until advance_to()/advance() move it
+    def __init__(self, start):
+        self.start = start
+        self.elapsed = 0.0  # seconds since start
+        self.offset = 0.0
+        self.synced_at = None
+
+    def monotonic(self):
+        return self.elapsed
+
+    def timestamp(self):
+        return self.start.timestamp() + self.elapsed
+
+    def local_timestamp(self):
+        return self.timestamp()
+
+    def now(self):
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def advance(self, seconds):
+        self.advance_to(self.elapsed + seconds)
+
+    def advance_to(self, elapsed):
+        if elapsed < self.elapsed:
+            raise ValueError("A simulated clock can't go backwards")
+        self.elapsed = elapsed
+
+    def set_offset(self, offset):
+        pass  # nothing to sync against
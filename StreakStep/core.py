@@ -0,0 +1,364 @@
+# === STREAKSTEP CORE ===
+# The streak model and journal operations without any GUI. The Tk app and the
+# command line both sit on top of this, so nothing here may import tkinter
+# or anything network related.
+import os
+from datetime import date, datetime, timedelta
+
+from persistence import DataStore
+from clock import SyncedClock
+from entry_history import EntryHistory
+from journal_entry import Entry, datetime_to_us
+from journal_store import JournalStore
+from search_index import SearchIndex
+from streak_stats import StatsEngine
+from sync_log import open_change_log
+import storage
+
+# "json" keeps the plain files, "sqlite" moves everything into streakstep.db
+STORAGE_BACKEND = os.environ.get("STREAKSTEP_STORAGE", "json")
+TIME_OFFSET_FILE = "time_offset.json"
+SEARCH_INDEX_FILE = "journal_index.json"
+SNAPSHOT_FILE = "journal_snapshot.pickle"
+
+ENTRY_TYPES = ("victory", "setback")
+DEFAULT_HABIT = "Main"  # the one streak that existed before habits
+NEVER = datetime.min    # "updated" of a habit saved before habits kept one
+
+
+class StreakModel:
+    def __init__(self, store, clock, stats=None, name=DEFAULT_HABIT, saved=None):
+        self.store = store
+        self.clock = clock
+        self.stats = stats  # gets goal reached/extended and reset events for the history
+        self.name = name
+        self.data = self.load_data(saved)
+
+    def fresh_data(self):
+        return {
+            "streak": 0,
+            "goal_days": 1,
+            "last_goal_start": self.clock.now()
+        }
+
+    def load_data(self, saved=None):
+        # saved is this habit's part of the save file, otherwise the store has it
+        try:
+            data = self.store.load() if saved is None else dict(saved)
+            if data is not None:
+                data.pop("name", None)
+                data["last_goal_start"] = datetime.fromisoformat(data["last_goal_start"])
+                if "updated" in data:
+                    data["updated"] = datetime.fromisoformat(data["updated"])
+                return data
+        except Exception as e:
+            print("Error loading save file:", e)
+        return self.fresh_data()
+
+    def updated(self):
+        return self.data.get("updated", NEVER)
+
+    def mark_dirty(self):
+        self.data["updated"] = self.clock.now()  # newer than the other copy wins when merging
+        self.store.mark_dirty(self.data)
+
+    def save_data(self):
+        # Only writes if mark_dirty() was called since the last write
+        self.store.save(self.data)
+
+    # === Streak rules ===
+    def goal_end(self):
+        return self.data["last_goal_start"] + timedelta(days=self.data["goal_days"])
+
+    def remaining(self):
+        return self.goal_end() - self.clock.now()
+
+    def goal_reached(self):
+        return self.remaining().total_seconds() <= 0
+
+    def record(self, name, **extra):
+        if self.stats is not None:
+            self.stats.streak_event(name, self.clock.now(), self.data["streak"], self.data["goal_days"],
+                                    habit=self.name, **extra)
+
+    def note_goal_reached(self):
+        # Only once per goal, even if the app is restarted before the prompt is answered
+        reached_for = self.data["last_goal_start"].isoformat()
+        if self.data.get("goal_reached_for") == reached_for:
+            return
+        self.data["goal_reached_for"] = reached_for
+        self.record("goal_reached")
+        self.mark_dirty()
+
+    def failed(self):
+        self.record("reset", reason="failed")
+        self.data = self.fresh_data()
+        self.mark_dirty()
+
+    def continue_goal(self):
+        # Goal rollover: one more day on the goal, clock starts again
+        self.data["streak"] += 1
+        self.data["goal_days"] += 1
+        self.data["last_goal_start"] = self.clock.now()
+        self.record("goal_extended")
+        self.mark_dirty()
+
+    def reset(self):
+        self.record("reset", reason="declined")
+        self.data["streak"] = 0
+        self.data["goal_days"] = 1
+        self.data["last_goal_start"] = self.clock.now()
+        self.mark_dirty()
+
+    def shift_start(self, days):
+        self.data["last_goal_start"] += timedelta(days=days)
+        self.mark_dirty()
+
+    def status(self):
+        remaining = self.remaining()
+        return {
+            "habit": self.name,
+            "streak": self.data["streak"],
+            "goal_days": self.data["goal_days"],
+            "last_goal_start": self.data["last_goal_start"].isoformat(),
+            "goal_end": self.goal_end().isoformat(),
+            "seconds_left": max(remaining.total_seconds(), 0),
+            "goal_reached": remaining.total_seconds() <= 0
+        }
+
+
+class TrackerSet:
+    # Several habits, each with its own streak, goal and start time. They share
+    # one write-behind DataStore and are saved together as {"trackers": [...]}.
+    # Each StreakModel uses the set as its store, so any change saves them all.
+    # When another process saved too, merge() keeps whichever copy of each habit
+    # changed last; removed habits leave a timestamp behind so they stay removed.
+    def __init__(self, store, clock, stats=None):
+        self.store = store
+        self.clock = clock
+        self.engine = stats  # StatsEngine for the models; stats() below is the save file's write counts
+        self.models = {}
+        self.removed = {}  # name -> when it was removed
+        for saved in self.load_trackers():
+            self.models[saved["name"]] = StreakModel(self, clock, stats, name=saved["name"], saved=saved)
+        if not self.models:
+            # Saved straight away but not stamped "updated": an untouched default
+            # loses to any other copy when merging, e.g. one synced from elsewhere
+            self.models[DEFAULT_HABIT] = StreakModel(self, clock, stats, name=DEFAULT_HABIT)
+            self.mark_dirty(None)
+        store.merge = self.merge
+
+    def read_saved(self):
+        try:
+            saved = self.store.load()
+        except Exception as e:
+            print("Error loading save file:", e)
+            return None
+        if saved is None:
+            return None
+        if "trackers" not in saved:
+            return {"trackers": [dict(saved, name=DEFAULT_HABIT)]}  # a single streak from before habits
+        return saved
+
+    def load_trackers(self):
+        saved = self.read_saved()
+        if saved is None:
+            return []
+        self.removed = {name: datetime.fromisoformat(when) for name, when in saved.get("removed", {}).items()}
+        return saved["trackers"]
+
+    @property
+    def main(self):
+        return next(iter(self.models.values()))
+
+    def names(self):
+        return list(self.models)
+
+    def get(self, name):
+        return self.models.get(name)
+
+    def add(self, name):
+        name = name.strip()
+        if not name:
+            raise ValueError("Please enter a habit name.")
+        if name in self.models:
+            raise ValueError(f"There is already a habit called {name!r}.")
+        self.removed.pop(name, None)
+        model = self.models[name] = StreakModel(self, self.clock, self.engine, name=name)
+        model.mark_dirty()
+        return model
+
+    def remove(self, name):
+        if name not in self.models:
+            raise ValueError(f"No habit called {name!r}.")
+        if len(self.models) == 1:
+            raise ValueError("At least one habit has to stay.")
+        del self.models[name]
+        self.removed[name] = self.clock.now()
+        self.mark_dirty(None)
+
+    # === Changes from other processes ===
+    def merge(self, saved, prefer_theirs=False):
+        # Folds another process's saved state into ours, returns the combined state.
+        # prefer_theirs: a habit changed at the same moment in both (or never) takes
+        # their copy, so two syncing machines settle on one instead of trading them.
+        if "trackers" not in saved:
+            saved = {"trackers": [dict(saved, name=DEFAULT_HABIT)]}
+        for name, when in saved.get("removed", {}).items():
+            when = datetime.fromisoformat(when)
+            if when > self.removed.get(name, NEVER):
+                self.removed[name] = when
+        for theirs in saved["trackers"]:
+            name = theirs["name"]
+            model = self.models.get(name)
+            if model is None:
+                model = StreakModel(self, self.clock, self.engine, name=name, saved=theirs)
+                if model.updated() > self.removed.get(name, NEVER):
+                    self.models[name] = model  # added over there
+                    self.removed.pop(name, None)
+            else:
+                data = model.load_data(theirs)
+                updated = data.get("updated", NEVER)
+                if updated > model.updated() or (prefer_theirs and updated == model.updated()):
+                    model.data = data
+        for name, when in self.removed.items():
+            model = self.models.get(name)
+            if model is not None and when > model.updated() and len(self.models) > 1:
+                del self.models[name]
+        return self.state()
+
+    def reload(self):
+        # Another process saved and we have nothing unsaved: take its state. True if anything changed.
+        before = self.state()
+        saved = self.read_saved()
+        if saved is not None:
+            self.merge(saved)
+        return self.state() != before
+
+    # === Store interface for the StreakModels ===
+    def state(self):
+        return {
+            "trackers": [{"name": name, **model.data} for name, model in self.models.items()],
+            "removed": dict(self.removed)
+        }
+
+    def load(self):
+        return None  # habits get their saved data when created, a new one starts fresh
+
+    def mark_dirty(self, data):
+        self.store.mark_dirty(self.state())
+
+    def save(self, data):
+        # Called on every tick: only build the state when there's a write to ride along with
+        self.store.save(self.state() if self.store.dirty else None)
+
+    def flush(self):
+        self.store.save(self.state())
+        self.store.flush()
+
+    def stats(self):
+        return self.store.stats()
+
+
+# === Journal ===
+def make_entry(title, entry_type, description, now):
+    title = title.strip()
+    if not title:
+        raise ValueError("Please enter a title.")
+    if entry_type not in ENTRY_TYPES:
+        raise ValueError(f"Entry type must be one of {', '.join(ENTRY_TYPES)}.")
+    return Entry(None, title, entry_type, datetime_to_us(now), description.strip())
+
+
+def date_bounds(from_text, to_text):
+    # "YYYY-MM-DD" strings (either may be blank) -> start/end for JournalStore.search,
+    # with the "to" day included. Anything that doesn't parse is ignored.
+    def parse(text):
+        try:
+            return date.fromisoformat(text.strip())
+        except ValueError:
+            return None
+
+    start = parse(from_text or "")
+    end = parse(to_text or "")
+    return (
+        start.isoformat() if start else None,
+        (end + timedelta(days=1)).isoformat() if end else None
+    )
+
+
+def find_entry(journal, id_or_prefix):
+    entry = journal.get(id_or_prefix)
+    if entry is not None:
+        return entry
+    if journal.load_archive():
+        return find_entry(journal, id_or_prefix)
+    matches = [e for e in journal.by_id.values() if e.id.startswith(id_or_prefix)]
+    if len(matches) == 1:
+        return matches[0]
+    return None
+
+
+# === Opening everything from a data folder ===
+def open_storage(folder=".", backend=None, clock=None):
+    # The clock decides when entries are old enough for the archive: the synced one unless told otherwise
+    return storage.open_storage(folder, backend or STORAGE_BACKEND, clock or open_clock(folder))
+
+
+def open_clock(folder="."):
+    return SyncedClock(os.path.join(folder, TIME_OFFSET_FILE))
+
+
+def open_stats(data_storage):
+    return StatsEngine(data_storage)
+
+
+def open_trackers(data_storage, clock=None, stats=None, after=None, after_cancel=None):
+    store = DataStore(data_storage, after=after, after_cancel=after_cancel)
+    return TrackerSet(store, clock or open_clock(data_storage.folder), stats)
+
+
+def open_streak(data_storage, clock=None, stats=None, after=None, after_cancel=None, habit=None):
+    trackers = open_trackers(data_storage, clock, stats, after, after_cancel)
+    if habit is None:
+        return trackers.main
+    model = trackers.get(habit)
+    if model is None:
+        raise ValueError(f"No habit called {habit!r}.")
+    return model
+
+
+def open_history(data_storage, clock=None):
+    return EntryHistory(data_storage.folder, clock)
+
+
+def open_journal(data_storage, stats=None, history=None):
+    journal = JournalStore(data_storage, index_path=os.path.join(data_storage.folder, SEARCH_INDEX_FILE),
+                           snapshot_path=os.path.join(data_storage.folder, SNAPSHOT_FILE))
+    if stats is not None:
+        stats.seed_journal(journal)
+        journal.listeners.append(stats.on_journal_change)
+    if history is not None:
+        journal.listeners.append(history.on_journal_change)
+    changes = open_change_log(data_storage.folder)  # once sync is set up, every change is noted for it
+    if changes is not None:
+        journal.listeners.append(changes.on_journal_change)
+    return journal
+
+
+def build_search_index(folder, backend=None):
+    # For a worker process: builds the journal's search index from the files and
+    # saves it, so the app only has to load it. The signature is taken first, so
+    # anything written while this runs makes the saved index stale, never wrong.
+    data_storage = open_storage(folder, backend)
+    try:
+        signature = data_storage.journal_signature()
+        index = SearchIndex.build(data_storage.load_full_entries().values())
+        index.save(os.path.join(folder, SEARCH_INDEX_FILE), signature)
+    finally:
+        data_storage.close()
+
+
+def restore_version(journal, entry_id, version):
+    # Restoring is an edit like any other, so it becomes the newest version itself
+    return journal.update(entry_id, title=version.title, type=version.type, description=version.description)
@@ -0,0 +1,207 @@
+# === ENTRY EDIT HISTORY ===
+# Every saved edit of a journal entry is kept as a version. Versions are small
+# records in an append-only log (journal_history.jsonl) that refer to the
+# title and description by the SHA-256 of their text. The texts themselves go
+# to a content-addressed blob log (journal_blobs.jsonl): a text that's already
+# there is never written again, and a long description is stored as a delta
+# against the entry's previous description. So an edit costs a version record
+# plus whatever text actually changed.
+# The history hangs off JournalStore as a listener, like the stats, and both
+# files are only read the first time a history is asked for or recorded.
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from datetime import datetime
+from difflib import SequenceMatcher
+
+from filelock import FileLock
+from journal_log import iter_lines
+
+HISTORY_FILE = "journal_history.jsonl"
+BLOBS_FILE = "journal_blobs.jsonl"
+DELTA_MIN_CHARS = 200  # shorter texts are stored whole, a delta wouldn't save anything
+MAX_CHAIN = 64         # a full copy every so often keeps rebuilding a text cheap
+CACHED_TEXTS = 32      # rebuilt texts kept around, so listing a history walks each chain once
+
+
+def text_key(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+WORD = re.compile(r"\s*\S+\s*|\s+")
+
+
+def split_words(text):
+    # Words with the whitespace around them; joining them gives the text back
+    return WORD.findall(text)
+
+
+def make_delta(base, text):
+    # [[start, end], "inserted text", ...]: word ranges copied from base, or new text.
+    # Most edits touch one spot, so only the part between the common start
+    # and end goes through the (quadratic at worst) matcher.
+    base_words = split_words(base)
+    words = split_words(text)
+    head = 0
+    while head < min(len(base_words), len(words)) and base_words[head] == words[head]:
+        head += 1
+    tail = 0
+    while tail < min(len(base_words), len(words)) - head and base_words[-1 - tail] == words[-1 - tail]:
+        tail += 1
+    ops = [[0, head]] if head else []
+    matcher = SequenceMatcher(None, base_words[head:len(base_words) - tail], words[head:len(words) - tail], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([head + i1, head + i2])
+        elif j2 > j1:
+            ops.append("".join(words[head + j1:head + j2]))
+    if tail:
+        ops.append([len(base_words) - tail, len(base_words)])
+    return ops
+
+
+def apply_delta(base, ops):
+    base_words = split_words(base)
+    return "".join(op if isinstance(op, str) else "".join(base_words[op[0]:op[1]]) for op in ops)
+
+
+class Version:
+    __slots__ = ("at", "title", "type", "description")
+
+    def __init__(self, at, title, type, description):
+        self.at = at                    # when this version was saved, ISO string
+        self.title = title
+        self.type = type
+        self.description = description
+
+    def to_dict(self):
+        return {"at": self.at, "title": self.title, "type": self.type, "description": self.description}
+
+
+class EntryHistory:
+    def __init__(self, folder, clock=None):
+        self.path = os.path.join(folder, HISTORY_FILE)
+        self.blobs_path = os.path.join(folder, BLOBS_FILE)
+        self.clock = clock
+        self.lock = FileLock(self.path)
+        self.versions = None  # entry id -> [version record], loaded on first use
+        self.blobs = {}       # sha -> (offset, length) in the blob log
+        self.depth = {}       # sha -> length of its delta chain
+        self._texts = OrderedDict()
+        self._known = (0, 0)  # bytes of (history, blobs) read so far
+
+    # === Loading ===
+    def _catch_up(self):
+        # Call with the lock held: read whatever was appended since last time
+        if self.versions is None:
+            self.versions = {}
+        history_size, blobs_size = self._known
+        history_size = self._read_new(self.path, history_size, self._add_version)
+        blobs_size = self._read_new(self.blobs_path, blobs_size, self._add_blob)
+        self._known = (history_size, blobs_size)
+
+    def _read_new(self, path, start, add):
+        if not os.path.exists(path) or os.path.getsize(path) == start:
+            return start
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read()
+        data = data[:data.rfind(b"\n") + 1]  # a half-written last line waits for next time
+        for offset, length, record in iter_lines(data, base=start):
+            add(offset, length, record)
+        return start + len(data)
+
+    def _add_version(self, offset, length, record):
+        self.versions.setdefault(record["id"], []).append(record)
+
+    def _add_blob(self, offset, length, record):
+        self.blobs[record["sha"]] = (offset, length)
+        self.depth[record["sha"]] = record.get("depth", 0)
+
+    # === Blobs ===
+    def _read_blob(self, f, sha):
+        offset, length = self.blobs[sha]
+        f.seek(offset)
+        return json.loads(f.read(length))
+
+    def text(self, sha):
+        if sha in self._texts:
+            self._texts.move_to_end(sha)
+            return self._texts[sha]
+        with self.lock:
+            self._catch_up()
+            with open(self.blobs_path, "rb") as f:
+                # Walk back to a full copy (or one rebuilt earlier), then apply the deltas on the way forward
+                chain = [self._read_blob(f, sha)]
+                while "base" in chain[-1] and chain[-1]["base"] not in self._texts:
+                    chain.append(self._read_blob(f, chain[-1]["base"]))
+        last = chain.pop()
+        text = last["text"] if "text" in last else apply_delta(self._texts[last["base"]], last["ops"])
+        while chain:
+            text = apply_delta(text, chain.pop()["ops"])
+        self._texts[sha] = text
+        if len(self._texts) > CACHED_TEXTS:
+            self._texts.popitem(last=False)
+        return text
+
+    def _store(self, text, base=None):
+        # Call with the lock held. Writes the text unless it's there already, returns its sha.
+        sha = text_key(text)
+        if sha in self.blobs:
+            return sha
+        record = {"sha": sha, "text": text}
+        if base is not None and len(text) >= DELTA_MIN_CHARS and self.depth.get(base, MAX_CHAIN) < MAX_CHAIN:
+            ops = make_delta(self.text(base), text)
+            if len(json.dumps(ops)) < len(text):
+                record = {"sha": sha, "base": base, "depth": self.depth[base] + 1, "ops": ops}
+        self._append(1, record, self._add_blob)
+        return sha
+
+    def _append(self, which, record, add):
+        # which: 0 for the history log, 1 for the blob log
+        line = (json.dumps(record) + "\n").encode()
+        path = (self.path, self.blobs_path)[which]
+        with open(path, "ab") as f:
+            f.seek(0, os.SEEK_END)
+            add(f.tell(), len(line) - 1, record)
+            f.write(line)
+        known = list(self._known)
+        known[which] += len(line)
+        self._known = tuple(known)
+
+    # === Versions ===
+    def record(self, entry, at=None):
+        # Adds entry (with its description) as the newest version, unless nothing changed
+        with self.lock:
+            self._catch_up()
+            previous = self.versions.get(entry.id, [None])[-1]
+            title = self._store(entry.title)
+            description = self._store(entry.description or "", previous["description"] if previous else None)
+            if previous and (previous["title"], previous["type"], previous["description"]) == (title, entry.type, description):
+                return False
+            when = at or (self.clock.now() if self.clock is not None else datetime.now())
+            version = {"id": entry.id, "at": when.isoformat(), "title": title, "type": entry.type, "description": description}
+            self._append(0, version, self._add_version)
+        return True
+
+    def history(self, entry_id):
+        # Every version of the entry, oldest first, texts filled in
+        with self.lock:
+            self._catch_up()
+            records = list(self.versions.get(entry_id, []))
+        return [
+            Version(record["at"], self.text(record["title"]), record["type"], self.text(record["description"]))
+            for record in records
+        ]
+
+    def on_journal_change(self, op, entry, old=None):
+        if op != "update":
+            return
+        with self.lock:
+            self._catch_up()
+            first_edit = entry.id not in self.versions
+        if first_edit:
+            self.record(old, at=old.when)  # the original, dated when it was written
+        self.record(entry)
@@ -0,0 +1,183 @@
+# === COLD JOURNAL ARCHIVE ===
+# Entries older than a few months move out of the journal log into gzip
+# compressed segments, one or more per month, under journal_archive/. A
+# segment is written once and never changed again. segments.json keeps what
+# the list view needs to skip a segment without opening it: its month, how
+# many live entries it holds and the first/last timestamp. Editing or
+# deleting an archived entry "shadows" it: the id is listed in segments.json
+# and, for an edit, the new version goes back to the hot log.
+import gzip
+import json
+import os
+import uuid
+from collections import OrderedDict
+
+from filelock import FileLock
+from journal_entry import Entry
+from journal_log import file_signature, iter_lines
+from persistence import atomic_write_json
+
+ARCHIVE_FOLDER = "journal_archive"
+ARCHIVE_VERSION = 1
+CACHED_SEGMENTS = 4  # decompressed segments kept around for descriptions and exports
+SEGMENT_COMPRESSLEVEL = 3  # 9 makes segments about a tenth smaller and takes ten times as long
+
+
+def month_of(entry):
+    return entry["timestamp"][:7]
+
+
+class JournalArchive:
+    def __init__(self, folder):
+        self.folder = os.path.join(folder, ARCHIVE_FOLDER)
+        self.meta_path = os.path.join(self.folder, "segments.json")
+        self.lock = FileLock(self.folder)  # journal_archive.lock next to the folder, which may not exist yet
+        self.segments = {}   # name -> {"name", "month", "count", "first_ts", "last_ts"}
+        self.shadowed = {}   # id -> name of the segment whose copy no longer counts
+        self.located = {}    # id -> segment name, for every segment read so far
+        self._cache = OrderedDict()  # name -> {id: entry dict}
+        self._seen = None
+
+    # === Metadata ===
+    def _refresh(self):
+        # Call with the lock held: pick up segments.json if another process changed it
+        signature = file_signature(self.meta_path)
+        if signature == self._seen:
+            return
+        self._seen = signature
+        self.segments = {}
+        self.shadowed = {}
+        self._cache.clear()
+        if signature is None:
+            return
+        try:
+            with open(self.meta_path, "r") as f:
+                saved = json.load(f)
+        except Exception as e:
+            print("Error loading journal archive:", e)
+            return
+        if saved.get("version") == ARCHIVE_VERSION:
+            self.segments = {segment["name"]: segment for segment in saved["segments"]}
+            self.shadowed = saved["shadowed"]
+
+    def _save(self):
+        atomic_write_json(self.meta_path, {
+            "version": ARCHIVE_VERSION,
+            "segments": sorted(self.segments.values(), key=lambda s: s["first_ts"]),
+            "shadowed": self.shadowed
+        })
+        self._seen = file_signature(self.meta_path)
+
+    def list_segments(self):
+        with self.lock:
+            self._refresh()
+            return [dict(segment) for segment in self.segments.values()]
+
+    # === Reading ===
+    def _read(self, name):
+        # {id: entry dict} of one segment, shadowed entries left out
+        if name in self._cache:
+            self._cache.move_to_end(name)
+            return self._cache[name]
+        with gzip.open(os.path.join(self.folder, name), "rb") as f:
+            data = f.read()
+        entries = {}
+        for _, _, record in iter_lines(data):
+            if self.shadowed.get(record["id"]) != name:
+                entries[record["id"]] = record
+        for entry_id in entries:
+            self.located[entry_id] = name
+        self._cache[name] = entries
+        if len(self._cache) > CACHED_SEGMENTS:
+            self._cache.popitem(last=False)
+        return entries
+
+    def load_segment(self, name):
+        # The segment's entries without descriptions, what the list view needs
+        with self.lock:
+            self._refresh()
+            return {
+                entry_id: Entry.from_dict(entry, with_description=False)
+                for entry_id, entry in self._read(name).items()
+            }
+
+    def read_entry(self, entry_id):
+        with self.lock:
+            self._refresh()
+            name = self.located.get(entry_id)
+            if name is None or name not in self.segments:
+                name = self._find(entry_id)
+            return self._read(name)[entry_id]
+
+    def _find(self, entry_id):
+        # Not read here yet (archived by another process): look through the newest first
+        for name in sorted(self.segments, key=lambda n: self.segments[n]["last_ts"], reverse=True):
+            if entry_id in self._read(name):
+                return name
+        raise KeyError(entry_id)
+
+    def iter_all(self):
+        # Every archived entry dict, segment by segment
+        for segment in self.list_segments():
+            with self.lock:
+                entries = list(self._read(segment["name"]).values())
+            yield from entries
+
+    # === Writing ===
+    def write_segments(self, entries):
+        # Entry dicts, oldest first -> metadata for the new segments, one per month.
+        # The files are written here; nothing refers to them until add_segments.
+        os.makedirs(self.folder, exist_ok=True)
+        by_month = {}
+        for entry in entries:
+            by_month.setdefault(month_of(entry), []).append(entry)
+        segments = []
+        for month, month_entries in by_month.items():
+            name = f"{month}-{uuid.uuid4().hex[:8]}.jsonl.gz"
+            lines = "".join(json.dumps(entry) + "\n" for entry in month_entries).encode()
+            tmp_path = os.path.join(self.folder, ".tmp-" + name)
+            with open(tmp_path, "wb") as f:
+                with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=SEGMENT_COMPRESSLEVEL) as out:
+                    out.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, os.path.join(self.folder, name))
+            light = [Entry.from_dict(entry, with_description=False) for entry in month_entries]
+            segments.append({
+                "name": name, "month": month, "count": len(month_entries),
+                "first_ts": min(e.ts for e in light), "last_ts": max(e.ts for e in light)
+            })
+            for entry in month_entries:
+                self.located[entry["id"]] = name
+        return segments
+
+    def add_segments(self, segments, shadowed=()):
+        # Publishes written segments; shadowed ids changed while they were being written
+        with self.lock:
+            self._refresh()
+            for segment in segments:
+                self.segments[segment["name"]] = segment
+            for entry_id in shadowed:
+                self._shadow(entry_id)
+            self._save()
+
+    def discard(self, segments):
+        # Written but never published
+        for segment in segments:
+            path = os.path.join(self.folder, segment["name"])
+            if os.path.exists(path):
+                os.remove(path)
+
+    def shadow(self, entry_id):
+        with self.lock:
+            self._refresh()
+            self._shadow(entry_id)
+            self._save()
+
+    def _shadow(self, entry_id):
+        name = self.located.get(entry_id) or self._find(entry_id)
+        if self.shadowed.get(entry_id) == name:
+            return
+        self.shadowed[entry_id] = name
+        self.segments[name]["count"] -= 1
+        self._cache.get(name, {}).pop(entry_id, None)
@@ -0,0 +1,78 @@
+# === COMPACT JOURNAL ENTRY ===
+# In memory a journal entry is an Entry rather than a dict: fixed slots, the
+# type string interned so every entry shares one copy, and the timestamp as
+# integer microseconds since 1970 so ordering compares ints instead of text.
+# On disk and on the wire the JSON schema is unchanged
+# ({"id", "title", "type", "description", "timestamp"}); from_dict/to_dict
+# convert between the two. Timestamps are naive local times, exactly as
+# datetime.isoformat() writes them, and survive the round trip unchanged.
+# One with a UTC offset (from an import, say) is taken as that moment in
+# local time.
+import sys
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def datetime_to_us(when):
+    return (when - EPOCH) // ONE_MICROSECOND
+
+
+def timestamp_to_us(text):
+    when = datetime.fromisoformat(text)
+    if when.tzinfo is not None:
+        when = when.astimezone().replace(tzinfo=None)
+    return datetime_to_us(when)
+
+
+def us_to_timestamp(us):
+    return (EPOCH + timedelta(microseconds=us)).isoformat()
+
+
+class Entry:
+    __slots__ = ("id", "title", "type", "ts", "description")
+
+    def __init__(self, id, title, type, ts, description=None):
+        self.id = id
+        self.title = title
+        self.type = sys.intern(type)
+        self.ts = ts                    # microseconds since 1970, local time
+        self.description = description  # None when only the list fields were loaded
+
+    @classmethod
+    def from_dict(cls, data, with_description=True):
+        return cls(
+            data.get("id"), data["title"], data["type"], timestamp_to_us(data["timestamp"]),
+            data.get("description", "") if with_description else None
+        )
+
+    def to_dict(self):
+        data = {"id": self.id, "title": self.title, "type": self.type}
+        if self.description is not None:
+            data["description"] = self.description
+        data["timestamp"] = self.timestamp
+        return data
+
+    @property
+    def timestamp(self):
+        return us_to_timestamp(self.ts)
+
+    @property
+    def when(self):
+        return EPOCH + timedelta(microseconds=self.ts)
+
+    def light(self):
+        # Same entry without the description, what the list view keeps around
+        return Entry(self.id, self.title, self.type, self.ts)
+
+    def replace(self, **fields):
+        # A changed copy; "timestamp" may be given as an ISO string
+        if "timestamp" in fields:
+            fields["ts"] = timestamp_to_us(fields.pop("timestamp"))
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(fields)
+        return Entry(**values)
+
+    def __repr__(self):
+        return f"Entry({self.id!r}, {self.title!r}, {self.type!r}, {self.timestamp!r})"
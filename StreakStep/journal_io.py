@@ -0,0 +1,114 @@
+# === BULK IMPORT / EXPORT ===
+# Streams journal entries to and from CSV or JSONL files. Both directions read
+# and write one batch at a time, so memory stays flat however big the file is,
+# and imports go to the storage backend as one commit per batch.
+# import_entries/export_entries are generators that yield progress after each
+# batch: the command line just runs them, the app runs them on its journal
+# thread (see tasks) and can stop them between batches.
+import csv
+import json
+import os
+import tempfile
+
+from journal_entry import Entry, timestamp_to_us
+from persistence import keep_mode
+
+FIELDS = ("id", "title", "type", "description", "timestamp")
+FORMATS = ("csv", "jsonl")
+BATCH_SIZE = 5000
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def read_records(f, fmt):
+    if fmt == "csv":
+        yield from csv.DictReader(f)
+        return
+    for line in f:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def parse_entry(record, entry_types):
+    # A record from the file -> Entry, or None if it can't be one
+    if not isinstance(record, dict):
+        return None
+    # A JSONL record can hold anything: a number for a title is as invalid as no title
+    title, entry_type = record.get("title"), record.get("type")
+    entry_id, description = record.get("id") or None, record.get("description") or ""
+    if not (isinstance(title, str) and isinstance(entry_type, str) and isinstance(description, str)):
+        return None
+    if entry_id is not None and not isinstance(entry_id, str):
+        return None
+    title = title.strip()
+    if not title or entry_type not in entry_types:
+        return None
+    try:
+        ts = timestamp_to_us(record["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return Entry(entry_id, title, entry_type, ts, description)
+
+
+def import_entries(journal, path, entry_types, fmt=None, batch_size=BATCH_SIZE):
+    fmt = detect_format(path, fmt)
+    progress = {"read": 0, "added": 0, "skipped": 0, "invalid": 0}
+
+    def commit(batch):
+        added = journal.add_many(batch)
+        progress["added"] += len(added)
+        progress["skipped"] += len(batch) - len(added)
+
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        batch = []
+        for record in read_records(f, fmt):
+            progress["read"] += 1
+            entry = parse_entry(record, entry_types)
+            if entry is None:
+                progress["invalid"] += 1
+                continue
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                commit(batch)
+                batch = []
+                yield dict(progress)
+        if batch:
+            commit(batch)
+    yield dict(progress)
+
+
+def export_entries(journal, path, fmt=None, batch_size=BATCH_SIZE):
+    # Oldest first. Written to a temp file and moved into place at the end.
+    fmt = detect_format(path, fmt)
+    progress = {"written": 0, "total": len(journal)}
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix="." + fmt, dir=folder)
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+            writer = None
+            if fmt == "csv":
+                writer = csv.DictWriter(f, fieldnames=FIELDS)
+                writer.writeheader()
+            for entry in journal.iter_full():
+                if writer is not None:
+                    writer.writerow(entry.to_dict())
+                else:
+                    f.write(json.dumps(entry.to_dict()) + "\n")
+                progress["written"] += 1
+                if progress["written"] % batch_size == 0:
+                    yield dict(progress)
+        keep_mode(tmp_path, path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    yield dict(progress)
+
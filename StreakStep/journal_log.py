@@ -0,0 +1,498 @@
+# === APPEND-ONLY JOURNAL LOG ===
+# One JSON record per line: adds, edits and deletes are appended instead of
+# rewriting the whole journal. Deletes are tombstones. Once enough of the file
+# is dead records a background thread rewrites it with only the live entries.
+# A side index (<log>.idx) keeps titles, types, timestamps and byte offsets so
+# the list view can start without parsing the log; descriptions are read on
+# demand by seeking to the entry's record.
+# Other processes may append to (or compact) the same log: every write holds
+# a lock file, and before touching the file each instance checks whether it
+# grew or was replaced behind its back. New records are read from where it
+# left off and queued for poll(); a replaced file means a full reload.
+import json
+import os
+import tempfile
+import threading
+import uuid
+from array import array
+
+from filelock import FileLock
+from persistence import atomic_write_json, keep_mode
+from journal_entry import Entry
+
+COMPACT_MIN_GARBAGE = 200
+COMPACT_GARBAGE_RATIO = 0.5
+SIDE_INDEX_VERSION = 2
+
+
+def migrate_legacy_journal(legacy_path, log_path):
+    # One-time conversion of the old journal_entries.json array (newest first)
+    if os.path.exists(log_path) or not os.path.exists(legacy_path):
+        return False
+    try:
+        with open(legacy_path, "r") as f:
+            entries = json.load(f)
+    except Exception as e:
+        print("Error reading old journal file:", e)
+        entries = []
+
+    folder = os.path.dirname(os.path.abspath(log_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".jsonl", dir=folder)
+    with os.fdopen(fd, "w") as f:
+        for entry in reversed(entries):
+            entry.setdefault("id", uuid.uuid4().hex)
+            f.write(json.dumps({"op": "add", "entry": entry}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    keep_mode(tmp_path, legacy_path)
+    os.replace(tmp_path, log_path)
+    os.replace(legacy_path, legacy_path + ".migrated")
+    return True
+
+
+def iter_records(data):
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # A torn last line from a crash mid-append, skip it
+            continue
+
+
+def iter_lines(data, base=0):
+    # Like iter_records but also says where each record sits in the file
+    pos = 0
+    while pos < len(data):
+        end = data.find(b"\n", pos)
+        if end == -1:
+            end = len(data)
+        line = data[pos:end]
+        if line.strip():
+            try:
+                yield base + pos, end - pos, json.loads(line)
+            except ValueError:
+                pass
+        pos = end + 1
+
+
+def record_key(record):
+    # Records are keyed by entry id; logs written before ids existed used the timestamp
+    if record["op"] == "add":
+        return record["entry"].get("id") or record["entry"]["timestamp"]
+    return record.get("id") or record["key"]
+
+
+def file_signature(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _garbage_for(op):
+    # add: nothing dead yet, edit: the old version, del/archive: the entry plus the tombstone
+    return {"add": 0, "edit": 1, "del": 2, "archive": 2}.get(op, 0)
+
+
+def _apply(rows, live, offset, length, record, light=None):
+    key = record_key(record)
+    if record["op"] in ("add", "edit"):
+        entry = record["entry"]
+        rows[key] = (light or Entry.from_dict(entry, with_description=False), offset, length)
+        if live is not None:
+            live[key] = entry
+    elif record["op"] in ("del", "archive"):
+        # "archive": moved to a cold segment (journal_archive), gone from the log all the same
+        rows.pop(key, None)
+        if live is not None:
+            live.pop(key, None)
+
+
+class JournalLog:
+    def __init__(self, path, legacy_path=None,
+                 min_garbage=COMPACT_MIN_GARBAGE, garbage_ratio=COMPACT_GARBAGE_RATIO):
+        self.path = path
+        # Side index: one row per live entry with everything the list view
+        # needs plus where the full record sits in the log
+        self.index_path = path + ".idx"
+        self.min_garbage = min_garbage
+        self.garbage_ratio = garbage_ratio
+
+        self.lock = FileLock(path)
+        self.records = 0
+        self.garbage = 0
+        self.rows = {}  # id -> (Entry without description, offset, length)
+        self.rows_dirty = False
+        self._compactor = None
+
+        self.known = (None, 0)  # (inode, size) of the file as far as we've read it
+        self.pending = []       # (id, entry, old entry) written by someone else, for poll()
+        self.replaced = False   # someone else rewrote the file, everything has to be reloaded
+
+        if legacy_path:
+            migrate_legacy_journal(legacy_path, path)
+        self._repair_tail()
+
+    def _repair_tail(self):
+        # Make sure a torn last line can't swallow the next record we append
+        with self.lock:
+            if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+                return
+            with open(self.path, "rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+
+    def _stat(self):
+        if not os.path.exists(self.path):
+            return (None, 0)
+        stat = os.stat(self.path)
+        return (stat.st_ino, stat.st_size)
+
+    # === Reading ===
+    def _scan(self, limit=None):
+        rows = {}
+        live = {}
+        records = 0
+        garbage = 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                if limit is None:
+                    data = f.read()
+                    # Only complete lines count as read, a half-written one is picked up later
+                    data = data[:data.rfind(b"\n") + 1]
+                    self.known = (os.fstat(f.fileno()).st_ino, len(data))
+                else:
+                    data = f.read(limit)
+            for offset, length, record in iter_lines(data):
+                records += 1
+                garbage += _garbage_for(record["op"])
+                _apply(rows, live, offset, length, record)
+        return rows, live, records, garbage
+
+    def load_full(self, limit=None):
+        # Every live entry with its description, as JSON dicts. Parses the whole log.
+        if limit is not None:
+            return self._scan(limit)[1]
+        with self.lock:
+            rows, live, records, garbage = self._scan()
+            if any(not entry.get("id") for entry in live.values()):
+                # Written before entries had ids: give them one and pin it to disk
+                for entry in live.values():
+                    entry.setdefault("id", uuid.uuid4().hex)
+                self.rewrite(sorted(live.values(), key=lambda e: e["timestamp"]))
+                return {entry["id"]: entry for entry in live.values()}
+            self.rows = rows
+            self.records = records
+            self.garbage = garbage
+            self.rows_dirty = True
+            self.pending = []
+            self.replaced = False
+        return live
+
+    def load_light(self):
+        # Entries without descriptions. Reads only the side index when it's up to date.
+        if not self._load_side_index():
+            self.load_full()
+        return {entry_id: row[0] for entry_id, row in self.rows.items()}
+
+    def read_entry(self, entry_id):
+        with self.lock:
+            self._sync()
+            offset, length = self.rows[entry_id][1:]
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                line = f.read(length)
+        return json.loads(line)["entry"]
+
+    def read_entries(self, entry_ids, chunk=1000):
+        # Streams full entries for the given ids, holding the lock a chunk at a time
+        entry_ids = iter(entry_ids)
+        while True:
+            ids = [entry_id for _, entry_id in zip(range(chunk), entry_ids)]
+            if not ids:
+                return
+            with self.lock:
+                self._sync()
+                with open(self.path, "rb") as f:
+                    lines = []
+                    for entry_id in ids:
+                        offset, length = self.rows[entry_id][1:]
+                        f.seek(offset)
+                        lines.append(f.read(length))
+            for line in lines:
+                yield json.loads(line)["entry"]
+
+    # === Changes from other processes ===
+    def _sync(self):
+        # Call with the lock held: catch up with whatever others wrote since we last looked
+        current = self._stat()
+        if current == self.known:
+            return
+        if current[0] != self.known[0] or current[1] < self.known[1]:
+            # Rewritten (compacted) by someone else, none of our offsets hold any more
+            rows, _, self.records, self.garbage = self._scan()
+            self.rows = rows
+            self.rows_dirty = True
+            self.pending = []
+            self.replaced = True
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self.known[1])
+            data = f.read(current[1] - self.known[1])
+            data = data[:data.rfind(b"\n") + 1]
+            for offset, length, record in iter_lines(data, base=self.known[1]):
+                if record["op"] == "archive":
+                    self.replaced = True  # entries moved to the archive, reload it all
+                key = record_key(record)
+                old = self.rows.get(key)
+                old_entry = None
+                if old is not None:
+                    f.seek(old[1])
+                    old_entry = json.loads(f.read(old[2]))["entry"]
+                _apply(self.rows, None, offset, length, record)
+                entry = record["entry"] if record["op"] in ("add", "edit") else None
+                self.pending.append((key, entry, old_entry))
+                self.records += 1
+                self.garbage += _garbage_for(record["op"])
+        self.known = (current[0], self.known[1] + len(data))
+        self.rows_dirty = True
+
+    def poll(self):
+        # Changes made by other processes since the last poll, as (id, entry, old entry)
+        # with None for a missing side. Returns None when everything has to be reloaded.
+        with self.lock:
+            self._sync()
+            changes, self.pending = self.pending, []
+            replaced, self.replaced = self.replaced, False
+        return None if replaced else changes
+
+    # === Side index ===
+    def _load_side_index(self):
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            with open(self.index_path, "r") as f:
+                saved = json.load(f)
+        except Exception as e:
+            print("Error loading journal index:", e)
+            return False
+        if saved.get("version") != SIDE_INDEX_VERSION or saved.get("source") != file_signature(self.path):
+            return False
+        self.rows = {
+            entry_id: (Entry(entry_id, title, entry_type, ts), offset, length)
+            for entry_id, title, entry_type, ts, offset, length in saved["rows"]
+        }
+        self.known = self._stat()
+        self.records = saved["records"]
+        self.garbage = saved["garbage"]
+        self.rows_dirty = False
+        return True
+
+    def save_side_index(self):
+        with self.lock:
+            self._sync()
+            atomic_write_json(self.index_path, {
+                "version": SIDE_INDEX_VERSION,
+                "source": file_signature(self.path),
+                "records": self.records,
+                "garbage": self.garbage,
+                "rows": [
+                    [entry.id, entry.title, entry.type, entry.ts, offset, length]
+                    for entry, offset, length in self.rows.values()
+                ]
+            })
+            self.rows_dirty = False
+
+    # === Warm-start snapshot ===
+    def snapshot(self):
+        # Call with the lock held. The rows as columns, oldest first, or None when
+        # others wrote something poll() hasn't handed on yet (memory is behind the file)
+        self._sync()
+        if self.pending or self.replaced:
+            return None
+        rows = sorted(self.rows.values(), key=lambda row: (row[0].ts, row[0].id))
+        return {
+            "ids": [entry.id for entry, _, _ in rows],
+            "titles": [entry.title for entry, _, _ in rows],
+            "types": [entry.type for entry, _, _ in rows],
+            "ts": array("q", [entry.ts for entry, _, _ in rows]),
+            "offsets": array("q", [offset for _, offset, _ in rows]),
+            "lengths": array("q", [length for _, _, length in rows]),
+            "records": self.records,
+            "garbage": self.garbage,
+            "known": list(self.known)
+        }
+
+    @staticmethod
+    def rows_from_snapshot(saved):
+        return {
+            entry_id: (Entry(entry_id, title, entry_type, ts), offset, length)
+            for entry_id, title, entry_type, ts, offset, length in zip(
+                saved["ids"], saved["titles"], saved["types"], saved["ts"], saved["offsets"], saved["lengths"]
+            )
+        }
+
+    def restore(self, saved, rows):
+        # Call with the lock held, once the file is known to be the one the snapshot was
+        # taken of (or that with more appended, for catch_up() to read)
+        self.rows = rows
+        self.known = tuple(saved["known"])
+        self.records = saved["records"]
+        self.garbage = saved["garbage"]
+        self.rows_dirty = False
+        self.pending = []
+        self.replaced = False
+
+    def catch_up(self):
+        # Call with the lock held, after restore(): reads what was appended since, as part
+        # of the load rather than changes for poll(). False if it can't be, then load afresh.
+        self._sync()
+        replaced, self.replaced = self.replaced, False
+        self.pending = []
+        return not replaced
+
+    # === Writing ===
+    def _append(self, *records, lights=()):
+        # Any number of records in one write. lights: the records' entries as
+        # Entry objects without descriptions, when the caller already has them.
+        lines = [(json.dumps(record) + "\n").encode() for record in records]
+        with self.lock:
+            self._sync()
+            with open(self.path, "ab") as f:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(b"".join(lines))
+            for i, (record, line) in enumerate(zip(records, lines)):
+                _apply(self.rows, None, offset, len(line) - 1, record, lights[i] if lights else None)
+                offset += len(line)
+                self.records += 1
+                self.garbage += _garbage_for(record["op"])
+            self.known = self._stat()
+            self.rows_dirty = True
+        self.maybe_compact()
+
+    def add(self, entry):
+        self._append({"op": "add", "entry": entry})
+
+    def add_many(self, entries, lights=()):
+        self._append(*({"op": "add", "entry": entry} for entry in entries), lights=lights)
+
+    def edit(self, entry_id, entry):
+        self._append({"op": "edit", "id": entry_id, "entry": entry})
+
+    def delete(self, entry_id):
+        self._append({"op": "del", "id": entry_id})
+
+    def unchanged(self, offsets, inode):
+        # The ids from {id: offset} whose record hasn't moved since, or None if the
+        # whole file was rewritten (inode changed) and offsets can't be compared
+        with self.lock:
+            self._sync()
+            if self.known[0] != inode:
+                return None
+            return {entry_id for entry_id, offset in offsets.items() if entry_id in self.rows and self.rows[entry_id][1] == offset}
+
+    def archive(self, entry_ids):
+        # Drops entries that now live in a cold segment
+        if entry_ids:
+            self._append(*({"op": "archive", "id": entry_id} for entry_id in entry_ids))
+
+    # === Compaction ===
+    def needs_compaction(self):
+        if self.garbage < self.min_garbage or self.records == 0:
+            return False
+        return self.garbage / self.records >= self.garbage_ratio
+
+    def maybe_compact(self):
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        if not self.needs_compaction():
+            return
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+
+    def _write_entries(self, out, entries):
+        rows = {}
+        pos = 0
+        for entry in entries:
+            line = (json.dumps({"op": "add", "entry": entry}) + "\n").encode()
+            out.write(line)
+            rows[entry["id"]] = (Entry.from_dict(entry, with_description=False), pos, len(line) - 1)
+            pos += len(line)
+        return rows, pos
+
+    def compact(self):
+        with self.lock:
+            if not os.path.exists(self.path):
+                return
+            snapshot_inode, snapshot_size = self._stat()
+
+        # The slow part runs without the lock so appends keep going
+        live = self.load_full(limit=snapshot_size)
+        if any(not entry.get("id") for entry in live.values()):
+            # Written before entries had ids: the full load gives them one and rewrites the file
+            self.load_full()
+            return
+        folder = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".jsonl", dir=folder)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                rows, size = self._write_entries(out, sorted(live.values(), key=lambda e: e["timestamp"]))
+
+                with self.lock:
+                    self._sync()
+                    if self.known[0] != snapshot_inode:
+                        # Another process compacted it first, ours is stale
+                        out.close()
+                        os.remove(tmp_path)
+                        return
+                    # Carry over anything appended while we were rewriting
+                    with open(self.path, "rb") as f:
+                        f.seek(snapshot_size)
+                        tail = f.read()
+                    out.write(tail)
+                    out.flush()
+                    os.fsync(out.fileno())
+                    out.close()
+                    keep_mode(tmp_path, self.path)
+                    os.replace(tmp_path, self.path)
+                    self.known = self._stat()
+
+                    tail_records = list(iter_lines(tail, base=size))
+                    for offset, length, record in tail_records:
+                        _apply(rows, None, offset, length, record)
+                    self.rows = rows
+                    self.rows_dirty = True
+                    self.records = len(live) + len(tail_records)
+                    self.garbage = sum(_garbage_for(r["op"]) for _, _, r in tail_records)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def rewrite(self, entries):
+        # Synchronous full rewrite, used when every entry changes at once
+        with self.lock:
+            folder = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".jsonl", dir=folder)
+            with os.fdopen(fd, "wb") as f:
+                rows, _ = self._write_entries(f, entries)
+                f.flush()
+                os.fsync(f.fileno())
+            keep_mode(tmp_path, self.path)
+            os.replace(tmp_path, self.path)
+            self.known = self._stat()
+            self.rows = rows
+            self.rows_dirty = True
+            self.records = len(entries)
+            self.garbage = 0
+
+    def close(self):
+        if self._compactor is not None:
+            self._compactor.join()
+        if self.rows_dirty:
+            self.save_side_index()
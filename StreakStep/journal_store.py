@@ -0,0 +1,430 @@
+# === IN-MEMORY JOURNAL STORE ===
+# The app loads the journal once and keeps it here: entries by id plus an
+# ordering by timestamp. Every change is written straight through to the
+# storage backend as a single record, nothing is reread from disk.
+# Entries are compact journal_entry.Entry objects holding only the list
+# fields; descriptions stay in the backend until get_full asks for one.
+# Another process may change the same journal: refresh() picks up just the
+# entries it touched (or reloads everything if the backend can't say which).
+# Archived months (see journal_archive) stay on disk until something reaches
+# into them: scrolling the list that far back, a search covering them, or an
+# import with entries from then. Until then only their counts and time spans
+# are known, which is enough to keep the newest-first positions right. The
+# list view doesn't load them itself: it gets an ArchivedRow in their place
+# and asks for the month on the journal thread.
+# The app changes the store from a worker thread while the list view reads it
+# on the Tk thread, so everything that touches by_id/_order holds self.lock.
+# Disk work (reading a segment or a description, writing a change) happens
+# outside it, so the list never waits on the disk.
+# Listeners are called after the lock is released, on the thread that made
+# the change.
+# A clean close() leaves a snapshot (see snapshot.py) that the next open
+# starts from while the files it was taken from haven't changed.
+import threading
+import uuid
+from bisect import bisect_left, insort
+
+from journal_entry import timestamp_to_us
+from search_index import SearchIndex
+from snapshot import read_snapshot, read_snapshot_index, write_snapshot
+
+
+def new_entry_id():
+    return uuid.uuid4().hex
+
+
+class ArchivedRow:
+    # Stands in for an entry of an archived month that isn't loaded yet
+    __slots__ = ("id", "month")
+
+    def __init__(self, month, index):
+        self.id = f"archived:{month}:{index}"
+        self.month = month
+
+
+class NewestFirst:
+    # Read-only newest-first view over the store, no copying. With placeholders,
+    # entries of archived months come back as ArchivedRow instead of being loaded.
+    def __init__(self, store, placeholders=False):
+        self.store = store
+        self.placeholders = placeholders
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, index):
+        if self.placeholders:
+            return self.store.newest_or_archived(index)
+        return self.store.newest(index)
+
+
+class JournalStore:
+    def __init__(self, storage, index_path=None, snapshot_path=None):
+        self.storage = storage
+        self.index_path = index_path
+        self.snapshot_path = snapshot_path
+        self.lock = threading.RLock()
+        self.by_id = {}
+        self._order = []  # (ts, id), oldest first
+        self._index = None
+        self._warm_index = None  # where the snapshot's search index is, read when it's first needed
+        self.months = {}  # archived months not loaded yet: month -> {"count", "first_ts", "last_ts", "names"}
+        # Called as listener(op, entry, old) after every change ("add_many" passes a list).
+        # "reload" is a change from another process: entry is the list of changed
+        # entries, or None after a full reload. It's already in that process's stats.
+        self.listeners = []
+        self.load(warm=read_snapshot(snapshot_path) if snapshot_path else None)
+
+    def load(self, warm=None):
+        # The backends hand out ids for entries written before ids existed
+        loaded = self.storage.load_snapshot(warm[0]["journal"]) if warm else None
+        if loaded is None:
+            by_id, unchanged = self.storage.load_entries(), False
+        else:
+            by_id, unchanged = loaded
+        order = sorted((e.ts, e.id) for e in by_id.values())
+        self._warm_index = warm[1] if unchanged else None  # written to since: stale like a saved one
+        segments = self.storage.load_segments()
+        with self.lock:
+            self.by_id = by_id
+            self._order = order
+            self.months = {}
+            self._set_months(segments)
+
+    def _set_months(self, segments, only=None):
+        months = {}
+        for segment in segments:
+            if only is not None and segment["month"] not in only:
+                continue
+            month = months.setdefault(segment["month"], {
+                "count": 0, "first_ts": segment["first_ts"], "last_ts": segment["last_ts"], "names": []
+            })
+            month["count"] += segment["count"]
+            month["first_ts"] = min(month["first_ts"], segment["first_ts"])
+            month["last_ts"] = max(month["last_ts"], segment["last_ts"])
+            month["names"].append(segment["name"])
+        self.months = months
+        self._months_newest_first = sorted(months, key=lambda m: months[m]["last_ts"], reverse=True)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.by_id) + sum(month["count"] for month in self.months.values())
+
+    # === Archived months ===
+    def load_month(self, month):
+        # Call without holding the lock: the segments are read before taking it
+        with self.lock:
+            info = self.months.get(month)
+        if info is None:
+            return  # loaded meanwhile
+        loaded = {}
+        for name in info["names"]:
+            loaded.update(self.storage.load_segment(name))
+        with self.lock:
+            if self.months.get(month) is not info:
+                return
+            del self.months[month]
+            self._months_newest_first.remove(month)
+            added = []
+            for entry_id, entry in loaded.items():
+                if entry_id not in self.by_id:
+                    self.by_id[entry_id] = entry
+                    added.append((entry.ts, entry_id))
+            self._order.extend(added)
+            self._order.sort()  # two sorted runs, Timsort merges them
+
+    def load_between(self, start=None, end=None):
+        # Loads every archived month overlapping [start, end); True if there were any
+        with self.lock:
+            months = [
+                month for month, info in self.months.items()
+                if (start is None or info["last_ts"] >= start) and (end is None or info["first_ts"] < end)
+            ]
+        for month in months:
+            self.load_month(month)
+        return bool(months)
+
+    def load_archive(self):
+        return self.load_between()
+
+    def _count_between(self, first_ts, last_ts):
+        return bisect_left(self._order, (last_ts + 1,)) - bisect_left(self._order, (first_ts,))
+
+    def newest(self, index):
+        # The index-th entry, newest first, counting archived months that aren't loaded.
+        # Entries from a month that isn't loaded get their month loaded first.
+        while True:
+            entry = self.newest_or_archived(index)
+            if not isinstance(entry, ArchivedRow):
+                return entry
+            self.load_month(entry.month)
+
+    def newest_or_archived(self, index):
+        # Like newest(), but an ArchivedRow where the month would have to be loaded
+        with self.lock:
+            if index < 0:
+                index += len(self)
+            before = 0  # entries of unloaded months newer than the current position
+            for month in self._months_newest_first:
+                info = self.months[month]
+                newer = len(self._order) - bisect_left(self._order, (info["last_ts"] + 1,))
+                start = newer + before
+                if index < start:
+                    break
+                if index < start + info["count"] + self._count_between(info["first_ts"], info["last_ts"]):
+                    return ArchivedRow(month, index)  # somewhere among this month's entries
+                before += info["count"]
+            position = len(self._order) - 1 - (index - before)
+            if position < 0:
+                raise IndexError(index)
+            return self.by_id[self._order[position][1]]
+
+    def get(self, entry_id):
+        return self.by_id.get(entry_id)
+
+    def get_full(self, entry_id):
+        # The entry with its description, read from the backend. None if it isn't here (any more).
+        with self.lock:
+            entry = self.by_id.get(entry_id)
+        if entry is None:
+            return None
+        try:
+            return entry.replace(description=self.storage.load_description(entry_id))
+        except KeyError:
+            return None  # deleted by another process since
+
+    def get_many_full(self, entry_ids):
+        # {id: entry with its description} for those of entry_ids that are here, read in one go
+        with self.lock:
+            entry_ids = [i for i in entry_ids if i in self.by_id]
+        return {entry.id: entry for entry in self.storage.iter_full_entries(entry_ids)}
+
+    def newest_first(self, placeholders=False):
+        return NewestFirst(self, placeholders)
+
+    def iter_full(self):
+        # Every entry with its description, oldest first, without loading them all at once
+        self.load_archive()
+        with self.lock:
+            entry_ids = [entry_id for _, entry_id in self._order]
+        return self.storage.iter_full_entries(entry_ids)
+
+    def has_timestamp(self, ts):
+        self.load_between(ts, ts + 1)
+        with self.lock:
+            return self._has_timestamp(ts)
+
+    def _has_timestamp(self, ts):
+        i = bisect_left(self._order, (ts,))
+        return i < len(self._order) and self._order[i][0] == ts
+
+    # === Search ===
+    @property
+    def index(self):
+        # Loaded (or rebuilt if stale) on the first search or change, then kept in step.
+        # Searches and changes come from one thread at a time, so building it doesn't
+        # need the lock and the list view can keep reading meanwhile.
+        if not self.load_saved_index():
+            self._index = SearchIndex.build(self.storage.load_full_entries().values())
+        return self._index
+
+    def load_saved_index(self):
+        # True if the index is there: in memory, in the snapshot, or saved and still current
+        if self._index is None and self._warm_index is not None:
+            data = read_snapshot_index(self.snapshot_path, self._warm_index)
+            if data is not None:
+                self._index = SearchIndex.undump(data)
+        if self._index is None and self.index_path:
+            self._index = SearchIndex.load(self.index_path, self.storage.journal_signature())
+        self._warm_index = None
+        return self._index is not None
+
+    def search(self, text="", entry_type=None, start=None, end=None):
+        # start/end are ISO timestamps (or dates), end is exclusive. Newest first.
+        ids = self.index.query(text)
+        start = timestamp_to_us(start) if start else None
+        end = timestamp_to_us(end) if end else None
+        with self.lock:
+            missing = ids is None or not ids.issubset(self.by_id)
+        if missing:
+            self.load_between(start, end)  # the search reaches into archived months
+        with self.lock:
+            lo = bisect_left(self._order, (start,)) if start is not None else 0
+            hi = bisect_left(self._order, (end,)) if end is not None else len(self._order)
+            if ids is None:
+                entries = [self.by_id[i] for _, i in reversed(self._order[lo:hi])]
+            elif len(ids) > (hi - lo) // 8:
+                # Lots of hits: walking the ordered range beats sorting them
+                entries = [self.by_id[i] for _, i in reversed(self._order[lo:hi]) if i in ids]
+            else:
+                entries = [self.by_id[i] for i in ids if i in self.by_id]  # the rest is archived outside the range
+                if start is not None:
+                    entries = [e for e in entries if e.ts >= start]
+                if end is not None:
+                    entries = [e for e in entries if e.ts < end]
+                entries.sort(key=lambda e: (e.ts, e.id), reverse=True)
+        if entry_type:
+            entries = [e for e in entries if e.type == entry_type]
+        return entries
+
+    # === Changes ===
+    # Written to the backend first, then put in memory under the lock: a write that
+    # fails leaves the store as it was. Changes come from one thread at a time, so
+    # nothing else changes the entry in between.
+    def add(self, entry):
+        index = self.index
+        entry = entry.replace(id=entry.id or new_entry_id())
+        key = (entry.ts, entry.id)
+        self.storage.add_entry(entry)
+        with self.lock:
+            if not self._order or key > self._order[-1]:
+                self._order.append(key)  # the usual case, a brand new entry
+            else:
+                insort(self._order, key)
+            self.by_id[entry.id] = entry.light()
+        index.add(entry)
+        self._notify("add", entry)
+        return entry
+
+    def add_many(self, entries):
+        # Bulk add for imports: one storage commit and one notification for the batch.
+        # Entries whose id is already here, or without an id but with a timestamp
+        # that's already here (the old identity of an entry), are skipped.
+        added = []
+        lights = []
+        new_ids = set()
+        new_timestamps = set()
+        if entries:
+            # Duplicates of archived entries can only be spotted with their month loaded
+            self.load_between(min(e.ts for e in entries), max(e.ts for e in entries) + 1)
+        with self.lock:
+            for entry in entries:
+                if entry.id:
+                    if entry.id in self.by_id or entry.id in new_ids:
+                        continue
+                elif entry.ts in new_timestamps or self._has_timestamp(entry.ts):
+                    continue
+                else:
+                    entry = entry.replace(id=new_entry_id())
+                new_ids.add(entry.id)
+                new_timestamps.add(entry.ts)
+                added.append(entry)
+                lights.append(entry.light())
+        if not added:
+            return added
+        self.storage.add_entries(added, lights)  # the slow part, the list view keeps reading meanwhile
+        keys = sorted((entry.ts, entry.id) for entry in added)
+        with self.lock:
+            for light in lights:
+                self.by_id[light.id] = light
+            if self._order and keys[0] < self._order[-1]:
+                self._order.extend(keys)
+                self._order.sort()  # two sorted runs, Timsort merges them
+            else:
+                self._order.extend(keys)  # the usual case, importing newer entries
+        self._warm_index = None  # goes stale like a saved one
+        if self._index is not None:
+            # A saved index goes stale by itself when the journal changes, so only a loaded one needs this
+            for entry in added:
+                self._index.add(entry)
+        self._notify("add_many", added)
+        return added
+
+    def update(self, entry_id, **fields):
+        # None if the entry isn't here (any more), say deleted while it was being edited
+        index = self.index
+        old = self.get_full(entry_id)
+        if old is None:
+            return None
+        entry = old.replace(**fields)
+        self.storage.update_entry(entry_id, entry)
+        with self.lock:
+            if entry.ts != old.ts:
+                self._remove_key(old)
+                insort(self._order, (entry.ts, entry_id))
+            self.by_id[entry_id] = entry.light()
+        index.update(old, entry)
+        self._notify("update", entry, old)
+        return entry
+
+    def delete(self, entry_id):
+        if entry_id not in self.by_id:
+            return None
+        index = self.index
+        entry = self.get_full(entry_id)  # the index needs the description to drop its words
+        if entry is None:
+            return None  # deleted meanwhile
+        self.storage.delete_entry(entry_id)
+        with self.lock:
+            del self.by_id[entry_id]
+            self._remove_key(entry)
+        index.remove(entry)
+        self._notify("delete", entry)
+        return entry
+
+    def refresh(self):
+        # Returns True if anything changed
+        changes = self.storage.poll_journal()
+        if changes is None:
+            self.load()
+            self._index = None  # rebuilt (or found stale on disk) on the next search
+            self._notify("reload", None)
+            return True
+        if not changes:
+            return False
+        segments = self.storage.load_segments()
+        changed = []
+        with self.lock:
+            self._set_months(segments, only=set(self.months))  # counts of shadowed entries
+            for entry_id, entry, old in changes:
+                if entry_id in self.by_id:
+                    self._remove_key(self.by_id.pop(entry_id))
+                if entry is not None:
+                    self.by_id[entry_id] = entry.light()
+                    insort(self._order, (entry.ts, entry_id))
+                    changed.append(entry)
+        self._warm_index = None  # goes stale like a saved one
+        for entry_id, entry, old in changes:
+            if self._index is not None:
+                if old is not None and entry is not None:
+                    self._index.update(old, entry)
+                elif old is not None:
+                    self._index.remove(old)
+                elif entry is not None:
+                    self._index.add(entry)
+        self._notify("reload", changed)
+        return True
+
+    def _notify(self, op, entry, old=None):
+        for listener in self.listeners:
+            listener(op, entry, old)
+
+    def _remove_key(self, entry):
+        key = (entry.ts, entry.id)
+        i = bisect_left(self._order, key)
+        if i < len(self._order) and self._order[i] == key:
+            del self._order[i]
+
+    def close(self):
+        # The storage itself belongs to whoever opened it, just let background writes finish
+        self.storage.sync()
+        if self._index is not None and self._index.dirty and self.index_path:
+            self._index.save(self.index_path, self.storage.journal_signature())
+        if self.snapshot_path:
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        # True if written; not when other processes' changes haven't been taken in yet
+        with self.lock:
+            journal = self.storage.journal_snapshot()
+            if journal is None:
+                return False
+            if self._index is not None:
+                index = self._index.dump()
+            elif self._warm_index is not None:
+                # Never needed this time, still current
+                index = read_snapshot_index(self.snapshot_path, self._warm_index)
+            else:
+                index = None
+        write_snapshot(self.snapshot_path, {"journal": journal}, index)
+        return True
@@ -0,0 +1,153 @@
+# === HOT-PATH METRICS ===
+# Opt-in timing for the work that runs on the Tk main thread: call counts and
+# latency histograms per path, plus event-loop lag (how late an `after`
+# callback fires compared to when it was due). Turned on by DEBUG_MODE or
+# STREAKSTEP_METRICS=1; when off, nothing is wrapped and the hot paths pay
+# nothing. The numbers are shown in a debug panel and flushed to metrics.json.
+# Storage calls are timed on the journal thread, so the histograms are only
+# touched under a lock.
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from persistence import atomic_write_json
+
+METRICS_ENABLED = os.environ.get("STREAKSTEP_METRICS", "") not in ("", "0")
+METRICS_FILE = "metrics.json"
+FLUSH_INTERVAL_MS = 30 * 1000
+LAG_INTERVAL_MS = 250
+
+# Upper bounds of the histogram buckets in milliseconds, the last one catches the rest
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, float("inf"))
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket the percentile falls in, good enough to spot trouble
+        if self.count == 0:
+            return 0.0
+        wanted = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= wanted:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.5), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": {str(bound): count for bound, count in zip(BUCKETS_MS, self.counts) if count}
+        }
+
+
+class Metrics:
+    def __init__(self, enabled=METRICS_ENABLED, path=None):
+        self.enabled = enabled
+        self.path = path
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def record(self, name, ms):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(ms)
+
+    @contextmanager
+    def timed(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def instrument(self, obj, attr, name=None):
+        # Swap obj.attr for a timed wrapper on this instance only
+        if not self.enabled:
+            return
+        method = getattr(obj, attr)
+        name = name or f"{type(obj).__name__}.{attr}"
+
+        @functools.wraps(method)
+        def timed_method(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record(name, (time.perf_counter() - start) * 1000)
+
+        setattr(obj, attr, timed_method)
+
+    def snapshot(self):
+        with self.lock:
+            paths = {name: h.snapshot() for name, h in sorted(self.histograms.items())}
+        return {"started": self.started, "written": time.time(), "paths": paths}
+
+    def summary_lines(self):
+        lines = [f"{'path':<24} {'calls':>6} {'p50':>7} {'p95':>7} {'max':>8}"]
+        with self.lock:
+            for name, h in sorted(self.histograms.items()):
+                lines.append(f"{name:<24} {h.count:>6} {h.percentile(0.5):>7.2f} {h.percentile(0.95):>7.2f} {h.max_ms:>8.2f}")
+        return lines
+
+    def flush(self):
+        if self.enabled and self.path and self.histograms:
+            atomic_write_json(self.path, self.snapshot(), indent=2)
+
+    # === Tk hooks ===
+    def start(self, root, lag_interval_ms=LAG_INTERVAL_MS, flush_interval_ms=FLUSH_INTERVAL_MS):
+        if not self.enabled:
+            return
+        LoopLagMonitor(root, self, lag_interval_ms).start()
+
+        def flush_later():
+            self.flush()
+            root.after(flush_interval_ms, flush_later)
+
+        root.after(flush_interval_ms, flush_later)
+
+
+class LoopLagMonitor:
+    # Asks Tk for a callback every interval and records how late it arrives
+    def __init__(self, root, metrics, interval_ms=LAG_INTERVAL_MS, name="tk.loop_lag"):
+        self.root = root
+        self.metrics = metrics
+        self.interval_ms = interval_ms
+        self.name = name
+        self._due = None
+
+    def start(self):
+        self._due = time.perf_counter() + self.interval_ms / 1000
+        self.root.after(self.interval_ms, self._fire)
+
+    def _fire(self):
+        lag_ms = max((time.perf_counter() - self._due) * 1000, 0.0)
+        self.metrics.record(self.name, lag_ms)
+        self.start()
@@ -0,0 +1,116 @@
+# === WRITE-BEHIND SAVE FILE ===
+# Keeps the streak state off the per-second timer path: changes are marked
+# dirty and bursts of changes collapse into one delayed write to the storage
+# backend. atomic_write_json writes to a temp file first so a crash never
+# leaves a half-written file behind. If another process saved in the meantime,
+# the merge hook (when set) combines its state with ours before writing.
+import json
+import os
+import stat
+import tempfile
+from datetime import datetime
+
+# Read once at import, before any threads: os.umask can only be read by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def keep_mode(tmp_path, path):
+    # mkstemp files are owner-only. Before tmp_path replaces path, give it path's
+    # permissions, or the ones a plain open() would have given a new file.
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~UMASK
+    os.chmod(tmp_path, mode)
+
+
+def atomic_write_json(path, obj, **dump_kwargs):
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=folder)
+    try:
+        with os.fdopen(fd, "w") as f:
+            # dumps builds the text with the C encoder, dump would go through the pure Python one
+            f.write(json.dumps(obj, **dump_kwargs))
+            f.flush()
+            os.fsync(f.fileno())
+        keep_mode(tmp_path, path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def encode_data(data):
+    # datetimes become ISO strings, also inside nested dicts and lists
+    if isinstance(data, datetime):
+        return data.isoformat()
+    if isinstance(data, dict):
+        return {key: encode_data(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [encode_data(value) for value in data]
+    return data
+
+
+class DataStore:
+    def __init__(self, storage, after=None, after_cancel=None, delay_ms=2000):
+        self.storage = storage
+        self.after = after              # e.g. root.after; None means write straight away
+        self.after_cancel = after_cancel
+        self.delay_ms = delay_ms
+        self.merge = None               # merge(their saved state) -> our data, merged
+
+        self.dirty = False
+        self._data = None
+        self._pending = None
+
+        self.writes_performed = 0
+        self.writes_avoided = 0
+
+    def load(self):
+        return self.storage.load_state()
+
+    def mark_dirty(self, data):
+        self._data = data
+        if self.dirty:
+            # Already waiting on a write, this change rides along with it
+            self.writes_avoided += 1
+            return
+        self.dirty = True
+        if self.after is None:
+            self.flush()
+        else:
+            self._pending = self.after(self.delay_ms, self._write_pending)
+
+    def save(self, data):
+        # Old call sites saved unconditionally; only hit the disk if something changed
+        if self.dirty:
+            self._data = data
+        else:
+            self.writes_avoided += 1
+
+    def flush(self):
+        if self._pending is not None and self.after_cancel is not None:
+            self.after_cancel(self._pending)
+        self._pending = None
+        if not self.dirty:
+            return
+        merge = None
+        if self.merge is not None:
+            merge = lambda saved: encode_data(self.merge(saved))
+        self.storage.save_state(encode_data(self._data), merge=merge)
+        self.dirty = False
+        self.writes_performed += 1
+
+    def _write_pending(self):
+        self._pending = None
+        try:
+            self.flush()
+        except Exception as e:
+            # Still dirty: try again after the usual delay instead of waiting for close()
+            print("Error saving data:", e)
+            self._pending = self.after(self.delay_ms, self._write_pending)
+
+    def stats(self):
+        return {"performed": self.writes_performed, "avoided": self.writes_avoided}
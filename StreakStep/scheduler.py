@@ -0,0 +1,112 @@
+# === ADAPTIVE TICK SCHEDULER ===
+# Instead of waking up every second, work out when the timer text will next
+# change and sleep until then. Anything that changes the state calls wake().
+import heapq
+import itertools
+import math
+import time
+
+DAY_SECONDS = 24 * 60 * 60
+# Never sleep longer than this, so clock offset updates and machine
+# suspend/resume get picked up without waiting for a day boundary
+MAX_SLEEP_MS = 10 * 60 * 1000
+# Land just after a boundary rather than just before it
+BOUNDARY_SLACK_MS = 5
+
+
+def next_change_ms(remaining_seconds, full_timer_mode):
+    if remaining_seconds <= 0:
+        return MAX_SLEEP_MS
+    if full_timer_mode:
+        # The seconds digit changes each time we cross a whole second
+        until = remaining_seconds - math.floor(remaining_seconds) or 1.0
+    else:
+        # "N Days left" rounds whole seconds up to days, so it changes once
+        # the whole seconds left drop to the previous day boundary
+        days = math.ceil(math.floor(remaining_seconds) / DAY_SECONDS)
+        if days == 0:
+            until = remaining_seconds
+        else:
+            until = remaining_seconds - ((days - 1) * DAY_SECONDS + 1)
+    return min(int(until * 1000) + BOUNDARY_SLACK_MS, MAX_SLEEP_MS)
+
+
+class TickScheduler:
+    # One root.after for any number of trackers. Each tracker has a deadline
+    # (when its display or goal state next changes) in a min-heap, and only the
+    # earliest one is armed. Rescheduling pushes a new heap entry and leaves the
+    # old one behind to be skipped, so every event costs O(log trackers).
+    def __init__(self, root, tick, now=time.monotonic):
+        self.root = root
+        self.tick = tick      # tick(key) redraws one tracker and schedules it again
+        self.now = now
+        self.heap = []        # (due, seq, key), may hold stale entries
+        self.due = {}         # key -> current deadline
+        self._seq = itertools.count()
+        self._pending = None
+        self._armed_for = None
+        self._firing = False  # ticks reschedule themselves; arm once after all of them ran
+
+    def schedule(self, key, delay_ms):
+        due = self.now() + max(delay_ms, 0) / 1000
+        self.due[key] = due
+        heapq.heappush(self.heap, (due, next(self._seq), key))
+        if not self._firing:
+            self._arm()
+
+    def wake(self, key):
+        self.schedule(key, 0)
+
+    def remove(self, key):
+        self.due.pop(key, None)
+        self._arm()
+
+    def cancel(self):
+        self.heap.clear()
+        self.due.clear()
+        self._disarm()
+
+    def _drop_stale(self):
+        while self.heap and self.due.get(self.heap[0][2]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+
+    def _arm(self):
+        self._drop_stale()
+        if not self.heap:
+            self._disarm()
+            return
+        due = self.heap[0][0]
+        if self._pending is not None and self._armed_for == due:
+            return
+        self._disarm()
+        delay_ms = max(math.ceil((due - self.now()) * 1000), 0)
+        self._armed_for = due
+        if delay_ms == 0:
+            self._pending = self.root.after_idle(self._fire)
+        else:
+            self._pending = self.root.after(delay_ms, self._fire)
+
+    def _disarm(self):
+        if self._pending is not None:
+            self.root.after_cancel(self._pending)
+            self._pending = None
+            self._armed_for = None
+
+    def _fire(self):
+        self._pending = None
+        self._armed_for = None
+        now = self.now()
+        due_keys = []
+        self._drop_stale()
+        while self.heap and self.heap[0][0] <= now:
+            _, _, key = heapq.heappop(self.heap)
+            del self.due[key]
+            due_keys.append(key)
+            self._drop_stale()
+        self._firing = True
+        try:
+            for key in due_keys:
+                self.tick(key)
+        finally:
+            self._firing = False
+        self._arm()
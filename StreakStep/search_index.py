@@ -0,0 +1,136 @@
+# === JOURNAL SEARCH INDEX ===
+# Inverted index over entry titles and descriptions. Kept up to date one entry
+# at a time as the journal changes, and saved next to the journal so it
+# doesn't have to be rebuilt on every launch. Every query term matches as a
+# prefix, and all terms have to match (so "tem wal" finds "tempted, went for a walk").
+import json
+import os
+import pickle
+import re
+from bisect import bisect_left, insort
+
+from persistence import atomic_write_json
+
+INDEX_VERSION = 2
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def entry_tokens(entry):
+    return set(tokenize(entry.title)) | set(tokenize(entry.description or ""))
+
+
+class SearchIndex:
+    def __init__(self):
+        self.postings = {}    # token -> set of entry ids
+        self.vocab = []       # sorted tokens for prefix lookups
+        self.dirty = False
+
+    # === Building ===
+    @classmethod
+    def build(cls, entries):
+        index = cls()
+        for entry in entries:
+            index.add(entry)
+        return index
+
+    @classmethod
+    def load(cls, path, signature):
+        # Returns None if the saved index is missing or older than the journal
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                saved = json.load(f)
+        except Exception as e:
+            print("Error loading search index:", e)
+            return None
+        if saved.get("version") != INDEX_VERSION or saved.get("source") != signature:
+            return None
+
+        index = cls()
+        docs = saved["docs"]
+        for token, numbers in saved["postings"].items():
+            index.postings[token] = {docs[n] for n in numbers}
+        index.vocab = sorted(index.postings)
+        return index
+
+    def dump(self):
+        # For the warm-start snapshot: the sets pickle as they are, sharing one copy of each id
+        return pickle.dumps((self.postings, self.vocab), protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def undump(cls, data):
+        index = cls()
+        index.postings, index.vocab = pickle.loads(data)
+        return index
+
+    def save(self, path, signature):
+        # Ids are written once and postings refer to them by number, which keeps the file small
+        numbers = {}
+        postings = {}
+        for token, ids in self.postings.items():
+            postings[token] = [numbers.setdefault(entry_id, len(numbers)) for entry_id in ids]
+        atomic_write_json(path, {
+            "version": INDEX_VERSION,
+            "source": signature,
+            "docs": list(numbers),
+            "postings": postings
+        })
+        self.dirty = False
+
+    # === Incremental updates ===
+    def add(self, entry):
+        for token in entry_tokens(entry):
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = set()
+                insort(self.vocab, token)
+            ids.add(entry.id)
+        self.dirty = True
+
+    def remove(self, entry):
+        # Takes the entry as it was indexed, its tokens say which postings to touch
+        for token in entry_tokens(entry):
+            ids = self.postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(entry.id)
+            if not ids:
+                del self.postings[token]
+                i = bisect_left(self.vocab, token)
+                if i < len(self.vocab) and self.vocab[i] == token:
+                    del self.vocab[i]
+        self.dirty = True
+
+    def update(self, old_entry, entry):
+        if entry_tokens(old_entry) == entry_tokens(entry):
+            self.dirty = True  # journal file still moved on, so re-save with the new signature
+            return
+        self.remove(old_entry)
+        self.add(entry)
+
+    # === Queries ===
+    def prefix_ids(self, prefix):
+        ids = set()
+        i = bisect_left(self.vocab, prefix)
+        while i < len(self.vocab) and self.vocab[i].startswith(prefix):
+            ids |= self.postings[self.vocab[i]]
+            i += 1
+        return ids
+
+    def query(self, text):
+        terms = tokenize(text)
+        if not terms:
+            return None
+        # Intersect starting from the smallest set of matches
+        matches = sorted((self.prefix_ids(term) for term in set(terms)), key=len)
+        result = matches[0]
+        for ids in matches[1:]:
+            result = result & ids
+            if not result:
+                break
+        return result
@@ -0,0 +1,304 @@
+# === HEADLESS SIMULATION ===
+# Runs the streak logic, the tick scheduler, the write-behind save file, the
+# stats ledger and the journal against a SimulatedClock instead of the wall
+# clock, so years of use replay in seconds. SimLoop stands in for the Tk root:
+# it keeps the after() callbacks in a heap and jumps the clock straight to the
+# next one. Scripted events (failures, journal writes, habits coming and
+# going) come from a JSONL file or are generated from a seed; goal prompts are
+# answered continue/reset at random with --continue-rate.
+# Invariants are checked on every tick and the run ends with a throughput
+# report.
+#   python simulate.py --years 5 --habits 3
+#   python simulate.py --years 1 --full-timer --json
+#   python simulate.py --script events.jsonl --data-dir sim-data
+# events.jsonl lines look like
+#   {"at": "2026-03-01T08:00:00", "event": "fail", "habit": "Main"}
+#   {"at": "2026-03-01T21:30:00", "event": "journal", "type": "victory", "title": "Walked"}
+#   {"at": "2026-04-01T00:00:00", "event": "add_habit", "habit": "Reading"}   (or "remove_habit")
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from clock import SimulatedClock
+from core import DEFAULT_HABIT, ENTRY_TYPES, make_entry, open_journal, open_stats, open_storage, open_trackers
+from scheduler import TickScheduler, next_change_ms
+
+MAX_LATE_SECONDS = 0.5  # a due goal has to be noticed this soon after it's reached
+
+
+class SimLoop:
+    # The bits of the Tk root the app's timers use, on simulated time
+    def __init__(self, clock):
+        self.clock = clock
+        self.heap = []  # (due, id, callback, args)
+        self.cancelled = set()
+        self._ids = itertools.count()
+        self.callbacks = 0
+
+    def after(self, ms, callback, *args):
+        job = next(self._ids)
+        heapq.heappush(self.heap, (self.clock.elapsed + ms / 1000, job, callback, args))
+        return job
+
+    def after_idle(self, callback, *args):
+        return self.after(0, callback, *args)
+
+    def after_cancel(self, job):
+        self.cancelled.add(job)
+
+    def run_until(self, elapsed):
+        heap = self.heap
+        cancelled = self.cancelled
+        clock = self.clock
+        while heap and heap[0][0] <= elapsed:
+            due, job, callback, args = heapq.heappop(heap)
+            if job in cancelled:
+                cancelled.discard(job)
+                continue
+            if due > clock.elapsed:
+                clock.elapsed = due
+            callback(*args)
+            self.callbacks += 1
+        clock.advance_to(elapsed)
+
+
+def generate_events(start, days, habits, seed, fail_every_days=30, journal_per_day=1.0):
+    # A plausible few years: an occasional failure per habit, a journal entry most days
+    rng = random.Random(seed)
+    events = []
+    for habit in habits:
+        day = rng.expovariate(1 / fail_every_days)
+        while day < days:
+            events.append({"at": start + timedelta(days=day), "event": "fail", "habit": habit})
+            day += rng.expovariate(1 / fail_every_days)
+    for day in range(days):
+        for _ in range(int(journal_per_day) + (rng.random() < journal_per_day % 1)):
+            events.append({
+                "at": start + timedelta(days=day, seconds=rng.randrange(86400)), "event": "journal",
+                "type": rng.choice(ENTRY_TYPES), "title": f"Day {day}"
+            })
+    events.sort(key=lambda event: event["at"])
+    return events
+
+
+def read_events(path):
+    with open(path, "r") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    for event in events:
+        event["at"] = datetime.fromisoformat(event["at"])
+    return events
+
+
+class Simulation:
+    def __init__(self, folder, start, habits=(DEFAULT_HABIT,), full_timer=False, continue_rate=0.9,
+                 seed=0, backend="json"):
+        self.clock = SimulatedClock(start)
+        self.loop = SimLoop(self.clock)
+        self.rng = random.Random(seed)
+        self.full_timer = full_timer
+        self.continue_rate = continue_rate
+
+        self.storage = open_storage(folder, backend, self.clock)
+        self.stats = open_stats(self.storage)
+        self.trackers = open_trackers(self.storage, self.clock, self.stats,
+                                      after=self.loop.after, after_cancel=self.loop.after_cancel)
+        self.journal = open_journal(self.storage, self.stats)
+        self.scheduler = TickScheduler(self.loop, self.tick, now=self.clock.monotonic)
+        for habit in habits:
+            if self.trackers.get(habit) is None:
+                self.trackers.add(habit)
+
+        self.congrats_shown = set()
+        self.counts = {"ticks": 0, "goals_reached": 0, "continued": 0, "reset": 0, "failed": 0, "journal": 0}
+        self.violations = []
+        self.last_now = self.clock.now()
+
+    # === What the app does ===
+    def tick(self, name):
+        # update_timer without the labels
+        model = self.trackers.get(name)
+        if model is None:
+            return
+        self.counts["ticks"] += 1
+        remaining = model.remaining().total_seconds()
+        if remaining <= 0:
+            if name not in self.congrats_shown:
+                self.congrats_shown.add(name)
+                if -remaining > MAX_LATE_SECONDS:
+                    self.violation(f"{name}: goal noticed {-remaining:.3f}s late")
+                self.counts["goals_reached"] += 1
+                model.note_goal_reached()
+                self.loop.after_idle(self.answer, name)  # the "another day?" dialog
+        else:
+            self.congrats_shown.discard(name)
+        self.scheduler.schedule(name, next_change_ms(remaining, self.full_timer and model is self.trackers.main))
+        model.save_data()
+        self.check(model, remaining)
+
+    def answer(self, name):
+        model = self.trackers.get(name)
+        if model is None or not model.goal_reached():
+            return
+        if self.rng.random() < self.continue_rate:
+            model.continue_goal()
+            self.counts["continued"] += 1
+        else:
+            model.reset()
+            self.counts["reset"] += 1
+        self.scheduler.wake(name)
+
+    def apply(self, event):
+        kind = event["event"]
+        if kind == "fail":
+            model = self.trackers.get(event.get("habit", DEFAULT_HABIT))
+            if model is not None:
+                model.failed()
+                self.counts["failed"] += 1
+                self.scheduler.wake(model.name)
+        elif kind == "journal":
+            self.journal.add(make_entry(event["title"], event["type"], event.get("description", ""), self.clock.now()))
+            self.counts["journal"] += 1
+        elif kind == "add_habit":
+            if self.trackers.get(event["habit"]) is None:
+                self.trackers.add(event["habit"])
+                self.scheduler.wake(event["habit"])
+        elif kind == "remove_habit":
+            if event["habit"] in self.trackers.models and len(self.trackers.models) > 1:
+                self.trackers.remove(event["habit"])
+                self.scheduler.remove(event["habit"])
+                self.congrats_shown.discard(event["habit"])
+        else:
+            raise ValueError(f"Unknown event {kind!r}")
+
+    # === Invariants ===
+    def violation(self, text):
+        self.violations.append(f"{self.clock.now().isoformat()}  {text}")
+
+    def check(self, model, remaining):
+        data = model.data
+        now = self.clock.now()
+        if now < self.last_now:
+            self.violation("time went backwards")
+        self.last_now = now
+        if data["streak"] < 0 or data["goal_days"] != data["streak"] + 1:
+            self.violation(f"{model.name}: streak {data['streak']} with a {data['goal_days']} day goal")
+        if data["last_goal_start"] > now:
+            self.violation(f"{model.name}: goal starts in the future")
+        if remaining > data["goal_days"] * 86400:
+            self.violation(f"{model.name}: more time left than the goal is long")
+        if model.name not in self.scheduler.due:
+            self.violation(f"{model.name}: no tick scheduled")
+
+    def check_totals(self):
+        # The ledger and the journal have to agree with what happened
+        totals = self.stats.totals()
+        if totals["goals_extended"] != self.counts["continued"]:
+            self.violation(f"stats: {totals['goals_extended']} goals extended, {self.counts['continued']} continued")
+        if totals["resets"] != self.counts["reset"] + self.counts["failed"]:
+            self.violation(f"stats: {totals['resets']} resets, {self.counts['reset'] + self.counts['failed']} happened")
+        if totals["victories"] + totals["setbacks"] != len(self.journal):
+            self.violation(f"stats: {totals['victories'] + totals['setbacks']} journal entries counted, {len(self.journal)} kept")
+        self.trackers.flush()
+        saved = open_trackers(self.storage, self.clock)
+        for name, model in self.trackers.models.items():
+            other = saved.get(name)
+            if other is None or other.data != model.data:
+                self.violation(f"{name}: save file doesn't match the streak in memory")
+
+    # === Running ===
+    def run(self, events, until):
+        for event in events:
+            at = (event["at"] - self.clock.start).total_seconds()
+            if at >= 0:
+                self.loop.after(at * 1000, self.apply, event)
+        for name in self.trackers.names():
+            self.scheduler.wake(name)
+        started = time.perf_counter()
+        self.loop.run_until((until - self.clock.start).total_seconds())
+        wall = time.perf_counter() - started
+        self.check_totals()
+        return self.report(wall)
+
+    def report(self, wall):
+        return dict(
+            self.counts,
+            simulated_days=round(self.clock.elapsed / 86400, 1),
+            callbacks=self.loop.callbacks,
+            wall_seconds=round(wall, 3),
+            ticks_per_second=round(self.counts["ticks"] / wall) if wall else None,
+            callbacks_per_second=round(self.loop.callbacks / wall) if wall else None,
+            simulated_seconds_per_second=round(self.clock.elapsed / wall) if wall else None,
+            save_file=self.trackers.stats(),
+            habits={name: model.data["streak"] for name, model in self.trackers.models.items()},
+            violations=len(self.violations),
+            first_violations=self.violations[:20]
+        )
+
+    def close(self):
+        self.journal.close()
+        self.stats.save()
+        self.storage.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay years of StreakStep use on a simulated clock.")
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--start", default="2025-01-01T08:00:00", help="simulated start time")
+    parser.add_argument("--habits", type=int, default=1, help="number of habits (generated events only)")
+    parser.add_argument("--script", help="JSONL file of events instead of generated ones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--continue-rate", type=float, default=0.9, help="how often a goal prompt is answered yes")
+    parser.add_argument("--journal-per-day", type=float, default=1.0)
+    parser.add_argument("--full-timer", action="store_true", help="tick every second like the full timer view")
+    parser.add_argument("--storage", default="json", help="storage backend")
+    parser.add_argument("--data-dir", help="keep the data files here (default: a temporary folder)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    start = datetime.fromisoformat(args.start)
+    until = start + timedelta(days=365 * args.years)
+    habits = [DEFAULT_HABIT] + [f"Habit {i}" for i in range(2, args.habits + 1)]
+    if args.script:
+        events = read_events(args.script)
+    else:
+        events = generate_events(start, int(365 * args.years), habits, args.seed, journal_per_day=args.journal_per_day)
+
+    folder = args.data_dir or tempfile.mkdtemp(prefix="streakstep-sim-")
+    os.makedirs(folder, exist_ok=True)
+    try:
+        simulation = Simulation(folder, start, habits, args.full_timer, args.continue_rate, args.seed, args.storage)
+        report = simulation.run(events, until)
+        simulation.close()
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(f"{report['simulated_days']} days simulated in {report['wall_seconds']} s")
+        print(f"  ticks       {report['ticks']:>10}  ({report['ticks_per_second']}/s)")
+        print(f"  callbacks   {report['callbacks']:>10}  ({report['callbacks_per_second']}/s)")
+        print(f"  sim speed   {report['simulated_seconds_per_second']} simulated seconds per second")
+        print(f"  goals       {report['goals_reached']} reached, {report['continued']} continued, "
+              f"{report['reset']} reset, {report['failed']} failed")
+        print(f"  journal     {report['journal']} entries")
+        print(f"  save file   {report['save_file']['performed']} writes, {report['save_file']['avoided']} avoided")
+        print(f"  streaks     {report['habits']}")
+        print(f"  invariants  {report['violations']} violated")
+        for line in report["first_violations"]:
+            print("    " + line)
+    return 1 if report["violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
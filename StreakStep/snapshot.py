@@ -0,0 +1,102 @@
+# === WARM-START SNAPSHOT ===
+# When the journal is closed cleanly, what it took to open it (the light
+# entries with their places in the log, and the search index) is written to
+# journal_snapshot.pickle. The next open starts from there instead of parsing
+# the side index and the saved search index, as long as the files it was taken
+# from are still the same files: same inode, size and mtime, which is what the
+# side index itself goes by. The log may also have grown since, by another
+# process appending to it: if the last bytes the snapshot saw are still there,
+# only what came after them is read. Anything else (a different version, a
+# changed or missing file, a damaged snapshot) and it's ignored and the journal
+# loads the usual way.
+# Entries are kept in columns (a list of ids, a list of titles, an array of
+# timestamps...), which pickle much smaller and faster than the objects, and
+# the search index stays pickled until something searches.
+# The snapshot only ever comes from our own data folder, written by us, like
+# every other file there.
+import hashlib
+import os
+import pickle
+import tempfile
+
+from persistence import keep_mode
+
+SNAPSHOT_VERSION = 2
+TAIL_BYTES = 4096
+
+
+def tail_digest(path, size):
+    # SHA-256 of the TAIL_BYTES before size, where an append-only file's older content ends
+    with open(path, "rb") as f:
+        f.seek(max(size - TAIL_BYTES, 0))
+        return hashlib.sha256(f.read(min(size, TAIL_BYTES))).hexdigest()
+
+
+def file_stamp(path, tail=False):
+    # [inode, size, mtime_ns], plus the tail_digest with tail=True; None if there's no such file
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    stamp = [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+    if tail:
+        stamp.append(tail_digest(path, stat.st_size))
+    return stamp
+
+
+def stamp_holds(path, stamp):
+    # "same" if path is the file stamp was taken of, unchanged. "grown" if it has
+    # only been appended to since (tail stamps only). Otherwise None.
+    current = file_stamp(path)
+    if current is None or stamp is None:
+        return "same" if current == stamp else None
+    if current == stamp[:3]:
+        return "same"
+    if len(stamp) > 3 and current[0] == stamp[0] and current[1] > stamp[1] and tail_digest(path, stamp[1]) == stamp[3]:
+        return "grown"
+    return None
+
+
+def write_snapshot(path, payload, index=None):
+    # index (bytes, if any) goes after the payload, so reading the payload doesn't have to read it too
+    folder = os.path.dirname(os.path.abspath(path))
+    token = os.urandom(8).hex()
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".pickle", dir=folder)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump({"version": SNAPSHOT_VERSION, "token": token, "payload": payload}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump((token, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+        keep_mode(tmp_path, path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_snapshot(path):
+    # -> (payload, where the index is for read_snapshot_index), or None
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            saved = pickle.load(f)
+            if not isinstance(saved, dict) or saved.get("version") != SNAPSHOT_VERSION:
+                return None
+            return saved["payload"], (f.tell(), saved["token"])
+    except Exception as e:
+        print("Error loading journal snapshot:", e)
+        return None
+
+
+def read_snapshot_index(path, where):
+    # The index bytes written along with the payload read_snapshot returned where for, or
+    # None if there were none or the snapshot has been replaced since
+    offset, token = where
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            saved_token, index = pickle.load(f)
+    except Exception:
+        return None
+    return index if saved_token == token else None
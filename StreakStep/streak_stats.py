@@ -0,0 +1,163 @@
+# === STREAK HISTORY AND STATS ===
+# Every streak event (goal reached, goal extended, reset) and every journal
+# victory/setback goes into an append-only ledger in the storage backend.
+# StatsEngine keeps per-day, per-week and per-month rollups of those events.
+# The rollups are only a cache: they're saved with a cursor into the ledger,
+# and on the next start only the events after the cursor are replayed.
+# Streak events come from the Tk thread and journal events from the journal's
+# worker thread, so catching up and saving take self.lock.
+import threading
+from datetime import datetime, timedelta
+
+ROLLUP_VERSION = 1
+DAY_US = 24 * 60 * 60 * 1000 * 1000
+PERIODS = ("day", "week", "month")
+
+
+def period_keys(when):
+    year, week, _ = when.isocalendar()
+    return {
+        "day": when.strftime("%Y-%m-%d"),
+        "week": f"{year}-W{week:02d}",
+        "month": when.strftime("%Y-%m")
+    }
+
+
+def empty_bucket():
+    return {
+        "goals_reached": 0,
+        "goals_extended": 0,
+        "resets": 0,
+        "victories": 0,
+        "setbacks": 0,
+        "best_streak": 0,
+        "ended_streaks": 0,
+        "ended_streak_total": 0
+    }
+
+
+def empty_rollups():
+    return {
+        "version": ROLLUP_VERSION,
+        "cursor": 0,
+        "journal_seeded": False,
+        "totals": empty_bucket(),
+        "day": {},
+        "week": {},
+        "month": {}
+    }
+
+
+class StatsEngine:
+    def __init__(self, storage):
+        self.storage = storage
+        self.lock = threading.RLock()
+        saved = storage.load_rollups()
+        if saved and saved.get("version") == ROLLUP_VERSION:
+            self.rollups = saved
+        else:
+            self.rollups = empty_rollups()
+        self.dirty = False
+        self.catch_up()
+
+    # === Ledger ===
+    def catch_up(self):
+        with self.lock:
+            events, cursor = self.storage.load_events(self.rollups["cursor"])
+            for event in events:
+                self.apply(event)
+            if events:
+                self.rollups["cursor"] = cursor
+                self.dirty = True
+
+    def record(self, *events):
+        # Written to the ledger first, then picked up like any other new event
+        self.storage.append_events(list(events))
+        self.catch_up()
+
+    def apply(self, event):
+        if event["event"] == "journal_seeded":
+            self.rollups["journal_seeded"] = True
+            return
+
+        when = datetime.fromisoformat(event["at"])
+        keys = period_keys(when)
+        buckets = [self.rollups["totals"]] + [
+            self.rollups[period].setdefault(keys[period], empty_bucket()) for period in PERIODS
+        ]
+        for bucket in buckets:
+            if event["event"] == "goal_reached":
+                bucket["goals_reached"] += 1
+                bucket["best_streak"] = max(bucket["best_streak"], event["streak"])
+            elif event["event"] == "goal_extended":
+                bucket["goals_extended"] += 1
+                bucket["best_streak"] = max(bucket["best_streak"], event["streak"])
+            elif event["event"] == "reset":
+                bucket["resets"] += 1
+                bucket["best_streak"] = max(bucket["best_streak"], event["streak"])
+                bucket["ended_streaks"] += 1
+                bucket["ended_streak_total"] += event["streak"]
+            elif event["event"] == "journal":
+                field = "victories" if event["type"] == "victory" else "setbacks"
+                bucket[field] += event["delta"]
+
+    def save(self):
+        with self.lock:
+            if self.dirty:
+                self.storage.save_rollups(self.rollups)
+                self.dirty = False
+
+    # === Streak events ===
+    def streak_event(self, name, at, streak, goal_days, **extra):
+        event = {"event": name, "at": at.isoformat(), "streak": streak, "goal_days": goal_days}
+        event.update(extra)
+        self.record(event)
+
+    # === Journal events ===
+    def journal_event(self, entry, delta):
+        return {"event": "journal", "at": entry.timestamp, "type": entry.type, "delta": delta}
+
+    def seed_journal(self, journal):
+        # One time only: count the entries written before the ledger existed
+        if self.rollups["journal_seeded"]:
+            return
+        events = [self.journal_event(entry, 1) for entry in journal.by_id.values()]
+        events.append({"event": "journal_seeded"})
+        self.record(*events)
+
+    def on_journal_change(self, op, entry, old=None):
+        if op == "add":
+            self.record(self.journal_event(entry, 1))
+        elif op == "add_many":
+            # Rollups only go down to days, so one event per day and type covers a whole import
+            groups = {}
+            for e in entry:
+                key = (e.ts // DAY_US, e.type)
+                if key in groups:
+                    groups[key][1] += 1
+                else:
+                    groups[key] = [e, 1]
+            self.record(*(self.journal_event(e, count) for e, count in groups.values()))
+        elif op == "delete":
+            self.record(self.journal_event(entry, -1))
+        elif op == "update" and (old.type, old.ts) != (entry.type, entry.ts):
+            self.record(self.journal_event(old, -1), self.journal_event(entry, 1))
+
+    # === Queries ===
+    def totals(self):
+        return self.rollups["totals"]
+
+    def recent(self, period, count, now):
+        # The last `count` days/weeks/months up to now, newest first, empty ones included
+        rows = []
+        when = now
+        for _ in range(count):
+            key = period_keys(when)[period]
+            rows.append((key, self.rollups[period].get(key, empty_bucket())))
+            if period == "day":
+                when -= timedelta(days=1)
+            elif period == "week":
+                when -= timedelta(weeks=1)
+            else:
+                when = when.replace(day=1) - timedelta(days=1)
+        return rows
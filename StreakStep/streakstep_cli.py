@@ -0,0 +1,418 @@
+# === STREAKSTEP COMMAND LINE ===
+# Scriptable access to the streak and the journal without starting the GUI.
+#   python streakstep_cli.py status
+#   python streakstep_cli.py reset [--habit Reading]
+#   python streakstep_cli.py habit add "Reading" | list | remove "Reading"
+#   python streakstep_cli.py journal add "Title" --type victory --description "..."
+#   python streakstep_cli.py journal list | show <id> | delete <id>
+#   python streakstep_cli.py journal history <id> [--restore 2]
+#   python streakstep_cli.py journal search "walk" --type victory --from 2025-07-01
+#   python streakstep_cli.py journal import entries.csv | export backup.jsonl
+#   python streakstep_cli.py stats --period week --count 8
+#   python streakstep_cli.py sync [--server http://127.0.0.1:8765]
+# Uses the data files in --data-dir (default: $STREAKSTEP_DIR or the current folder)
+# and the storage backend from --storage (default: $STREAKSTEP_STORAGE or json).
+import argparse
+import json
+import os
+import sys
+
+from journal_io import FORMATS, export_entries, import_entries
+from persistence import encode_data
+from sync_client import open_sync
+from core import (
+    ENTRY_TYPES, STORAGE_BACKEND, date_bounds, find_entry, make_entry,
+    open_clock, open_history, open_journal, open_stats, open_storage, open_streak, open_trackers, restore_version
+)
+
+
+def format_remaining(seconds):
+    days, rem = divmod(int(seconds), 86400)
+    hours, rem = divmod(rem, 3600)
+    minutes, seconds = divmod(rem, 60)
+    return f"{days}d {hours}h {minutes}m {seconds}s"
+
+
+def print_status(status, with_name):
+    prefix = f"{status['habit']}: " if with_name else ""
+    if status["goal_reached"]:
+        print(f"{prefix}Streak: {status['streak']}  Goal: {status['goal_days']} days  Goal reached!")
+    else:
+        print(f"{prefix}Streak: {status['streak']}  Goal: {status['goal_days']} days  "
+              f"Left: {format_remaining(status['seconds_left'])}")
+
+
+def cmd_status(args, data_storage, stats):
+    trackers = open_trackers(data_storage, stats=stats)
+    if args.habit:
+        model = trackers.get(args.habit)
+        if model is None:
+            print(f"No habit called {args.habit!r}", file=sys.stderr)
+            return 1
+        statuses = [model.status()]
+    else:
+        statuses = [model.status() for model in trackers.models.values()]
+
+    if args.json:
+        print(json.dumps(statuses[0] if args.habit else statuses))
+    else:
+        for status in statuses:
+            print_status(status, with_name=len(trackers.models) > 1)
+    return 0
+
+
+def cmd_reset(args, data_storage, stats):
+    try:
+        streak = open_streak(data_storage, stats=stats, habit=args.habit)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    streak.failed()
+    streak.store.flush()
+    print("Streak reset.")
+    return 0
+
+
+def cmd_habit_add(args, data_storage, stats):
+    trackers = open_trackers(data_storage, stats=stats)
+    try:
+        trackers.add(args.name)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    trackers.flush()
+    print(f"Tracking {args.name.strip()}.")
+    return 0
+
+
+def cmd_habit_list(args, data_storage, stats):
+    for name in open_trackers(data_storage, stats=stats).names():
+        print(name)
+    return 0
+
+
+def cmd_habit_remove(args, data_storage, stats):
+    trackers = open_trackers(data_storage, stats=stats)
+    try:
+        trackers.remove(args.name)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    trackers.flush()
+    print(f"Stopped tracking {args.name}.")
+    return 0
+
+
+def cmd_stats(args, data_storage, stats):
+    if not stats.rollups["journal_seeded"]:
+        open_journal(data_storage, stats).close()  # counts entries written before the history existed
+    now = open_clock(data_storage.folder).now()
+    rows = stats.recent(args.period, args.count, now)
+    if args.json:
+        print(json.dumps({"totals": stats.totals(), args.period: dict(rows)}))
+        return 0
+
+    totals = stats.totals()
+    print(f"Best streak: {totals['best_streak']}  Goals reached: {totals['goals_reached']}  "
+          f"Resets: {totals['resets']}  Victories: {totals['victories']}  Setbacks: {totals['setbacks']}")
+    print()
+    print(f"{args.period:<12} {'victories':>9} {'setbacks':>9} {'goals':>6} {'resets':>7}")
+    for key, bucket in rows:
+        print(f"{key:<12} {bucket['victories']:>9} {bucket['setbacks']:>9} {bucket['goals_reached']:>6} {bucket['resets']:>7}")
+    return 0
+
+
+def cmd_journal_add(args, data_storage, stats):
+    description = args.description
+    if description == "-":
+        description = sys.stdin.read()
+    try:
+        entry = make_entry(args.title, args.type, description or "", open_clock(data_storage.folder).now())
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    journal = open_journal(data_storage, stats)
+    try:
+        entry = journal.add(entry)
+    finally:
+        journal.close()
+    print(entry.id)
+    return 0
+
+
+def print_entry_line(entry, as_json):
+    if as_json:
+        print(json.dumps(entry.to_dict()))
+    else:
+        print(f"{entry.id[:8]}  {entry.timestamp[:16]}  {entry.type:<8} {entry.title}")
+
+
+def cmd_journal_list(args, data_storage, stats):
+    journal = open_journal(data_storage, stats)
+    try:
+        entries = journal.newest_first()
+        shown = 0
+        for i in range(len(entries)):
+            if args.limit is not None and shown >= args.limit:
+                break
+            entry = entries[i]
+            if args.type and entry.type != args.type:
+                continue
+            print_entry_line(entry, args.json)
+            shown += 1
+    finally:
+        journal.close()
+    return 0
+
+
+def cmd_journal_search(args, data_storage, stats):
+    journal = open_journal(data_storage, stats)
+    try:
+        start, end = date_bounds(args.date_from, args.date_to)
+        results = journal.search(args.query, args.type, start, end)
+        for entry in results[:args.limit]:
+            print_entry_line(entry, args.json)
+    finally:
+        journal.close()  # keeps the saved index fresh if it had to be rebuilt
+    return 0
+
+
+def cmd_journal_show(args, data_storage, stats):
+    journal = open_journal(data_storage, stats)
+    try:
+        entry = find_entry(journal, args.id)
+        if entry is not None:
+            entry = journal.get_full(entry.id)
+    finally:
+        journal.close()
+    if entry is None:
+        print(f"No entry matching {args.id!r}", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(entry.to_dict()))
+    else:
+        print(f"{entry.title} ({entry.type}, {entry.timestamp})")
+        print(f"id: {entry.id}")
+        if entry.description:
+            print()
+            print(entry.description)
+    return 0
+
+
+def cmd_journal_history(args, data_storage, stats):
+    history = open_history(data_storage, open_clock(data_storage.folder))
+    journal = open_journal(data_storage, stats, history)
+    try:
+        entry = find_entry(journal, args.id)
+        if entry is None:
+            print(f"No entry matching {args.id!r}", file=sys.stderr)
+            return 1
+        versions = history.history(entry.id)
+        if args.restore is not None:
+            if not 1 <= args.restore <= len(versions):
+                print(f"No version {args.restore}, the entry has {len(versions)}", file=sys.stderr)
+                return 1
+            restored = restore_version(journal, entry.id, versions[args.restore - 1])
+    finally:
+        journal.close()
+    if args.restore is not None:
+        if restored is None:
+            print(f"{entry.id} was deleted meanwhile", file=sys.stderr)
+            return 1
+        print(f"Restored version {args.restore} of {entry.id}")
+        return 0
+    if args.json:
+        print(json.dumps([version.to_dict() for version in versions]))
+        return 0
+    if not versions:
+        print("Never edited.")
+    for number, version in enumerate(versions, 1):
+        print(f"{number:>3}  {version.at[:16]}  {version.type:<8} {version.title}")
+    return 0
+
+
+def cmd_journal_delete(args, data_storage, stats):
+    journal = open_journal(data_storage, stats)
+    try:
+        entry = find_entry(journal, args.id)
+        if entry is None:
+            print(f"No entry matching {args.id!r}", file=sys.stderr)
+            return 1
+        journal.delete(entry.id)
+    finally:
+        journal.close()
+    print(f"Deleted {entry.id}")
+    return 0
+
+
+def report_progress(progress, text):
+    # One line that keeps overwriting itself on a terminal
+    if sys.stderr.isatty():
+        print("\r" + text.format(**progress), end="", file=sys.stderr, flush=True)
+
+
+def cmd_journal_import(args, data_storage, stats):
+    journal = open_journal(data_storage, stats)
+    progress = None
+    try:
+        for progress in import_entries(journal, args.path, ENTRY_TYPES, args.format, args.batch_size):
+            report_progress(progress, "{read} read, {added} added")
+    except OSError as e:
+        print(e, file=sys.stderr)
+        return 1
+    except UnicodeDecodeError:
+        print(f"{args.path} isn't UTF-8 text", file=sys.stderr)
+        return 1
+    finally:
+        journal.close()
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    print(f"{progress['added']} added, {progress['skipped']} duplicates skipped, {progress['invalid']} invalid")
+    return 0
+
+
+def cmd_journal_export(args, data_storage, stats):
+    journal = open_journal(data_storage, stats)
+    progress = None
+    try:
+        for progress in export_entries(journal, args.path, args.format, args.batch_size):
+            report_progress(progress, "{written}/{total} written")
+    except OSError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        journal.close()
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    print(f"{progress['written']} entries written to {args.path}")
+    return 0
+
+
+def cmd_sync(args, data_storage, stats):
+    client = open_sync(data_storage.folder, args.server)
+    if client is None:
+        print("No sync server set up yet, give one with --server URL", file=sys.stderr)
+        return 1
+    trackers = open_trackers(data_storage, stats=stats)
+    journal = open_journal(data_storage, stats)
+    try:
+        result = client.sync(journal, encode_data(trackers.state()))
+    except Exception as e:
+        print(f"Couldn't sync: {e}", file=sys.stderr)
+        return 1
+    finally:
+        journal.close()
+        client.close()
+    if result["state"] is not None:
+        trackers.merge(result["state"], prefer_theirs=True)  # the server's copy won
+        trackers.mark_dirty(None)
+        trackers.flush()
+    print(f"{result['pushed']} changes sent, {result['pulled']} received")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="StreakStep without the window.")
+    parser.add_argument("--data-dir", default=os.environ.get("STREAKSTEP_DIR", "."),
+                        help="folder holding the StreakStep data files")
+    parser.add_argument("--storage", choices=("json", "sqlite"), default=STORAGE_BACKEND,
+                        help="storage backend to read and write")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    status = commands.add_parser("status", help="show the current streak of every habit")
+    status.add_argument("--habit", help="only this habit")
+    status.add_argument("--json", action="store_true")
+    status.set_defaults(func=cmd_status)
+
+    reset = commands.add_parser("reset", help="reset a streak, same as \"I Couldn't Do It\"")
+    reset.add_argument("--habit", help="habit to reset (default: the main one)")
+    reset.set_defaults(func=cmd_reset)
+
+    habit = commands.add_parser("habit", help="add, list or remove habits")
+    habit_commands = habit.add_subparsers(dest="habit_command", required=True)
+    habit_add = habit_commands.add_parser("add", help="start tracking a habit")
+    habit_add.add_argument("name")
+    habit_add.set_defaults(func=cmd_habit_add)
+    habit_list = habit_commands.add_parser("list", help="list habits, the main one first")
+    habit_list.set_defaults(func=cmd_habit_list)
+    habit_remove = habit_commands.add_parser("remove", help="stop tracking a habit")
+    habit_remove.add_argument("name")
+    habit_remove.set_defaults(func=cmd_habit_remove)
+
+    stats_ = commands.add_parser("stats", help="victories, setbacks, goals and resets over time")
+    stats_.add_argument("--period", choices=("day", "week", "month"), default="day")
+    stats_.add_argument("--count", type=int, default=7, help="how many periods back to show")
+    stats_.add_argument("--json", action="store_true")
+    stats_.set_defaults(func=cmd_stats)
+
+    sync = commands.add_parser("sync", help="send and receive changes through a sync server")
+    sync.add_argument("--server", help="sync server address, remembered for next time")
+    sync.set_defaults(func=cmd_sync)
+
+    journal = commands.add_parser("journal", help="work with journal entries")
+    journal_commands = journal.add_subparsers(dest="journal_command", required=True)
+
+    add = journal_commands.add_parser("add", help="add an entry")
+    add.add_argument("title")
+    add.add_argument("--type", choices=ENTRY_TYPES, default="victory")
+    add.add_argument("--description", default="", help="entry text, or - to read it from stdin")
+    add.set_defaults(func=cmd_journal_add)
+
+    list_ = journal_commands.add_parser("list", help="list entries, newest first")
+    list_.add_argument("--limit", type=int)
+    list_.add_argument("--type", choices=ENTRY_TYPES)
+    list_.add_argument("--json", action="store_true")
+    list_.set_defaults(func=cmd_journal_list)
+
+    search = journal_commands.add_parser("search", help="search titles and descriptions")
+    search.add_argument("query", nargs="?", default="", help="words to find, each matches as a prefix")
+    search.add_argument("--type", choices=ENTRY_TYPES)
+    search.add_argument("--from", dest="date_from", metavar="YYYY-MM-DD")
+    search.add_argument("--to", dest="date_to", metavar="YYYY-MM-DD")
+    search.add_argument("--limit", type=int)
+    search.add_argument("--json", action="store_true")
+    search.set_defaults(func=cmd_journal_search)
+
+    import_ = journal_commands.add_parser("import", help="add entries from a CSV or JSONL file")
+    import_.add_argument("path")
+    import_.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    import_.add_argument("--batch-size", type=int, default=5000, help="entries per storage commit")
+    import_.set_defaults(func=cmd_journal_import)
+
+    export = journal_commands.add_parser("export", help="write every entry to a CSV or JSONL file")
+    export.add_argument("path")
+    export.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    export.add_argument("--batch-size", type=int, default=5000, help="entries between progress updates")
+    export.set_defaults(func=cmd_journal_export)
+
+    show = journal_commands.add_parser("show", help="show one entry")
+    show.add_argument("id", help="entry id or a unique prefix of it")
+    show.add_argument("--json", action="store_true")
+    show.set_defaults(func=cmd_journal_show)
+
+    history = journal_commands.add_parser("history", help="list the saved versions of an entry, or restore one")
+    history.add_argument("id", help="entry id or a unique prefix of it")
+    history.add_argument("--restore", type=int, metavar="N", help="make version N (from the list) current again")
+    history.add_argument("--json", action="store_true")
+    history.set_defaults(func=cmd_journal_history)
+
+    delete = journal_commands.add_parser("delete", help="delete one entry")
+    delete.add_argument("id", help="entry id or a unique prefix of it")
+    delete.set_defaults(func=cmd_journal_delete)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    data_storage = open_storage(args.data_dir, args.storage)
+    stats = open_stats(data_storage)
+    try:
+        return args.func(args, data_storage, stats)
+    finally:
+        stats.save()
+        data_storage.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
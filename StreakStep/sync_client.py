@@ -0,0 +1,171 @@
+# === JOURNAL AND STREAK SYNC ===
+# Keeps the journal and the streak state in step with a sync server (rules in
+# sync_protocol, a server to run locally in sync_server) without uploading the
+# whole journal every time.
+# Local changes are tracked in sync_log by a journal listener that
+# open_journal adds once sync is set up for the folder, so the app and the
+# command line both feed it. A sync then
+#   1. pulls what the server has accepted since our cursor and applies what
+#      beats our own copy,
+#   2. pushes our changes since the last sequence number the server
+#      acknowledged, only the newest per entry, in compressed batches,
+#   3. pulls again if the server turned any of them down.
+# The streak state isn't a journal change: the caller passes it in and gets
+# the server's back to merge (TrackerSet.merge), and a merge that keeps
+# anything of ours goes out again on the next sync.
+import os
+import uuid
+
+from filelock import FileLock
+from journal_entry import Entry
+from persistence import atomic_write_json
+from sync_log import SYNC_STATE, ChangeLog, load_sync_state
+from sync_protocol import PULL_LIMIT, PUSH_BATCH, STATE_ID, pack
+
+SYNC_URL = os.environ.get("STREAKSTEP_SYNC_URL")  # sets sync up for any folder that hasn't been
+TIMEOUT = 10
+
+
+class SyncClient:
+    def __init__(self, folder, server=None):
+        self.folder = folder
+        self.state_path = os.path.join(folder, SYNC_STATE)
+        self.lock = FileLock(self.state_path)  # one sync at a time, across processes too
+        with self.lock:
+            self.state = load_sync_state(folder)
+            if self.state is None:
+                self.state = {"device": uuid.uuid4().hex, "server": None, "pushed": 0, "pulled": 0, "seeded": False}
+            if server:
+                self.state["server"] = server.rstrip("/")
+            self._save_state()
+        self.log = ChangeLog(folder, self.state["device"])
+        self.session = None
+
+    def _save_state(self):
+        atomic_write_json(self.state_path, self.state, indent=2)
+
+    def sync(self, journal, streak_state=None):
+        # streak_state: the save file's contents as they are now, if the streak is to be synced.
+        # Returns {"pushed", "pulled", "state"}; "state" is the server's streak state when
+        # it beat ours, for the caller to merge in, otherwise None.
+        with self.lock:
+            self.state = load_sync_state(self.folder)  # another process may have synced meanwhile
+            if not self.state["server"]:
+                raise ValueError("No sync server set up.")
+            if not self.state["seeded"]:
+                self.seed(journal)
+            # Our streak state goes in before pulling, so a newer one from the server can
+            # beat it. The very first time, whatever the server has gets merged in first.
+            first = not self.log.has("state", STATE_ID)
+            if streak_state is not None and not first:
+                self.log.record_local("state", [(STATE_ID, streak_state)])
+            result = {"pushed": 0, "pulled": 0, "state": None}
+            self._pull(journal, result)
+            if streak_state is not None and first and result["state"] is None:
+                self.log.record_local("state", [(STATE_ID, streak_state)])
+            if self._push(journal, result):
+                self._pull(journal, result)
+            return result
+
+    def seed(self, journal):
+        # The first sync from this folder: everything the log doesn't know about yet goes out
+        known = self.log.known()
+        self.log.record_local("entry", (
+            (entry.id, entry.to_dict()) for entry in journal.iter_full() if ("entry", entry.id) not in known
+        ))
+        self.state["seeded"] = True
+        self._save_state()
+
+    # === Pull ===
+    def _pull(self, journal, result):
+        while True:
+            reply = self._request("GET", "/pull", params={"since": self.state["pulled"], "limit": PULL_LIMIT})
+            for record, ours in self.log.take_remote(reply["records"]):
+                result["pulled"] += 1
+                if record["kind"] == "state":
+                    result["state"] = record["data"]
+                elif ours is None or ours["digest"] != record["digest"]:
+                    self._apply(journal, record, have=ours is not None and ours["digest"] is not None)
+            self.state["pulled"] = reply["cursor"]
+            self._save_state()
+            if not reply["more"]:
+                return
+
+    def _apply(self, journal, record, have):
+        # have: the log says the entry is here, so if it isn't in memory it's in an archived month
+        entry_id = record["id"]
+        data = record["data"]
+        if have and journal.get(entry_id) is None:
+            journal.load_archive()
+        if data is None:
+            journal.delete(entry_id)
+        elif journal.get(entry_id) is None:
+            journal.add(Entry.from_dict(data))
+        else:
+            journal.update(entry_id, title=data["title"], type=data["type"], description=data["description"],
+                           timestamp=data["timestamp"])
+
+    # === Push ===
+    def _push(self, journal, result):
+        # True if the server turned anything down, it has something newer then
+        rejected = False
+        pending = self.log.pending(self.state["pushed"])
+        for start in range(0, len(pending), PUSH_BATCH):
+            batch = pending[start:start + PUSH_BATCH]
+            records = self._outgoing(journal, batch)
+            reply = self._request("POST", "/push", {"device": self.state["device"], "records": records})
+            rejected = rejected or bool(reply["rejected"])
+            accepted = len(batch) - len(reply["rejected"])
+            result["pushed"] += accepted
+            self.state["pushed"] = batch[-1]["seq"]
+            if reply["cursor"] - accepted == self.state["pulled"]:
+                self.state["pulled"] = reply["cursor"]  # nobody else pushed meanwhile, no need to pull ours back
+            self._save_state()
+        return rejected
+
+    def _outgoing(self, journal, batch):
+        # The log has the versions, the journal the contents
+        entry_ids = [record["id"] for record in batch if record["kind"] == "entry" and record["digest"] is not None]
+        if any(journal.get(entry_id) is None for entry_id in entry_ids):
+            journal.load_archive()
+        entries = journal.get_many_full(entry_ids)
+        records = []
+        for record in batch:
+            data = record.get("data")
+            if record["kind"] == "entry":
+                entry = entries.get(record["id"])
+                data = entry.to_dict() if entry is not None else None  # deleted, or gone without the log hearing of it
+            records.append(dict({key: record[key] for key in ("kind", "id", "version", "device")}, data=data))
+        return records
+
+    # === HTTP ===
+    def _request(self, method, path, body=None, params=None):
+        # requests and certifi are slow to import, keep them off the startup path
+        import requests
+        import certifi
+
+        if self.session is None:
+            self.session = requests.Session()
+        headers = {}
+        data = None
+        if body is not None:
+            data = pack(body)
+            headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        response = self.session.request(method, self.state["server"] + path, params=params, data=data,
+                                        headers=headers, timeout=TIMEOUT, verify=certifi.where())
+        response.raise_for_status()
+        return response.json()  # requests undoes the gzip
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+
+def open_sync(folder, server=None):
+    # None until a server has been given for this folder, here, before or in STREAKSTEP_SYNC_URL
+    if server is None and load_sync_state(folder) is None:
+        server = SYNC_URL
+        if not server:
+            return None
+    return SyncClient(folder, server)
@@ -0,0 +1,143 @@
+# === SYNC CHANGE LOG ===
+# What sync_client needs to know about local changes, kept apart from the
+# network side so core can hang it off the journal. Every change to an entry
+# gets a record in sync_log.jsonl: a local sequence number, the entry's new
+# version and a digest of its contents (not the contents, those stay in the
+# journal). Records pulled from a sync server go in too, before they're
+# applied, which is how the listener tells them from edits made here. Several
+# processes may share the log, like the other logs in the data folder.
+import hashlib
+import json
+import os
+
+from filelock import FileLock
+from journal_log import iter_lines
+from sync_protocol import rank
+
+SYNC_LOG = "sync_log.jsonl"
+SYNC_STATE = "sync_state.json"
+
+
+def content_digest(kind, data):
+    if data is None:
+        return None  # deleted
+    if kind == "state":
+        data = dict(data, trackers=sorted(data["trackers"], key=lambda t: t["name"]))  # same habits, any order
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def load_sync_state(folder):
+    # None until sync has been set up for this folder
+    path = os.path.join(folder, SYNC_STATE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def open_change_log(folder):
+    state = load_sync_state(folder)
+    return ChangeLog(folder, state["device"]) if state is not None else None
+
+
+class ChangeLog:
+    # Local records: {"seq", "kind", "id", "version", "device", "digest"} (+ "data" for the state)
+    # Pulled records: the same without "seq"
+    def __init__(self, folder, device):
+        self.path = os.path.join(folder, SYNC_LOG)
+        self.device = device
+        self.lock = FileLock(self.path)
+        self.latest = {}  # (kind, id) -> its newest record
+        self.seq = 0      # highest local sequence number so far
+        self._known = 0   # bytes read so far
+
+    def _catch_up(self):
+        # Call with the lock held: read whatever other processes appended
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == self._known:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._known)
+            data = f.read()
+        data = data[:data.rfind(b"\n") + 1]  # a half-written last line waits for next time
+        for _, _, record in iter_lines(data, base=self._known):
+            self._add(record)
+        self._known += len(data)
+
+    def _add(self, record):
+        self.latest[(record["kind"], record["id"])] = record
+        self.seq = max(self.seq, record.get("seq", 0))
+
+    def _append(self, records):
+        # Call with the lock held, caught up and with the records already added
+        if not records:
+            return
+        lines = "".join(json.dumps(record) + "\n" for record in records).encode()
+        with open(self.path, "ab") as f:
+            f.write(lines)
+        self._known += len(lines)
+
+    def record_local(self, kind, items):
+        # items: (id, data) changed here, data None when deleted. Returns how many were new.
+        with self.lock:
+            self._catch_up()
+            records = []
+            for item_id, data in items:
+                digest = content_digest(kind, data)
+                last = self.latest.get((kind, item_id))
+                if last is not None and last["digest"] == digest:
+                    continue  # the server's record being applied, or nothing actually changed
+                self.seq += 1
+                record = {
+                    "seq": self.seq, "kind": kind, "id": item_id, "version": (last["version"] if last else 0) + 1,
+                    "device": self.device, "digest": digest
+                }
+                if kind == "state":
+                    record["data"] = data  # small, and not kept anywhere else in this form
+                self._add(record)
+                records.append(record)
+            self._append(records)
+        return len(records)
+
+    def take_remote(self, records):
+        # Pulled records that beat our copy; logged, before they're applied here.
+        # Returns [(record, ours)], ours being what it beat; each record gets its "digest".
+        with self.lock:
+            self._catch_up()
+            taken = []
+            logged = []
+            for record in records:
+                ours = self.latest.get((record["kind"], record["id"]))
+                if ours is not None and rank(ours) >= rank(record):
+                    continue  # ours is newer, or this is ours coming back
+                record["digest"] = content_digest(record["kind"], record["data"])
+                keep = ("kind", "id", "version", "device", "digest") + (("data",) if record["kind"] == "state" else ())
+                logged.append({key: record[key] for key in keep})
+                self._add(logged[-1])
+                taken.append((record, ours))
+            self._append(logged)
+        return taken
+
+    def pending(self, since):
+        # Our changes after local sequence number since, the newest per item, oldest first
+        with self.lock:
+            self._catch_up()
+            return sorted((r for r in self.latest.values() if r.get("seq", 0) > since), key=lambda r: r["seq"])
+
+    def has(self, kind, item_id):
+        with self.lock:
+            self._catch_up()
+            return (kind, item_id) in self.latest
+
+    def known(self):
+        with self.lock:
+            self._catch_up()
+            return set(self.latest)
+
+    def on_journal_change(self, op, entry, old=None):
+        if op == "reload":
+            return  # logged by the process that made the change
+        if op == "delete":
+            self.record_local("entry", [(entry.id, None)])
+        else:
+            entries = entry if op == "add_many" else [entry]
+            self.record_local("entry", [(e.id, e.to_dict()) for e in entries])
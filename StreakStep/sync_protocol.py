@@ -0,0 +1,43 @@
+# === SYNC PROTOCOL ===
+# What the sync client (sync_client) and the reference server (sync_server)
+# agree on. Everything synced is a record:
+#   {"kind": "entry" | "state", "id": ..., "version": n, "device": ..., "data": ...}
+# For an entry, data is its to_dict() with the description, or None once it's
+# deleted. There is one "state" record, the streak save file's contents.
+# Every change makes a new record whose version is one past the highest seen
+# for that id. When two records for the same id meet, the higher version wins,
+# and between equal versions the one from the greater device id. Client and
+# server apply the same rule, so whatever order changes arrive in, every copy
+# ends up keeping the same record.
+# Bodies both ways are gzip-compressed JSON:
+#   POST /push  {"device", "records": [...]}   -> {"cursor", "rejected": [[kind, id], ...]}
+#   GET  /pull?since=<cursor>&limit=<n>        -> {"records": [...], "cursor", "more"}
+# The cursor is the server's change sequence number: pull hands out every
+# record that has won since then, oldest first.
+import gzip
+import json
+
+PUSH_BATCH = 500   # records per push request
+PULL_LIMIT = 1000  # records per pull response
+STATE_ID = "streak"
+
+
+def record_key(record):
+    return record["kind"], record["id"]
+
+
+def rank(record):
+    return record["version"], record["device"]
+
+
+def wins(record, other):
+    # True if record beats other (None: nothing there yet)
+    return other is None or rank(record) > rank(other)
+
+
+def pack(obj):
+    return gzip.compress(json.dumps(obj, separators=(",", ":")).encode(), compresslevel=6)
+
+
+def unpack(data):
+    return json.loads(gzip.decompress(data))
@@ -0,0 +1,156 @@
+# === REFERENCE SYNC SERVER ===
+# A small server for the protocol in sync_protocol, to run locally for testing:
+#   python sync_server.py --port 8765 --data-dir sync_server_data
+# then sync against it with
+#   python streakstep_cli.py sync --server http://127.0.0.1:8765
+# or start the app with STREAKSTEP_SYNC_URL set to the same address.
+# It keeps the winning record for every id in memory and appends each record
+# it accepts to records.jsonl, which is replayed when it starts. One journal
+# per server, no accounts and plain HTTP: it's for testing, not the internet.
+import argparse
+import json
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from journal_log import iter_records
+from sync_protocol import PULL_LIMIT, pack, record_key, unpack, wins
+
+RECORDS_FILE = "records.jsonl"
+
+
+class SyncStore:
+    def __init__(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, RECORDS_FILE)
+        self.lock = threading.Lock()
+        self.records = {}  # (kind, id) -> the winning record, with the seq it was accepted at
+        self.changes = []  # (seq, key), in order; a key shows up again each time it changes
+        self.seq = 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                for record in iter_records(f.read()):
+                    self._keep(record)
+
+    def _keep(self, record):
+        key = record_key(record)
+        self.records[key] = record
+        self.changes.append((record["seq"], key))
+        self.seq = record["seq"]
+
+    def push(self, records):
+        # -> (cursor, keys of the records that lost to what's here)
+        accepted = []
+        rejected = []
+        with self.lock:
+            for record in records:
+                key = record_key(record)
+                if not wins(record, self.records.get(key)):
+                    rejected.append(list(key))
+                    continue
+                self.seq += 1
+                record = dict(record, seq=self.seq)
+                self._keep(record)
+                accepted.append(record)
+            if accepted:
+                with open(self.path, "a") as f:
+                    f.write("".join(json.dumps(record) + "\n" for record in accepted))
+            return self.seq, rejected
+
+    def pull(self, since, limit=PULL_LIMIT):
+        # Records that won after seq since, oldest first; ones changed again later come up there instead
+        with self.lock:
+            start = bisect_left(self.changes, (since + 1,))
+            records = []
+            cursor = since
+            for i in range(start, len(self.changes)):
+                if len(records) >= limit:
+                    break
+                seq, key = self.changes[i]
+                cursor = seq
+                record = self.records[key]
+                if record["seq"] == seq:
+                    records.append(record)
+            return records, cursor, cursor < self.seq
+
+
+class SyncHandler(BaseHTTPRequestHandler):
+    store = None  # set by serve()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/pull":
+            self.send_error(404)
+            return
+        query = parse_qs(url.query)
+        try:
+            since = int(query.get("since", ["0"])[0])
+            limit = min(int(query.get("limit", [str(PULL_LIMIT)])[0]), PULL_LIMIT)
+        except ValueError:
+            self.send_error(400, "since and limit must be numbers")
+            return
+        records, cursor, more = self.store.pull(since, limit)
+        self.reply({"records": records, "cursor": cursor, "more": more})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/push":
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            if self.headers.get("Content-Encoding") == "gzip":
+                message = unpack(body)
+            else:
+                message = json.loads(body)
+            records = message["records"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.send_error(400, "expected a JSON object with records")
+            return
+        cursor, rejected = self.store.push(records)
+        self.reply({"cursor": cursor, "rejected": rejected})
+
+    def reply(self, message):
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = pack(message)
+            encoding = "gzip"
+        else:
+            body = json.dumps(message).encode()
+            encoding = None
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # a line per request drowns everything else
+
+
+def serve(folder, host="127.0.0.1", port=8765):
+    # The server, not started yet: serve_forever() it, on a thread for tests
+    handler = type("Handler", (SyncHandler,), {"store": SyncStore(folder)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reference StreakStep sync server, for local testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data-dir", default="sync_server_data", help="where the server keeps its records")
+    args = parser.parse_args(argv)
+    server = serve(args.data_dir, args.host, args.port)
+    print(f"Sync server on http://{args.host}:{server.server_address[1]}, data in {args.data_dir}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# === BACKGROUND TASKS ===
+# Slow work (reading and parsing the journal, saving an edit, building the
+# search index) runs off the Tk main thread, so the window and the timer tick
+# keep going. Tk may only be touched from the main thread: workers never call
+# back directly, they put results, errors and progress into a queue that the
+# Tk loop drains with root.after while anything is in flight.
+# Where a task runs:
+#   lane="name"    one thread per lane, its tasks run one after another in the
+#                  order they were started. The journal has one, so its changes
+#                  never interleave and always land in the order they were made.
+#   (default)      a small thread pool for independent I/O
+#   process=True   a process pool, started on first use, for CPU-heavy work.
+#                  The function and its arguments have to be picklable and it
+#                  can't see anything in this process.
+# A task function that returns a generator reports progress with every yield
+# (the journal_io jobs work as they are) and can be cancelled between yields.
+# Anything else can only be cancelled before it starts. A cancelled task never
+# calls on_done.
+import inspect
+import multiprocessing
+import queue
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+POLL_MS = 15  # how often the Tk loop looks for results while tasks are running
+THREADS = 2
+PROCESSES = 2
+
+
+class Task:
+    def __init__(self, on_done=None, on_progress=None):
+        self.on_done = on_done          # on_done(result, error) on the Tk thread
+        self.on_progress = on_progress  # on_progress(progress) on the Tk thread
+        self.cancelled = False
+        self.future = None
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()  # only works if it hasn't started
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+
+class TaskRunner:
+    def __init__(self, root, threads=THREADS, processes=PROCESSES, poll_ms=POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.messages = queue.SimpleQueue()
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix="streakstep-task")
+        self.lanes = {}
+        self.process_count = processes
+        self.processes = None
+        self.running = 0   # tasks whose on_done hasn't been dealt with yet; only the Tk thread counts
+        self._poll_job = None
+
+    def run(self, fn, *args, on_done=None, on_progress=None, lane=None, process=False):
+        task = Task(on_done, on_progress)
+        if process:
+            future = self._process_pool().submit(fn, *args)
+        else:
+            future = self._executor(lane).submit(self._work, task, fn, args)
+        task.future = future
+        self.running += 1
+        future.add_done_callback(lambda f: self.messages.put(("done", task, f)))
+        self._poll()
+        return task
+
+    def call_soon(self, fn, *args):
+        # From inside a running task: fn(*args) runs on the Tk thread, before that task's on_done
+        self.messages.put(("call", fn, args))
+
+    def _executor(self, lane):
+        if lane is None:
+            return self.pool
+        if lane not in self.lanes:
+            self.lanes[lane] = ThreadPoolExecutor(1, thread_name_prefix=f"streakstep-{lane}")
+        return self.lanes[lane]
+
+    def _process_pool(self):
+        if self.processes is None:
+            # Always a fresh interpreter: forking a process that runs Tk and threads isn't safe
+            self.processes = ProcessPoolExecutor(self.process_count, mp_context=multiprocessing.get_context("spawn"))
+        return self.processes
+
+    def _work(self, task, fn, args):
+        # On the worker thread
+        if task.cancelled:
+            return None
+        result = fn(*args)
+        if not inspect.isgenerator(result):
+            return result
+        job = result
+        result = None
+        for result in job:
+            if task.cancelled:
+                job.close()  # the job's finally/except blocks clean up
+                return None
+            self.messages.put(("progress", task, result))
+        return result  # the last progress
+
+    # === Tk side ===
+    def _poll(self):
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.poll_ms, self._drain)
+
+    def _drain(self):
+        self._poll_job = None
+        try:
+            while True:
+                try:
+                    message = self.messages.get_nowait()
+                except queue.Empty:
+                    break
+                self._deliver(*message)
+        finally:
+            if self.running:
+                self._poll()
+
+    def _deliver(self, kind, first, second):
+        if kind == "call":
+            first(*second)
+            return
+        task = first
+        if kind == "progress":
+            if not task.cancelled and task.on_progress is not None:
+                task.on_progress(second)
+            return
+        self.running -= 1
+        future = second
+        if task.cancelled or future.cancelled() or task.on_done is None:
+            return
+        error = future.exception()
+        task.on_done(None if error is not None else future.result(), error)
+
+    def close(self):
+        # Lanes carry writes, so they finish; queued reads and process work are dropped
+        for lane in self.lanes.values():
+            lane.shutdown(wait=True)
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        if self.processes is not None:
+            self.processes.shutdown(wait=False, cancel_futures=True)
+        if self._poll_job is not None:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
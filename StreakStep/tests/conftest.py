@@ -0,0 +1,5 @@
+# The app's modules import each other by plain name, as they do when run from StreakStep/
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,108 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from clock import SimulatedClock
+from core import make_entry
+from journal_store import ArchivedRow, JournalStore
+from storage import JsonStorage, SqliteStorage
+
+NOW = datetime(2024, 6, 15)  # months before March are old enough to archive
+
+
+def entries(count, start, title="Entry"):
+    return [make_entry(f"{title} {i}", "victory", f"about {title.lower()} {i}", start + timedelta(hours=i))
+            for i in range(count)]
+
+
+class Journal:
+    # A store over the JSON backend on a simulated clock, closed on the way out
+    def __init__(self, folder):
+        self.storage = JsonStorage(str(folder), SimulatedClock(NOW))
+        self.store = JournalStore(self.storage)
+
+    def __enter__(self):
+        return self.store
+
+    def __exit__(self, *exc):
+        self.store.close()
+        self.storage.close()
+
+
+@pytest.fixture
+def archived(tmp_path):
+    # 300 January entries archived the way the background archiver does it, 5 May ones still hot
+    with Journal(tmp_path) as journal:
+        for entry in entries(300, datetime(2024, 1, 2), "Old") + entries(5, datetime(2024, 5, 2), "New"):
+            journal.add(entry)
+        assert journal.storage.archive_before(journal.storage.archive_cutoff()) == 300
+    return tmp_path
+
+
+def log_ops(folder):
+    with open(folder / "journal_entries.jsonl") as f:
+        return [json.loads(line)["op"] for line in f]
+
+
+def test_archived_months_load_when_reached(archived):
+    with Journal(archived) as journal:
+        assert len(journal) == 305
+        assert len(journal.by_id) == 5 and list(journal.months) == ["2024-01"]
+        oldest = journal.newest_or_archived(304)
+        assert isinstance(oldest, ArchivedRow) and oldest.month == "2024-01"
+        entry = journal.newest(304)
+        assert entry.title == "Old 0"
+        assert journal.months == {} and len(journal.by_id) == 305
+        assert journal.get_full(entry.id).description == "about old 0"
+
+
+def test_editing_an_archived_entry_brings_it_back_hot(archived):
+    with Journal(archived) as journal:
+        entry = journal.newest(304)
+        journal.update(entry.id, title="Old 0, edited")
+    with Journal(archived) as journal:
+        assert len(journal) == 305
+        journal.load_archive()
+        titles = [e.title for e in journal.by_id.values()]
+        assert "Old 0, edited" in titles and "Old 0" not in titles
+        assert journal.get_full(entry.id).description == "about old 0"
+
+
+def test_deleting_an_archived_entry(archived):
+    with Journal(archived) as journal:
+        entry = journal.newest(304)
+        assert journal.delete(entry.id).title == "Old 0"
+        assert journal.delete(entry.id) is None
+    with Journal(archived) as journal:
+        assert len(journal) == 304
+        journal.load_archive()
+        assert entry.id not in journal.by_id
+
+
+def test_importing_old_entries_writes_them_straight_to_the_archive(tmp_path):
+    with Journal(tmp_path) as journal:
+        added = journal.add_many(entries(300, datetime(2024, 1, 2), "Old") + entries(5, datetime(2024, 5, 2), "New"))
+        assert len(added) == 305 and len(journal) == 305
+        assert journal.get_full(added[0].id).description == "about old 0"
+    assert log_ops(tmp_path).count("add") == 5
+    with Journal(tmp_path) as journal:
+        assert len(journal) == 305
+        assert list(journal.months) == ["2024-01"]
+        assert journal.newest(304).title == "Old 0"
+
+
+def test_switching_to_sqlite_keeps_archived_entries(archived):
+    with Journal(archived) as journal:
+        edited = journal.newest(304)
+        journal.update(edited.id, title="Old 0, edited")
+        journal.delete(journal.newest(303).id)
+
+    storage = SqliteStorage(str(archived))
+    try:
+        full = storage.load_full_entries()
+    finally:
+        storage.close()
+    assert len(full) == 304
+    assert full[edited.id].title == "Old 0, edited"
+    assert sum(entry.title.startswith("Old") for entry in full.values()) == 299
@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import timesync
+from clock import SimulatedClock, SyncedClock
+
+
+class FakeTime:
+    # Stands in for time.time/time.monotonic; sleep() stops the monotonic clock like a suspend does
+    def __init__(self, wall=1_700_000_000.0):
+        self.wall = wall
+        self.mono = 100.0
+
+    def time(self):
+        return self.wall
+
+    def monotonic(self):
+        return self.mono
+
+    def advance(self, seconds):
+        self.wall += seconds
+        self.mono += seconds
+
+    def sleep(self, seconds):
+        self.wall += seconds
+
+
+@pytest.fixture
+def fake_time(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(time, "time", fake.time)
+    monkeypatch.setattr(time, "monotonic", fake.monotonic)
+    return fake
+
+
+def test_offset_is_applied(fake_time):
+    clock = SyncedClock()
+    clock.offset = 2.5
+    assert clock.timestamp() == fake_time.wall + 2.5
+    assert clock.local_timestamp() == fake_time.wall
+    fake_time.advance(60)
+    assert clock.timestamp() == fake_time.wall + 2.5
+
+
+def test_follows_the_wall_clock_across_a_suspend(fake_time):
+    clock = SyncedClock()
+    clock.offset = -1.0
+    fake_time.sleep(3600)
+    assert clock.timestamp() == fake_time.wall - 1.0
+    assert clock.now() == datetime.fromtimestamp(fake_time.wall - 1.0)
+
+
+def test_follows_a_correction_to_the_system_clock(fake_time):
+    clock = SyncedClock()
+    fake_time.wall -= 30  # NTP stepped the clock back
+    assert clock.timestamp() == fake_time.wall
+
+
+def test_offset_is_saved_and_loaded(tmp_path):
+    path = tmp_path / "time_offset.json"
+    SyncedClock(str(path)).set_offset(4.0)
+    assert json.loads(path.read_text())["offset"] == 4.0
+    clock = SyncedClock(str(path))
+    assert clock.offset == 4.0
+    assert clock.synced_at is not None
+
+
+def test_damaged_offset_file_means_no_offset(tmp_path):
+    path = tmp_path / "time_offset.json"
+    path.write_text("{")
+    assert SyncedClock(str(path)).offset == 0.0
+
+
+def test_sync_measures_the_offset_halfway_through_the_round_trip(fake_time, monkeypatch):
+    def fetch(url, timeout):
+        fake_time.advance(0.2)  # round trip
+        return fake_time.wall + 10.0 - 0.1  # the server read its clock when the request got there
+
+    monkeypatch.setattr(timesync, "fetch_server_timestamp", fetch)
+    clock = SyncedClock()
+    offset = timesync.TimeSync(clock).sync()
+    assert offset == pytest.approx(10.0)
+    assert clock.offset == offset
+
+
+def test_failed_sync_keeps_the_offset(monkeypatch):
+    def fetch(url, timeout):
+        raise OSError("no network")
+
+    monkeypatch.setattr(timesync, "fetch_server_timestamp", fetch)
+    clock = SyncedClock()
+    clock.offset = 3.0
+    sync = timesync.TimeSync(clock)
+    assert sync.sync() is None
+    assert isinstance(sync.error, OSError)
+    assert clock.offset == 3.0
+
+
+def test_simulated_clock_only_moves_forward():
+    clock = SimulatedClock(datetime(2024, 1, 1))
+    clock.advance(90)
+    assert clock.now() == datetime(2024, 1, 1, 0, 1, 30)
+    assert clock.monotonic() == 90
+    with pytest.raises(ValueError):
+        clock.advance_to(10)
+
+
+def test_sync_against_a_stub_time_server():
+    # The way STREAKSTEP_TIME_URL lets a test point the sync at a local server
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps({"unixtime": time.time() + 3600}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        clock = SyncedClock()
+        sync = timesync.TimeSync(clock, url=f"http://127.0.0.1:{server.server_address[1]}/api/ip")
+        sync.start()
+        sync.thread.join(10)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert sync.error is None
+    assert clock.offset == pytest.approx(3600, abs=1)
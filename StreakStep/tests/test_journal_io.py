@@ -0,0 +1,85 @@
+import json
+from datetime import datetime
+
+import pytest
+
+import streakstep_cli
+from core import ENTRY_TYPES, make_entry, open_journal, open_storage
+from journal_io import export_entries, import_entries
+
+
+def run(generator):
+    # The last progress report, the way the command line runs the jobs
+    progress = None
+    for progress in generator:
+        pass
+    return progress
+
+
+@pytest.fixture
+def journal(tmp_path):
+    (tmp_path / "data").mkdir()
+    data_storage = open_storage(str(tmp_path / "data"), "json")
+    journal = open_journal(data_storage)
+    yield journal
+    journal.close()
+    data_storage.close()
+
+
+def write_lines(path, records):
+    path.write_text("".join((r if isinstance(r, str) else json.dumps(r)) + "\n" for r in records), encoding="utf-8")
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_export_then_import_round_trip(tmp_path, journal, fmt):
+    for minute, title in enumerate(["Walked, not ran", "Said \"no\"\nand meant it", "Ünïcode"]):
+        journal.add(make_entry(title, "victory", f"about {title}", datetime(2024, 5, 1, 10, minute)))
+    path = tmp_path / f"backup.{fmt}"
+    assert run(export_entries(journal, str(path), batch_size=2)) == {"written": 3, "total": 3}
+
+    (tmp_path / "other").mkdir()
+    other_storage = open_storage(str(tmp_path / "other"), "json")
+    other = open_journal(other_storage)
+    try:
+        assert run(import_entries(other, str(path), ENTRY_TYPES, batch_size=2))["added"] == 3
+        assert sorted((e.id, e.title, e.ts, e.description) for e in other.iter_full()) == \
+            sorted((e.id, e.title, e.ts, e.description) for e in journal.iter_full())
+        # The same file again: everything is a duplicate
+        assert run(import_entries(other, str(path), ENTRY_TYPES)) == {"read": 3, "added": 0, "skipped": 3, "invalid": 0}
+    finally:
+        other.close()
+        other_storage.close()
+
+
+def test_bad_records_are_counted_not_fatal(tmp_path, journal):
+    good = {"title": "Walk", "type": "victory", "timestamp": "2024-05-01T10:00:00"}
+    path = tmp_path / "entries.jsonl"
+    write_lines(path, [
+        good,
+        dict(good, title=5),
+        dict(good, description=["not", "text"]),
+        dict(good, type=["victory"]),
+        dict(good, type="triumph"),
+        dict(good, id=7),
+        dict(good, timestamp="yesterday"),
+        {"title": "No time", "type": "victory"},
+        "[1, 2]",
+        "{not json",
+    ])
+    assert run(import_entries(journal, str(path), ENTRY_TYPES)) == {"read": 10, "added": 1, "skipped": 0, "invalid": 9}
+
+
+def test_timestamps_with_an_offset_become_local_time(tmp_path, journal):
+    path = tmp_path / "entries.jsonl"
+    write_lines(path, [{"title": "Walk", "type": "victory", "timestamp": "2024-05-01T10:00:00+00:00"}])
+    assert run(import_entries(journal, str(path), ENTRY_TYPES))["added"] == 1
+    [entry] = journal.newest_first()
+    expected = datetime.fromisoformat("2024-05-01T10:00:00+00:00").astimezone().replace(tzinfo=None)
+    assert entry.when == expected
+
+
+def test_cli_rejects_a_file_that_is_not_utf8(tmp_path, capsys):
+    path = tmp_path / "entries.csv"
+    path.write_bytes("title,type,timestamp\nCaf\xe9,victory,2024-05-01T10:00:00\n".encode("latin-1"))
+    assert streakstep_cli.main(["--data-dir", str(tmp_path), "journal", "import", str(path)]) == 1
+    assert "isn't UTF-8 text" in capsys.readouterr().err
@@ -0,0 +1,143 @@
+import json
+
+from journal_log import JournalLog
+
+
+def entry(entry_id, title, minute=0):
+    return {"id": entry_id, "title": title, "type": "victory", "description": f"about {title}",
+            "timestamp": f"2024-01-01T10:{minute:02d}:00"}
+
+
+def records(log):
+    with open(log.path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_deletes_are_tombstones(tmp_path):
+    log = JournalLog(str(tmp_path / "journal.jsonl"))
+    log.add(entry("a", "first"))
+    log.add(entry("b", "second", 1))
+    log.delete("a")
+    assert [r["op"] for r in records(log)] == ["add", "add", "del"]
+    assert set(log.load_full()) == {"b"}
+    assert log.garbage == 2
+
+
+def test_replay_keeps_the_last_edit(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    log = JournalLog(path)
+    log.add(entry("a", "first"))
+    log.edit("a", entry("a", "edited"))
+    log.add(entry("b", "second", 1))
+    log.delete("b")
+    log.add(entry("b", "back again", 2))
+    log.close()
+
+    reopened = JournalLog(path)
+    live = reopened.load_full()
+    assert {entry_id: e["title"] for entry_id, e in live.items()} == {"a": "edited", "b": "back again"}
+    assert reopened.read_entry("a")["description"] == "about edited"
+
+
+def test_side_index_matches_a_replay(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    log = JournalLog(path)
+    log.add(entry("a", "first"))
+    log.edit("a", entry("a", "edited"))
+    log.delete("a")
+    log.add(entry("b", "second", 1))
+    log.close()
+
+    light = JournalLog(path).load_light()
+    assert list(light) == ["b"]
+    assert light["b"].title == "second" and light["b"].description is None
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    log = JournalLog(str(path))
+    log.add(entry("a", "first"))
+    with open(path, "a") as f:
+        f.write('{"op": "add", "entry": {"id": "b"')  # crashed mid-append
+    reopened = JournalLog(str(path))
+    reopened.add(entry("c", "third", 2))
+    assert set(reopened.load_full()) == {"a", "c"}
+
+
+def test_compaction_keeps_only_live_entries(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    log = JournalLog(path, min_garbage=4, garbage_ratio=0.5)
+    for i in range(4):
+        log.add(entry(str(i), f"entry {i}", i))
+    assert not log.needs_compaction()
+    log.delete("0")
+    log.edit("1", entry("1", "edited", 1))
+    log.delete("2")
+    log._compactor.join()
+
+    assert [r["op"] for r in records(log)] == ["add", "add"]
+    assert log.garbage == 0
+    assert {entry_id: e["title"] for entry_id, e in JournalLog(path).load_full().items()} == {"1": "edited", "3": "entry 3"}
+    assert log.read_entry("3")["title"] == "entry 3"  # offsets point into the new file
+
+
+def test_compaction_carries_over_what_was_appended_meanwhile(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    log = JournalLog(path, min_garbage=10 ** 6)
+    log.add(entry("a", "first"))
+    log.delete("a")
+    log.add(entry("b", "second", 1))
+
+    live = log.load_full
+
+    def load_then_append(limit=None):
+        result = live(limit)
+        if limit is not None:
+            log.add(entry("c", "third", 2))  # another write while compact() works without the lock
+            log.delete("b")
+        return result
+
+    log.load_full = load_then_append
+    log.compact()
+    del log.load_full
+
+    assert [r["op"] for r in records(log)] == ["add", "add", "del"]
+    assert set(JournalLog(path).load_full()) == {"c"}
+    assert set(log.rows) == {"c"}
+
+
+def test_other_writers_changes_come_through_poll(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    ours = JournalLog(path)
+    ours.add(entry("a", "first"))
+    ours.load_full()
+    theirs = JournalLog(path)
+    theirs.load_full()
+    theirs.edit("a", entry("a", "edited"))
+    theirs.delete("a")
+
+    changes = ours.poll()
+    assert [(key, e and e["title"], old and old["title"]) for key, e, old in changes] == [
+        ("a", "edited", "first"), ("a", None, "edited")
+    ]
+    assert ours.rows == {}
+
+    theirs.rewrite([entry("b", "second", 1)])
+    assert ours.poll() is None  # replaced: reload everything
+    assert set(ours.rows) == {"b"}
+
+
+def test_compacting_a_log_from_before_ids(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    old = [{"title": title, "type": "victory", "description": "", "timestamp": f"2024-01-01T10:0{i}:00"}
+           for i, title in enumerate(["first", "second", "third"])]
+    lines = [{"op": "add", "entry": old[0]}, {"op": "add", "entry": old[1]}, {"op": "add", "entry": old[2]},
+             {"op": "del", "key": old[1]["timestamp"]}]
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+
+    log = JournalLog(str(path))
+    log.compact()
+    entries = [r["entry"] for r in records(log)]
+    assert [e["title"] for e in entries] == ["first", "third"]
+    assert all(e["id"] for e in entries)
+    assert set(JournalLog(str(path)).load_full()) == {e["id"] for e in entries}
@@ -0,0 +1,83 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from core import make_entry
+from journal_store import JournalStore
+from storage import JsonStorage
+
+
+def lock_is_free(lock):
+    # Whether another thread (the Tk thread reading the list, say) could take the lock now
+    free = []
+
+    def attempt():
+        if lock.acquire(timeout=2):
+            lock.release()
+            free.append(True)
+
+    thread = threading.Thread(target=attempt)
+    thread.start()
+    thread.join()
+    return bool(free)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    storage = JsonStorage(str(tmp_path))
+    journal = JournalStore(storage)
+    yield journal
+    journal.close()
+    storage.close()
+
+
+def watch_storage(journal, monkeypatch):
+    # Records, for every backend call that touches the disk, whether the store's lock was free meanwhile
+    calls = []
+    for name in ("add_entry", "add_entries", "update_entry", "delete_entry", "load_description", "iter_full_entries"):
+        def wrapper(*args, _name=name, _method=getattr(journal.storage, name), **kwargs):
+            calls.append((_name, lock_is_free(journal.lock)))
+            return _method(*args, **kwargs)
+        monkeypatch.setattr(journal.storage, name, wrapper)
+    return calls
+
+
+def test_disk_work_happens_outside_the_lock(journal, monkeypatch):
+    calls = watch_storage(journal, monkeypatch)
+    entry = journal.add(make_entry("Walk", "victory", "around the lake", datetime(2024, 5, 1, 10)))
+    journal.add_many([make_entry("Read", "victory", "", datetime(2024, 5, 1, 11))])
+    assert journal.get_full(entry.id).description == "around the lake"
+    list(journal.get_many_full([entry.id]).values())
+    journal.update(entry.id, title="Walked")
+    journal.delete(entry.id)
+    assert {name for name, _ in calls} == {
+        "add_entry", "add_entries", "update_entry", "delete_entry", "load_description", "iter_full_entries"
+    }
+    assert all(free for _, free in calls), calls
+
+
+def test_a_failed_write_leaves_the_store_as_it_was(journal, monkeypatch):
+    entry = journal.add(make_entry("Walk", "victory", "", datetime(2024, 5, 1, 10)))
+
+    def full_disk(*args):
+        raise OSError("No space left on device")
+
+    for name in ("add_entry", "update_entry", "delete_entry"):
+        monkeypatch.setattr(journal.storage, name, full_disk)
+    with pytest.raises(OSError):
+        journal.add(make_entry("Read", "victory", "", datetime(2024, 5, 1, 11)))
+    with pytest.raises(OSError):
+        journal.update(entry.id, title="Walked")
+    with pytest.raises(OSError):
+        journal.delete(entry.id)
+    assert [e.title for e in journal.newest_first()] == ["Walk"]
+
+
+def test_changes_to_a_deleted_entry_are_no_ops(journal):
+    entry = journal.add(make_entry("Walk", "victory", "", datetime(2024, 5, 1, 10)))
+    journal.delete(entry.id)
+    assert journal.update(entry.id, title="Walked") is None
+    assert journal.delete(entry.id) is None
+    assert journal.get_full(entry.id) is None
+    assert len(journal) == 0
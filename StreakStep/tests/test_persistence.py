@@ -0,0 +1,70 @@
+import os
+import stat
+
+from persistence import DataStore, atomic_write_json
+
+
+class FakeStorage:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.saved = []
+
+    def save_state(self, data, merge=None):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("No space left on device")
+        self.saved.append(data)
+
+
+class FakeTimers:
+    # Stands in for root.after: callbacks run when fire() says so
+    def __init__(self):
+        self.pending = {}
+        self.next_id = 0
+
+    def after(self, delay_ms, callback):
+        self.next_id += 1
+        self.pending[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, timer):
+        self.pending.pop(timer, None)
+
+    def fire(self):
+        pending, self.pending = self.pending, {}
+        for callback in pending.values():
+            callback()
+
+
+def test_a_burst_of_changes_is_one_write():
+    storage, timers = FakeStorage(), FakeTimers()
+    store = DataStore(storage, timers.after, timers.after_cancel)
+    for streak in range(5):
+        store.mark_dirty({"streak": streak})
+    assert storage.saved == []
+    timers.fire()
+    assert storage.saved == [{"streak": 4}]
+    assert store.stats() == {"performed": 1, "avoided": 4}
+
+
+def test_a_failed_write_is_tried_again(capsys):
+    storage, timers = FakeStorage(failures=1), FakeTimers()
+    store = DataStore(storage, timers.after, timers.after_cancel)
+    store.mark_dirty({"streak": 1})
+    timers.fire()
+    assert storage.saved == [] and store.dirty
+    assert "No space left on device" in capsys.readouterr().out
+    assert len(timers.pending) == 1  # rescheduled, not waiting for close
+    timers.fire()
+    assert storage.saved == [{"streak": 1}] and not store.dirty
+
+
+def test_atomic_write_keeps_the_file_mode(tmp_path):
+    path = tmp_path / "data.json"
+    atomic_write_json(str(path), {"a": 1})
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~umask
+    os.chmod(path, 0o640)
+    atomic_write_json(str(path), {"a": 2})
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
@@ -0,0 +1,141 @@
+import os
+import pickle
+from datetime import datetime
+
+from core import make_entry
+from journal_store import JournalStore
+from snapshot import file_stamp, read_snapshot, read_snapshot_index, stamp_holds, write_snapshot
+from storage import JsonStorage
+
+
+def make(title, minute=0, entry_id=None):
+    return make_entry(title, "victory", f"about {title}", datetime(2024, 1, 1, 10, minute)).replace(id=entry_id)
+
+
+def open_journal(folder):
+    return JournalStore(JsonStorage(str(folder)), index_path=str(folder / "journal_index.json"),
+                        snapshot_path=str(folder / "journal_snapshot.pickle"))
+
+
+def closed_journal(folder, *titles):
+    journal = open_journal(folder)
+    for i, title in enumerate(titles):
+        journal.add(make(title, i))
+    journal.search("")  # builds the search index, so it goes in the snapshot
+    journal.close()
+    journal.storage.close()
+
+
+def reload(folder):
+    # What the next open makes of the snapshot: None, or (entries, whether the log is unchanged)
+    storage = JsonStorage(str(folder))
+    warm = read_snapshot(str(folder / "journal_snapshot.pickle"))
+    try:
+        return storage.load_snapshot(warm[0]["journal"]) if warm else None
+    finally:
+        storage.close()
+
+
+def titles(entries):
+    return sorted(entry.title for entry in entries.values())
+
+
+def test_unchanged_files_load_from_the_snapshot(tmp_path):
+    closed_journal(tmp_path, "walk", "read")
+    entries, unchanged = reload(tmp_path)
+    assert unchanged
+    assert titles(entries) == ["read", "walk"]
+
+
+def test_appended_log_is_caught_up(tmp_path):
+    closed_journal(tmp_path, "walk", "read")
+    other = JsonStorage(str(tmp_path))  # another process, appending without a snapshot of its own
+    other.load_entries()
+    other.add_entry(make("swim", 5, "swim-id"))
+    other.close()
+
+    entries, unchanged = reload(tmp_path)
+    assert not unchanged
+    assert titles(entries) == ["read", "swim", "walk"]
+
+
+def test_search_index_is_dropped_once_the_log_has_grown(tmp_path):
+    closed_journal(tmp_path, "walk", "read")
+    other = JsonStorage(str(tmp_path))
+    other.load_entries()
+    other.add_entry(make("zebra crossing", 5, "zebra-id"))
+    other.close()
+
+    journal = open_journal(tmp_path)
+    assert [entry.id for entry in journal.search("zebra")] == ["zebra-id"]
+    journal.storage.close()
+
+
+def test_rewritten_log_invalidates_the_snapshot(tmp_path):
+    closed_journal(tmp_path, "walk", "read")
+    other = JsonStorage(str(tmp_path))
+    full = other.load_full_entries()
+    other.log.rewrite([entry.to_dict() for entry in full.values() if entry.title == "walk"])
+    other.close()
+
+    assert reload(tmp_path) is None
+    journal = open_journal(tmp_path)
+    assert titles(journal.by_id) == ["walk"]
+    journal.storage.close()
+
+
+def test_log_changed_before_the_saved_end_invalidates_the_snapshot(tmp_path):
+    closed_journal(tmp_path, "walk", "read")
+    path = tmp_path / "journal_entries.jsonl"
+    data = path.read_bytes()
+    with open(path, "r+b") as f:  # same inode, grown, but not by appending
+        f.write(data.replace(b"walk", b"talk") + b"\n")
+    assert reload(tmp_path) is None
+
+
+def test_changed_side_index_invalidates_the_snapshot(tmp_path):
+    closed_journal(tmp_path, "walk")
+    with open(tmp_path / "journal_entries.jsonl.idx", "a") as f:
+        f.write(" ")
+    assert reload(tmp_path) is None
+
+
+def test_other_version_or_damaged_snapshot_is_ignored(tmp_path):
+    closed_journal(tmp_path, "walk")
+    path = tmp_path / "journal_snapshot.pickle"
+    with open(path, "rb") as f:
+        saved = pickle.load(f)
+    saved["version"] = -1
+    with open(path, "wb") as f:
+        pickle.dump(saved, f)
+    assert read_snapshot(str(path)) is None
+
+    path.write_bytes(b"not a pickle")
+    assert read_snapshot(str(path)) is None
+    journal = open_journal(tmp_path)
+    assert titles(journal.by_id) == ["walk"]
+    journal.storage.close()
+
+
+def test_stamp_holds(tmp_path):
+    path = tmp_path / "log"
+    path.write_bytes(b"one\n")
+    stamp = file_stamp(str(path), tail=True)
+    assert stamp_holds(str(path), stamp) == "same"
+    with open(path, "ab") as f:
+        f.write(b"two\n")
+    assert stamp_holds(str(path), stamp) == "grown"
+    assert stamp_holds(str(path), stamp[:3]) is None  # without the tail, growing is a change
+    os.remove(path)
+    assert stamp_holds(str(path), stamp) is None
+    assert stamp_holds(str(path), None) == "same"
+
+
+def test_index_bytes_are_kept_until_asked_for(tmp_path):
+    path = str(tmp_path / "snapshot.pickle")
+    write_snapshot(path, {"journal": 1}, b"index")
+    payload, where = read_snapshot(path)
+    assert payload == {"journal": 1}
+    assert read_snapshot_index(path, where) == b"index"
+    write_snapshot(path, {"journal": 2}, b"newer")
+    assert read_snapshot_index(path, where) is None  # replaced since
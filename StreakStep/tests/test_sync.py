@@ -0,0 +1,131 @@
+import threading
+
+import pytest
+
+import streakstep_cli
+from core import open_journal, open_storage
+from sync_log import ChangeLog, load_sync_state
+from sync_protocol import rank, wins
+from sync_server import SyncStore, serve
+
+
+def record(item_id, version, device, title="walk"):
+    return {"kind": "entry", "id": item_id, "version": version, "device": device, "data": {"title": title}}
+
+
+def test_higher_version_wins_then_greater_device():
+    assert wins(record("a", 2, "aaa"), record("a", 1, "zzz"))
+    assert not wins(record("a", 1, "zzz"), record("a", 2, "aaa"))
+    assert wins(record("a", 1, "bbb"), record("a", 1, "aaa"))
+    assert not wins(record("a", 1, "aaa"), record("a", 1, "bbb"))
+    assert not wins(record("a", 1, "aaa"), record("a", 1, "aaa"))  # the same record coming back
+    assert wins(record("a", 1, "aaa"), None)
+
+
+def test_every_arrival_order_keeps_the_same_record():
+    records = [record("a", 1, "aaa", "one"), record("a", 2, "aaa", "two"),
+               record("a", 2, "bbb", "three"), record("a", 1, "ccc", "four")]
+    expected = max(records, key=rank)
+    for shift in range(len(records)):
+        kept = None
+        for r in records[shift:] + records[:shift]:
+            if wins(r, kept):
+                kept = r
+        assert kept is expected
+    assert expected["data"]["title"] == "three"
+
+
+def test_server_rejects_what_loses_and_hands_out_the_winners(tmp_path):
+    store = SyncStore(str(tmp_path))
+    cursor, rejected = store.push([record("a", 2, "aaa", "two"), record("b", 1, "aaa")])
+    assert rejected == []
+    cursor, rejected = store.push([record("a", 1, "zzz", "stale"), record("a", 2, "bbb", "tie, greater device")])
+    assert rejected == [["entry", "a"]]
+
+    records, cursor, more = store.pull(0)
+    assert [(r["id"], r["data"]["title"]) for r in records] == [("b", "walk"), ("a", "tie, greater device")]
+    assert not more
+    assert store.pull(cursor)[0] == []
+
+    replayed = SyncStore(str(tmp_path))  # records.jsonl replays to the same winners
+    assert replayed.records == store.records
+
+
+def test_pulled_records_only_apply_when_they_beat_ours(tmp_path):
+    changes = ChangeLog(str(tmp_path), "bbb")
+    changes.record_local("entry", [("a", {"title": "ours"})])  # version 1 from bbb
+
+    taken = changes.take_remote([record("a", 1, "aaa", "theirs"), record("b", 1, "aaa")])
+    assert [r["id"] for r, _ in taken] == ["b"]  # a: same version, ours has the greater device
+
+    taken = changes.take_remote([record("a", 2, "aaa", "theirs, edited")])
+    assert [(r["id"], ours["device"]) for r, ours in taken] == [("a", "bbb")]
+
+    changes.record_local("entry", [("a", {"title": "ours again"})])
+    assert [(r["id"], r["version"]) for r in changes.pending(0)] == [("a", 3)]  # one past the highest seen
+
+
+@pytest.fixture
+def server(tmp_path):
+    # The reference server on a free port, for as long as the test runs
+    httpd = serve(str(tmp_path / "server"), port=0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def cli(folder, *args):
+    return streakstep_cli.main(["--data-dir", str(folder), "--storage", "json"] + list(args))
+
+
+def titles(folder):
+    data_storage = open_storage(str(folder), "json")
+    journal = open_journal(data_storage)
+    try:
+        return sorted(entry.title for entry in journal.newest_first())
+    finally:
+        journal.close()
+        data_storage.close()
+
+
+def test_round_trip_through_the_server(tmp_path, server, capsys):
+    laptop, phone = tmp_path / "laptop", tmp_path / "phone"
+    laptop.mkdir()
+    phone.mkdir()
+    assert cli(laptop, "journal", "add", "Walk", "--type", "victory") == 0
+    entry_id = capsys.readouterr().out.strip()
+    assert cli(laptop, "sync", "--server", server) == 0
+    assert cli(phone, "journal", "add", "Read", "--type", "victory") == 0
+    assert cli(phone, "sync", "--server", server) == 0
+    assert titles(phone) == ["Read", "Walk"]
+
+    assert cli(phone, "journal", "delete", entry_id) == 0
+    assert cli(phone, "sync") == 0
+    assert cli(laptop, "sync") == 0
+    assert titles(laptop) == titles(phone) == ["Read"]
+
+
+def test_both_sides_settle_on_the_same_edit(tmp_path, server):
+    folders = [tmp_path / "a", tmp_path / "b"]
+    for folder in folders:
+        folder.mkdir()
+        assert cli(folder, "sync", "--server", server) == 0
+    assert cli(folders[0], "journal", "add", "Walk", "--type", "victory") == 0
+    assert cli(folders[0], "sync") == 0
+    assert cli(folders[1], "sync") == 0
+
+    # Both edit the same entry before either syncs again
+    for folder, title in zip(folders, ["Walk, laptop", "Walk, phone"]):
+        data_storage = open_storage(str(folder), "json")
+        journal = open_journal(data_storage)
+        [entry] = journal.newest_first()
+        journal.update(entry.id, title=title)
+        journal.close()
+        data_storage.close()
+    for folder in folders + folders:
+        assert cli(folder, "sync") == 0
+    # Same version on both sides: the edit from the greater device id wins everywhere
+    devices = [load_sync_state(str(folder))["device"] for folder in folders]
+    winner = "Walk, laptop" if devices[0] > devices[1] else "Walk, phone"
+    assert titles(folders[0]) == titles(folders[1]) == [winner]
@@ -0,0 +1,51 @@
+# === NETWORK TIME SYNC ===
+# Asks a time server for the current time on a background thread and hands
+# the measured offset to the clock. Startup never waits on the network.
+# Point STREAKSTEP_TIME_URL at a local stub server to test without internet.
+import os
+import threading
+import time
+from datetime import datetime
+
+TIME_API_URL = os.environ.get("STREAKSTEP_TIME_URL", "https://worldtimeapi.org/api/ip")
+
+
+def fetch_server_timestamp(url=TIME_API_URL, timeout=5):
+    # requests and certifi are slow to import, keep them off the startup path
+    import requests
+    import certifi
+
+    headers = {"User-Agent": "Mozilla/5.0"}
+    response = requests.get(url, headers=headers, timeout=timeout, verify=certifi.where())
+    response.raise_for_status()
+    data = response.json()
+    if "unixtime" in data and "datetime" not in data:
+        return float(data["unixtime"])
+    return datetime.fromisoformat(data["datetime"]).timestamp()
+
+
+class TimeSync:
+    def __init__(self, clock, url=TIME_API_URL, timeout=5):
+        self.clock = clock
+        self.url = url
+        self.timeout = timeout
+        self.error = None
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.sync, daemon=True)
+        self.thread.start()
+
+    def sync(self):
+        try:
+            sent = time.monotonic()
+            server_time = fetch_server_timestamp(self.url, self.timeout)
+            round_trip = time.monotonic() - sent
+            # Assume the server read its clock halfway through the round trip
+            offset = server_time + round_trip / 2 - self.clock.local_timestamp()
+            self.clock.set_offset(offset)
+            return offset
+        except Exception as e:
+            self.error = e
+            print("Error syncing time:", e)
+            return None
@@ -0,0 +1,107 @@
+# === VIRTUALIZED LIST ===
+# Scrollable list that only builds widgets for the rows on screen (plus a few
+# rows of overscan). The same row widgets are reused as the user scrolls, so a
+# journal with 100k entries costs about as much to show as one with 20.
+# Rows remember which item they show, so after an insert, edit or delete only
+# the rows whose item changed are filled again; the rest just move.
+import tkinter as tk
+
+
+class VirtualList(tk.Frame):
+    def __init__(self, parent, make_row, fill_row, row_height=32, overscan=3, bg="#1C2833", key=id):
+        super().__init__(parent, bg=bg)
+        self.make_row = make_row    # make_row(parent) -> row frame
+        self.fill_row = fill_row    # fill_row(row, item) binds a row to an item
+        self.key = key              # key(item) -> identity of the item across changes
+        self.row_height = row_height
+        self.overscan = overscan
+        self.items = []
+
+        self.canvas = tk.Canvas(self, bg=bg, highlightthickness=0, yscrollincrement=row_height)
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        # Pool of recycled rows: each is [frame, canvas window id, bound item]
+        self.pool = []
+        self.bound = {}  # key -> pool slot showing that item
+
+        self.canvas.bind("<Configure>", self._on_resize)
+        # The wheel goes to the widget under the pointer, usually a row: while the
+        # pointer is over the list, scroll it whichever of its widgets that is
+        self.canvas.bind("<Enter>", self._bind_wheel)
+        self.canvas.bind("<Leave>", self._unbind_wheel)
+
+    def set_items(self, items):
+        self.items = items
+        self.items_changed()
+
+    def items_changed(self):
+        # Call after the items changed in place; keeps the scroll position
+        self.canvas.configure(scrollregion=(0, 0, 0, len(self.items) * self.row_height))
+        self.refresh()
+
+    def refresh(self):
+        height = max(self.canvas.winfo_height(), self.row_height)
+        width = self.canvas.winfo_width()
+        top = self.canvas.canvasy(0)
+
+        first = max(int(top // self.row_height) - self.overscan, 0)
+        wanted = height // self.row_height + 1 + 2 * self.overscan
+        last = min(first + wanted, len(self.items))
+
+        while len(self.pool) < wanted:
+            frame = self.make_row(self.canvas)
+            window = self.canvas.create_window(0, 0, window=frame, anchor="nw", state="hidden")
+            self.pool.append([frame, window, None])
+
+        visible = [self.items[index] for index in range(first, last)]
+        keys = [self.key(item) for item in visible]
+        wanted_keys = set(keys)
+
+        # Rows already showing one of the visible items keep their widget,
+        # scrolling by one row or inserting one entry fills a single row
+        free = []
+        for slot in self.pool:
+            if slot[2] is not None and self.key(slot[2]) not in wanted_keys:
+                self.canvas.itemconfigure(slot[1], state="hidden")
+                del self.bound[self.key(slot[2])]
+                slot[2] = None
+            if slot[2] is None:
+                free.append(slot)
+
+        for index, item, key in zip(range(first, last), visible, keys):
+            slot = self.bound.get(key)
+            if slot is None:
+                slot = free.pop()
+                self.bound[key] = slot
+            if slot[2] is not item:
+                self.fill_row(slot[0], item)  # new row, or the entry was edited
+                slot[2] = item
+            self.canvas.coords(slot[1], 0, index * self.row_height)
+            self.canvas.itemconfigure(slot[1], state="normal", width=width, height=self.row_height)
+
+    def _on_scroll(self, lo, hi):
+        self.scrollbar.set(lo, hi)
+        self.refresh()
+
+    def _on_resize(self, event):
+        self.refresh()
+
+    def _bind_wheel(self, event):
+        self.canvas.bind_all("<MouseWheel>", self._on_wheel)
+        self.canvas.bind_all("<Button-4>", lambda e: self.canvas.yview_scroll(-1, "units"))
+        self.canvas.bind_all("<Button-5>", lambda e: self.canvas.yview_scroll(1, "units"))
+
+    def _unbind_wheel(self, event):
+        # Moving onto a row leaves the canvas too, only let go once the pointer is off the list
+        under = self.winfo_containing(event.x_root, event.y_root)
+        if under is not None and (str(under) + ".").startswith(str(self.canvas) + "."):
+            return
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.unbind_all(sequence)
+
+    def _on_wheel(self, event):
+        self.canvas.yview_scroll(int(-event.delta / 120) or (-1 if event.delta > 0 else 1), "units")
@@ -0,0 +1,122 @@
+# === DATA FOLDER WATCHER ===
+# Tells the app when another process (a second window, the command line)
+# changed one of its data files. On Linux it listens to inotify on the data
+# folder through the Tk event loop, so nothing runs while nothing changes;
+# everywhere else it compares each file's size, mtime and inode every
+# poll_ms. Bursts of changes are debounced into one on_change(paths) call.
+# Our own writes get reported too, the handler has to shrug those off.
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+def open_inotify(folder):
+    # The inotify fd watching folder, or None where inotify isn't available
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        if libc.inotify_add_watch(fd, os.fsencode(folder), mask) < 0:
+            os.close(fd)
+            return None
+    except (OSError, AttributeError):
+        return None
+    return fd
+
+
+class FolderWatcher:
+    def __init__(self, root, paths, on_change, poll_ms=2000, debounce_ms=200):
+        self.root = root
+        self.paths = {os.path.abspath(path) for path in paths}
+        self.on_change = on_change
+        self.poll_ms = poll_ms
+        self.debounce_ms = debounce_ms
+
+        self.fd = None
+        self.signatures = {}
+        self.changed = set()
+        self._pending = None
+        self._poll_job = None
+
+    def start(self):
+        folders = {os.path.dirname(path) for path in self.paths}
+        if len(folders) == 1:
+            self.fd = open_inotify(folders.pop())
+        if self.fd is not None:
+            try:
+                self.root.tk.createfilehandler(self.fd, 1, self._read_events)  # 1 is tkinter.READABLE
+                return
+            except (AttributeError, RuntimeError):
+                # No file handlers in this Tk (Windows, threaded builds): poll instead
+                os.close(self.fd)
+                self.fd = None
+        self.signatures = {path: signature(path) for path in self.paths}
+        self._poll_job = self.root.after(self.poll_ms, self._poll)
+
+    def stop(self):
+        if self.fd is not None:
+            self.root.tk.deletefilehandler(self.fd)
+            os.close(self.fd)
+            self.fd = None
+        for job in (self._poll_job, self._pending):
+            if job is not None:
+                self.root.after_cancel(job)
+        self._poll_job = self._pending = None
+
+    def _read_events(self, fd, mask):
+        folder = os.path.dirname(next(iter(self.paths)))
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        pos = 0
+        while pos + EVENT_HEADER.size <= len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, pos)
+            pos += EVENT_HEADER.size
+            name = data[pos:pos + length].rstrip(b"\0")
+            pos += length
+            path = os.path.join(folder, os.fsdecode(name))
+            if path in self.paths:
+                self._changed(path)
+
+    def _poll(self):
+        self._poll_job = None
+        for path in self.paths:
+            current = signature(path)
+            if current != self.signatures.get(path):
+                self.signatures[path] = current
+                self._changed(path)
+        self._poll_job = self.root.after(self.poll_ms, self._poll)
+
+    def _changed(self, path):
+        self.changed.add(path)
+        if self._pending is None:
+            self._pending = self.root.after(self.debounce_ms, self._fire)
+
+    def _fire(self):
+        self._pending = None
+        changed, self.changed = self.changed, set()
+        self.on_change(changed)